@@ -0,0 +1,49 @@
+"""Compare per-call aiohttp sessions with a shared AsyncPastyClient.
+
+Run with `python benchmarks/bench_async_session.py [requests] [concurrency]`.
+"""
+import asyncio
+import sys
+import time
+from typing import Awaitable, Callable
+
+from aiohttp import ClientSession
+
+from pastypy.asyncio import AsyncPastyClient
+from pastypy.testing import StubServer
+
+
+async def per_call(site: str, id: str) -> None:
+    """Fetch a paste the way AsyncPaste.get used to, with a fresh session."""
+    async with ClientSession() as session:
+        resp = await session.get(site + "/api/v2/pastes/" + id)
+        resp.raise_for_status()
+        await resp.json(content_type="text/plain")
+
+
+async def run(label: str, total: int, concurrency: int, fetch: Callable[[], Awaitable]) -> None:
+    """Issue `total` fetches with bounded concurrency and print requests/sec."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await fetch()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {total / elapsed:>10.1f} req/s  ({elapsed:.2f}s)")  # noqa: T201
+
+
+async def main(total: int, concurrency: int) -> None:
+    """Run both variants against a local stub server."""
+    with StubServer() as server:
+        async with AsyncPastyClient(server.url) as client:
+            id = (await client.create_paste("benchmark", {}))["id"]
+            await run("per-call", total, concurrency, lambda: per_call(server.url, id))
+            await run("shared", total, concurrency, lambda: client.get_paste(id))
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    asyncio.run(main(*(args + [2000, 20][len(args) :])))
@@ -0,0 +1,77 @@
+"""Measure bandwidth and latency of compressed transport against the local stub.
+
+Payloads are synthetic application logs. Run with `python benchmarks/bench_compression.py`.
+"""
+import statistics
+import time
+from typing import Optional
+
+from pastypy import PastyClient
+from pastypy.compression import available
+from pastypy.testing import StubServer
+
+SIZES = [64 * 1024, 1024**2, 8 * 1024**2]
+ROUNDS = 5
+
+
+def log_payload(size: int) -> str:
+    """Generate roughly `size` bytes of log lines."""
+    lines = []
+    total = 0
+    i = 0
+    while total < size:
+        line = (
+            f"2024-01-01T12:{i // 60 % 60:02d}:{i % 60:02d}.{i % 1000:03d}Z "
+            f"{('INFO', 'DEBUG', 'WARN')[i % 3]} [worker-{i % 16}] "
+            f"GET /api/v1/items/{i * 7919 % 100000} status={(200, 200, 404)[i % 3]} "
+            f"duration={i * 31 % 250}ms bytes={i * 131 % 65536}\n"
+        )
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return "".join(lines)[:size]
+
+
+def measure(server: StubServer, content: str, codec: Optional[str]) -> dict:
+    """Upload and download a paste `ROUNDS` times with one codec."""
+    accept = codec or "identity"
+    with PastyClient(server.url, compression=codec, accept_encoding=accept) as client:
+        up, down, uploads, downloads = 0, 0, [], []
+        for _ in range(ROUNDS):
+            received = server.app.bytes_received
+            start = time.perf_counter()
+            id = client.create_paste(content, {})["id"]
+            uploads.append(time.perf_counter() - start)
+            up += server.app.bytes_received - received
+
+            sent = server.app.bytes_sent
+            start = time.perf_counter()
+            client.get_paste(id)
+            downloads.append(time.perf_counter() - start)
+            down += server.app.bytes_sent - sent
+    return {
+        "up": up / ROUNDS,
+        "down": down / ROUNDS,
+        "upload": statistics.median(uploads),
+        "download": statistics.median(downloads),
+    }
+
+
+def main() -> None:
+    """Run every codec at every size and print a table."""
+    print(  # noqa: T201
+        f"{'codec':<9}{'size':>10}{'up KB':>10}{'down KB':>10}{'upload ms':>11}{'download ms':>13}"
+    )
+    with StubServer() as server:
+        for size in SIZES:
+            content = log_payload(size)
+            for codec in [None, *available()]:
+                r = measure(server, content, codec)
+                print(  # noqa: T201
+                    f"{codec or 'none':<9}{size:>10}{r['up'] / 1024:>10.1f}{r['down'] / 1024:>10.1f}"
+                    f"{r['upload'] * 1000:>11.2f}{r['download'] * 1000:>13.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
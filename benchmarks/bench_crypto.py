@@ -0,0 +1,113 @@
+"""Compare peak memory and throughput of paste encryption implementations and algorithms.
+
+Each measurement runs in a fresh process so peak RSS is not polluted by
+earlier runs. Run with `python benchmarks/bench_crypto.py`.
+"""
+from binascii import hexlify
+import json
+import os
+import resource
+import subprocess  # noqa: S404
+import sys
+import time
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
+
+from pastypy.crypto import ALGORITHMS, decrypt_cbc, encrypt_cbc
+
+SIZES = [1024, 1024**2, 10 * 1024**2, 100 * 1024**2]
+
+
+def legacy_encrypt(plaintext: str, key: bytes, iv: bytes) -> str:
+    """Encrypt the way Paste.encrypt used to."""
+    ct = AES.new(key, AES.MODE_CBC, iv).encrypt(pad(plaintext.encode("UTF-8"), AES.block_size))
+    return hexlify(ct).decode("UTF8")
+
+
+def legacy_decrypt(ciphertext: str, key: bytes, iv: bytes) -> str:
+    """Decrypt the way Paste.decrypt used to."""
+    padded = AES.new(key, AES.MODE_CBC, iv).decrypt(bytes.fromhex(ciphertext))
+    return unpad(padded, AES.block_size).decode("UTF8")
+
+
+IMPLEMENTATIONS = {
+    "legacy": (legacy_encrypt, legacy_decrypt, 16),
+    "in-place": (encrypt_cbc, decrypt_cbc, 16),
+    "gcm": (ALGORITHMS["AES-GCM"].encrypt, ALGORITHMS["AES-GCM"].decrypt, 12),
+    "chacha20": (
+        ALGORITHMS["ChaCha20-Poly1305"].encrypt,
+        ALGORITHMS["ChaCha20-Poly1305"].decrypt,
+        12,
+    ),
+}
+
+
+def _status(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+    raise KeyError(field)
+
+
+def reset_peak() -> int:
+    """Reset the peak RSS counter where the OS allows it, returning the current RSS."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return _status("VmRSS")
+    except OSError:
+        return max_rss()
+
+
+def max_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    try:
+        return _status("VmHWM")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def worker(name: str, size: int, operation: str) -> dict:
+    """Run a single measurement and report it."""
+    encrypt, decrypt, iv_size = IMPLEMENTATIONS[name]
+    key, iv = os.urandom(32), os.urandom(iv_size)
+    content = "x" * size
+    if operation == "decrypt":
+        content = encrypt(content, key, iv)
+    func = encrypt if operation == "encrypt" else decrypt
+
+    baseline = reset_peak()
+    start = time.perf_counter()
+    result = func(content, key, iv)
+    elapsed = time.perf_counter() - start
+    del result
+    return {"peak_rss": max_rss() - baseline, "seconds": elapsed}
+
+
+def main() -> None:
+    """Run every implementation at every size and print a table."""
+    print(f"{'impl':<10}{'op':<9}{'size':>10}{'MB/s':>10}{'peak RSS MB':>14}")  # noqa: T201
+    for size in SIZES:
+        for operation in ("encrypt", "decrypt"):
+            for name in IMPLEMENTATIONS:
+                out = subprocess.run(  # noqa: S603
+                    [sys.executable, __file__, name, str(size), operation],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                result = json.loads(out)
+                rate = size / 1024**2 / result["seconds"]
+                print(  # noqa: T201
+                    f"{name:<10}{operation:<9}{size:>10}{rate:>10.1f}"
+                    f"{result['peak_rss'] / 1024**2:>14.1f}"
+                )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4:
+        print(json.dumps(worker(sys.argv[1], int(sys.argv[2]), sys.argv[3])))  # noqa: T201
+    else:
+        main()
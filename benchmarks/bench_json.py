@@ -0,0 +1,56 @@
+"""Compare JSON backends on paste-shaped payloads of increasing size.
+
+Run with `python benchmarks/bench_json.py`.
+"""
+import json
+import os
+import timeit
+
+from pastypy.serialization import BACKENDS, JSONBackend
+
+SIZES = [1024, 64 * 1024, 1024**2, 10 * 1024**2]
+
+
+def legacy() -> JSONBackend:
+    """Encode and decode the way requests and aiohttp do by default."""
+    return JSONBackend("legacy", lambda obj: json.dumps(obj).encode("UTF-8"), json.loads)
+
+
+def backends() -> list[JSONBackend]:
+    """Every installed backend, plus the legacy path."""
+    found = [legacy()]
+    for factory in BACKENDS.values():
+        try:
+            found.append(factory())
+        except ImportError:
+            continue
+    return found
+
+
+def main() -> None:
+    """Time encoding and decoding for every backend at every size and print a table."""
+    print(f"{'backend':<10}{'size':>10}{'encode MB/s':>14}{'decode MB/s':>14}")  # noqa: T201
+    for size in SIZES:
+        payload = {
+            "id": "abcdef12",
+            "content": os.urandom(size // 2).hex(),
+            "created": 1_700_000_000,
+            "metadata": {"pf_encryption": {"alg": "AES-CBC", "iv": os.urandom(16).hex()}},
+        }
+        body = json.dumps(payload).encode("UTF-8")
+        number = max(1, 50 * 1024**2 // size)
+        for backend in backends():
+            encode = timeit.timeit(lambda: backend.dumps(payload), number=number) / number
+            if backend.name == "legacy":
+                decode = timeit.timeit(lambda: json.loads(body.decode("UTF-8")), number=number)
+            else:
+                decode = timeit.timeit(lambda: backend.loads(body), number=number)
+            decode /= number
+            print(  # noqa: T201
+                f"{backend.name:<10}{size:>10}{size / 1024**2 / encode:>14.1f}"
+                f"{size / 1024**2 / decode:>14.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Compare memory per instance and construction rate of Paste models.
+
+Payloads are built up front so only the Paste objects themselves are counted.
+Run with `python benchmarks/bench_paste_memory.py`.
+"""
+import gc
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+from pastypy import Paste
+
+COUNT = 200_000
+
+
+class LegacyPaste:
+    def __init__(
+        self,
+        content: str,
+        id: Optional[str] = None,
+        created: Optional[int] = None,
+        metadata: Optional[dict] = None,
+        site: Optional[str] = None,
+        client: Optional[object] = None,
+    ):
+        """Paste as it was before `__slots__`."""
+        self._content = content
+        self.id = id
+        self.created = created
+        self.metadata = metadata or {}
+        self._site = site
+        self._client = client
+
+        self.encrypted = "pf_encryption" in self.metadata
+        self._plaintext = None if self.encrypted else self._content
+        self._token = None
+        self._key = None
+
+
+def payloads(metadata: bool) -> list[dict]:
+    """Raw payloads as returned by the API, with or without metadata."""
+    return [
+        {
+            "id": f"{i:08x}",
+            "content": f"content {i}",
+            "created": 1_700_000_000 + i,
+            "metadata": {"pf_encryption": {"alg": "AES-CBC", "iv": "00" * 16}} if metadata else {},
+            "site": "https://pasty.lus.pm",
+        }
+        for i in range(COUNT)
+    ]
+
+
+def measure(factory: Callable[..., object], raws: list[dict]) -> tuple[float, float]:
+    """Bytes allocated per instance and instances constructed per second."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    instances = [factory(**raw) for raw in raws]
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # The list holding the instances is not part of their cost
+    size -= 8 * len(instances)
+    del instances
+    return size / len(raws), len(raws) / elapsed
+
+
+def main() -> None:
+    """Measure each model with and without metadata and print a table."""
+    print(f"{'model':<10}{'metadata':<10}{'bytes/paste':>12}{'pastes/s':>12}")  # noqa: T201
+    for metadata in (False, True):
+        raws = payloads(metadata)
+        for name, factory in (("legacy", LegacyPaste), ("slots", Paste)):
+            per_instance, rate = measure(factory, raws)
+            print(f"{name:<10}{str(metadata):<10}{per_instance:>12.0f}{rate:>12.0f}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare the async client's transports: aiohttp, httpx over HTTP/1.1 and HTTP/2.
+
+Each transport gets pastes at several concurrency levels from a stub with added
+latency, reporting connections opened, p50/p99 latency and throughput. HTTP/1.1
+transports run against the threaded stub, HTTP/2 against the h2 stub.
+
+Run with `python benchmarks/bench_transport.py [requests] [latency]`.
+"""
+import asyncio
+import sys
+import time
+
+from pastypy.asyncio import AsyncPastyClient
+from pastypy.testing import H2StubServer, StubPasty, StubServer
+
+CONCURRENCY = [1, 16, 64, 256]
+
+
+async def fetch_all(site: str, transport: str, total: int, concurrency: int) -> list[float]:
+    """Get one paste `total` times with bounded concurrency, returning each latency."""
+    samples = []
+    # Without coalescing, every get is its own request
+    client = AsyncPastyClient(site, transport=transport, limit=concurrency, coalesce=False)
+    async with client:
+        id = (await client.create_paste("benchmark", {}))["id"]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one() -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                await client.get_paste(id)
+                samples.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(one() for _ in range(total)))
+    return samples
+
+
+def report(
+    transport: str, concurrency: int, connections: int, samples: list[float], elapsed: float
+) -> None:
+    """Print a result row."""
+    ordered = sorted(samples)
+    p50 = ordered[len(ordered) // 2] * 1000
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000
+    print(  # noqa: T201
+        f"{transport:<8} {concurrency:>5} {connections:>6} {p50:>9.1f} {p99:>9.1f}"
+        f" {len(samples) / elapsed:>9.1f}"
+    )
+
+
+def main(total: int, latency: float) -> None:
+    """Run every transport at every concurrency level."""
+    header = f"{'':<8} {'tasks':>5} {'conns':>6} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9}"
+    print(header)  # noqa: T201
+    for transport in ("aiohttp", "httpx", "http2"):
+        for concurrency in CONCURRENCY:
+            app = StubPasty(latency=latency)
+            server = H2StubServer(app=app) if transport == "http2" else StubServer(app=app)
+            with server:
+                start = time.perf_counter()
+                samples = asyncio.run(fetch_all(server.url, transport, total, concurrency))
+                elapsed = time.perf_counter() - start
+            report(transport, concurrency, app.connections, samples, elapsed)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.005,
+    )
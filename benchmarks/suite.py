@@ -0,0 +1,232 @@
+"""Reproducible benchmark suite against the local stub server.
+
+Covers single-operation latency, bulk throughput at several concurrency levels,
+concurrent gets of one paste and crypto throughput and memory, for both clients.
+Results are written as JSON so runs of different versions can be compared.
+
+    python benchmarks/suite.py run --output before.json
+    python benchmarks/suite.py run --output after.json
+    python benchmarks/suite.py compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable
+
+import pastypy
+from pastypy import AsyncPaste, AsyncPastyClient, Paste, PastyClient
+from pastypy.crypto import ALGORITHMS
+from pastypy.testing import StubPasty, StubServer
+
+CONCURRENCY = [1, 4, 16, 64]
+CRYPTO_SIZES = [64 * 1024, 1024**2, 16 * 1024**2]
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Latency summary in milliseconds."""
+    ordered = sorted(samples)
+    return {
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+    }
+
+
+def time_call(func: Callable[[], Any]) -> float:
+    """Seconds a call takes."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+async def time_await(func: Callable[[], Awaitable]) -> float:
+    """Seconds an awaited call takes."""
+    start = time.perf_counter()
+    await func()
+    return time.perf_counter() - start
+
+
+def sync_latency(site: str, rounds: int) -> dict[str, dict]:
+    """Latency of each operation on the sync client."""
+    samples: dict[str, list[float]] = {"save": [], "get": [], "edit": [], "delete": []}
+    with PastyClient(site) as client:
+        for i in range(rounds):
+            paste = Paste(content=f"latency {i}", client=client)
+            samples["save"].append(time_call(paste.save))
+            samples["get"].append(time_call(lambda: Paste.get(paste.id, client=client)))
+            samples["edit"].append(time_call(lambda: paste.edit(f"edited {i}")))
+            samples["delete"].append(time_call(paste.delete))
+    return {op: summarize(s) for op, s in samples.items()}
+
+
+async def async_latency(site: str, rounds: int) -> dict[str, dict]:
+    """Latency of each operation on the async client."""
+    samples: dict[str, list[float]] = {"save": [], "get": [], "edit": [], "delete": []}
+    async with AsyncPastyClient(site) as client:
+        for i in range(rounds):
+            paste = AsyncPaste(content=f"latency {i}", client=client)
+            samples["save"].append(await time_await(paste.save))
+            samples["get"].append(await time_await(lambda: AsyncPaste.get(paste.id, client=client)))
+            samples["edit"].append(await time_await(lambda: paste.edit(f"edited {i}")))
+            samples["delete"].append(await time_await(paste.delete))
+    return {op: summarize(s) for op, s in samples.items()}
+
+
+def seed(site: str, count: int) -> list[str]:
+    """Create pastes to fetch in bulk."""
+    with PastyClient(site) as client:
+        return [r.id for r in Paste.save_many((f"bulk {i}" for i in range(count)), client=client)]
+
+
+def sync_bulk(site: str, ids: list[str]) -> dict[str, float]:
+    """Bulk get throughput of the sync client in pastes per second, by worker count."""
+    out = {}
+    for workers in CONCURRENCY:
+        with PastyClient(site, pool_size=workers) as client:
+            elapsed = time_call(lambda: Paste.get_many(ids, max_workers=workers, client=client))
+        out[str(workers)] = len(ids) / elapsed
+    return out
+
+
+async def async_bulk(site: str, ids: list[str]) -> dict[str, float]:
+    """Bulk get throughput of the async client in pastes per second, by concurrency."""
+    out = {}
+    for concurrency in CONCURRENCY:
+        async with AsyncPastyClient(site) as client:
+            elapsed = await time_await(
+                lambda: AsyncPaste.get_many(ids, concurrency=concurrency, client=client)
+            )
+        out[str(concurrency)] = len(ids) / elapsed
+    return out
+
+
+async def hot_get(site: str, id: str, callers: int) -> dict[str, dict]:
+    """Many tasks getting one paste at once, with and without coalescing."""
+    out = {}
+    for coalesce in (True, False):
+        async with AsyncPastyClient(site, coalesce=coalesce) as client:
+            before = time.perf_counter()
+            await asyncio.gather(*(AsyncPaste.get(id, client=client) for _ in range(callers)))
+            elapsed = time.perf_counter() - before
+            sent = client.flights.stats.calls if coalesce else callers
+        out["coalesced" if coalesce else "plain"] = {"elapsed_ms": elapsed * 1000, "requests": sent}
+    return out
+
+
+def crypto(sizes: list[int]) -> dict[str, dict]:
+    """Encryption and decryption throughput and peak traced memory by algorithm and size."""
+    out: dict[str, dict] = {}
+    for algorithm in ALGORITHMS.values():
+        key, iv = os.urandom(32), os.urandom(algorithm.iv_size)
+        for size in sizes:
+            content = "x" * size
+            tracemalloc.start()
+            start = time.perf_counter()
+            ciphertext = algorithm.encrypt(content, key, iv)
+            encrypt = time.perf_counter() - start
+            encrypt_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            algorithm.decrypt(ciphertext, key, iv)
+            decrypt = time.perf_counter() - start
+            decrypt_peak = tracemalloc.get_traced_memory()[1] - before
+            tracemalloc.stop()
+            out.setdefault(algorithm.name, {})[str(size)] = {
+                "encrypt_mb_s": size / 1024**2 / encrypt,
+                "decrypt_mb_s": size / 1024**2 / decrypt,
+                "encrypt_peak_ratio": encrypt_peak / size,
+                "decrypt_peak_ratio": decrypt_peak / size,
+            }
+    return out
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Run every benchmark and collect the results."""
+    rounds = 20 if args.quick else 200
+    bulk_size = 100 if args.quick else 1000
+    results: dict[str, Any] = {
+        "meta": {
+            "pastypy": pastypy.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency_ms": args.latency * 1000,
+            "quick": args.quick,
+            "timestamp": time.time(),
+        }
+    }
+    # Single-op latency against a stub without added delay measures client overhead
+    with StubServer() as server:
+        results["latency"] = {
+            "sync": sync_latency(server.url, rounds),
+            "async": asyncio.run(async_latency(server.url, rounds)),
+        }
+    # Bulk throughput needs server latency, or concurrency has nothing to overlap
+    with StubServer(app=StubPasty(latency=args.latency)) as server:
+        ids = seed(server.url, bulk_size)
+        results["bulk_get_per_s"] = {
+            "sync": sync_bulk(server.url, ids),
+            "async": asyncio.run(async_bulk(server.url, ids)),
+        }
+        results["hot_get"] = asyncio.run(hot_get(server.url, ids[0], bulk_size))
+    results["crypto"] = crypto(CRYPTO_SIZES[:2] if args.quick else CRYPTO_SIZES)
+    return results
+
+
+def flatten(data: dict, prefix: str = "") -> dict[str, float]:
+    """Flatten nested results into dotted metric names."""
+    out = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = value
+    return out
+
+
+def compare(args: argparse.Namespace) -> None:
+    """Print the change of every metric between two result files."""
+    with open(args.before) as f:
+        before = flatten({k: v for k, v in json.load(f).items() if k != "meta"})
+    with open(args.after) as f:
+        after = flatten({k: v for k, v in json.load(f).items() if k != "meta"})
+    print(f"{'metric':<48}{'before':>12}{'after':>12}{'change':>9}")  # noqa: T201
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name], after[name]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{name:<48}{old:>12.2f}{new:>12.2f}{change:>9}")  # noqa: T201
+
+
+def main() -> None:
+    """Parse arguments and run a subcommand."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the suite")
+    run_parser.add_argument("--output", help="file to write results to, default stdout")
+    run_parser.add_argument("--latency", type=float, default=0.005, help="stub latency (s)")
+    run_parser.add_argument("--quick", action="store_true", help="fewer rounds and sizes")
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        compare(args)
+        return
+    results = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(results + "\n")
+    else:
+        sys.stdout.write(results + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+from pastypy import AsyncPaste, AsyncPastyClient
+
+# One session and connection pool shared by every operation
+async with AsyncPastyClient(site="https://pasty.example.com", limit=50) as client:
+    paste = AsyncPaste(content="This reuses a pooled connection")
+    await paste.save(client=client)
+
+    other = await AsyncPaste.get(id="abcdef123", client=client)
+    print(other.content)
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+from pastypy import Paste, PastyClient
+from pastypy.vault import TokenVault
+
+results = Paste.get_many(["abcdef123", "456ghijkl"], max_workers=8)
+for result in results:
+    if result.ok:
+        print(result.value.content)
+    else:
+        print(f"Failed to get {result.item}: {result.error}")
+
+# Or handle pastes as soon as they arrive
+for result in Paste.iter_many(["abcdef123", "456ghijkl"]):
+    print(result.item, result.ok)
+
+# Upload a stream of contents with at most 8 requests in flight
+logs = (path.read_text() for path in sorted(Path("logs").glob("*.log")))
+for record in Paste.save_many(logs, encrypt=True, max_workers=8):
+    print(record.id, record.modification_token, record.key)
+
+# Record tokens in a vault as pastes are created, then clean them up later
+vault = TokenVault("tokens.sqlite3")
+client = PastyClient(vault=vault)
+for record in Paste.save_many(["first", "second"], client=client):
+    print(record.id)
+
+for result in Paste.delete_many(vault.ids(client.site), client=client):
+    print(result.item, "deleted" if result.ok else result.error)
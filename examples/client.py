@@ -0,0 +1,12 @@
+from pastypy import Paste, PastyClient
+
+# One client per site keeps connections open between requests
+with PastyClient(site="https://pasty.example.com", pool_size=20, timeout=10) as client:
+    paste = Paste(content="This reuses a pooled connection")
+    paste.save(client=client)
+
+    # Pastes remember the client they were saved or fetched with
+    paste.edit(content="So does this edit")
+
+    other = Paste.get(id="abcdef123", client=client)
+    print(other.content)
@@ -4,10 +4,10 @@ paste = Paste(content="I am secret!")
 
 # Encrypts the paste and gives you the key
 key = paste.encrypt()
-pid = paste.save()
+paste.save()
 
 # Get the paste later
-paste = Paste.get(pid)
+paste = Paste.get(paste.id)
 
 # Prints <Encrypted: encrypted_text>
 print(paste.content)
@@ -15,3 +15,13 @@ print(paste.content)
 # Prints "I am secret!"
 paste.decrypt(key)
 print(paste.content)
+
+# Authenticated encryption detects tampering, the algorithm is detected on decrypt
+paste = Paste(content="I am secret and tamper-proof!")
+key = paste.encrypt("AES-GCM")  # or "ChaCha20-Poly1305"
+paste.save()
+Paste.get(paste.id).decrypt(key)
+
+# Keep the key across edits, or append without re-encrypting the existing content
+paste.edit("Status: starting\n", reuse_key=True)
+paste.append("Status: running\n")
@@ -1,6 +1,25 @@
 """Pasty API wrapper in Python."""
-from .asyncio import AsyncPaste
-from .sync import Paste
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .asyncio import AsyncPaste, AsyncPastyClient
+    from .sync import Paste, PastyClient
 
 __version__ = "1.0.0"
-__all__ = [AsyncPaste, Paste]
+__all__ = ["AsyncPaste", "AsyncPastyClient", "Paste", "PastyClient"]
+
+
+def __getattr__(name: str) -> Any:
+    # Clients are imported on first access, so sync-only users never load aiohttp
+    if name in ("AsyncPaste", "AsyncPastyClient"):
+        from . import asyncio as module
+    elif name in ("Paste", "PastyClient"):
+        from . import sync as module
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = globals()[name] = getattr(module, name)
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,6 @@
+"""Run the command-line interface with `python -m pastypy`."""
+import sys
+
+from pastypy.cli import main
+
+sys.exit(main())
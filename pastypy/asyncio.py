@@ -1,149 +1,1353 @@
 """AsyncIO Paste wrapper."""
-from typing import Optional
+import asyncio
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
+from functools import partial
+import time
+from types import SimpleNamespace
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Mapping,
+    Optional,
+    TypeVar,
+)
+from weakref import WeakKeyDictionary
 
-from aiohttp import ClientSession
+from aiohttp import (
+    ClientConnectionError,
+    ClientError,
+    ClientResponse,
+    ClientResponseError,
+    ClientSession,
+    ClientTimeout,
+    TCPConnector,
+    TraceConfig,
+)
 
-from pastypy.sync import Paste
+from pastypy.bulk import BulkResult, UploadRecord, gather_limited, run_concurrent
+from pastypy.cache import PasteCache, copy_payload
+from pastypy.compression import (
+    COMPRESSION_THRESHOLD,
+    Codec,
+    RequestCompressor,
+    get_codec,
+)
+from pastypy.crypto import (
+    CHUNK_SIZE,
+    AEADEncryptor,
+    Algorithm,
+    CBCEncryptor,
+    get_algorithm,
+)
+from pastypy.dedup import DedupEntry, DedupIndex
+from pastypy.metrics import Hooks
+from pastypy.protocol import (
+    Exchange,
+    Operation,
+    PasteProtocol,
+    Request,
+    Response,
+    finish,
+)
+from pastypy.retry import RateLimiter, RetryPolicy, RetryStats
+from pastypy.routing import HEALTH_PATH, SiteRouter
+from pastypy.serialization import (
+    JSONBackend,
+    escape_chunk,
+    get_backend,
+    iter_paste_body,
+    paste_body_parts,
+)
+from pastypy.singleflight import AsyncSingleFlight
+from pastypy.stream import PasteStream
+from pastypy.sync import Paste, _Edit, _encrypt_chunks, _stream_encryptor
+from pastypy.transport import HTTPXSession, check_transport
+from pastypy.vault import TokenVault, require_vault
+
+CRYPTO_THRESHOLD = 64 * 1024
+
+
+def _accept_encoding() -> str:
+    """Get the content codings aiohttp can decode, brotli only when a library is installed."""
+    try:
+        get_codec("br")
+    except ImportError:
+        return "gzip, deflate"
+    return "gzip, deflate, br"
+
+
+ACCEPT_ENCODING = _accept_encoding()
+
+T = TypeVar("T")
+
+# Gets over temporary clients, which share no flights of their own, per event loop
+_loop_flights: "WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncSingleFlight]" = (
+    WeakKeyDictionary()
+)
+
+
+def _new_session(
+    options: "AsyncPastyClient | AsyncMultiSiteClient", trace_configs: Optional[list[TraceConfig]]
+) -> "ClientSession | HTTPXSession":
+    """Create a session from the connection options and transport of a client."""
+    if options.transport != "aiohttp":
+        return HTTPXSession(
+            limit=options.limit,
+            keep_alive=options.keep_alive,
+            keepalive_timeout=options.keepalive_timeout,
+            timeout=options.timeout,
+            headers={"Accept-Encoding": options.accept_encoding},
+            http2=options.transport == "http2",
+            prior_knowledge=options.transport == "http2"
+            and all(site.startswith("http://") for site in options.sites),
+        )
+    connector = TCPConnector(
+        limit=options.limit,
+        limit_per_host=options.limit_per_host,
+        ttl_dns_cache=options.ttl_dns_cache,
+        force_close=not options.keep_alive,
+        **({"keepalive_timeout": options.keepalive_timeout} if options.keep_alive else {}),
+    )
+    return ClientSession(
+        connector=connector,
+        timeout=ClientTimeout(total=options.timeout),
+        headers={"Accept-Encoding": options.accept_encoding},
+        trace_configs=trace_configs,
+    )
+
+
+class AsyncPastyClient(PasteProtocol):
+    def __init__(
+        self,
+        site: str = "https://pasty.lus.pm",
+        limit: int = 100,
+        limit_per_host: int = 0,
+        ttl_dns_cache: Optional[int] = 10,
+        keep_alive: bool = True,
+        keepalive_timeout: float = 15.0,
+        timeout: Optional[float] = 30.0,
+        session: "ClientSession | HTTPXSession | None" = None,
+        transport: str = "aiohttp",
+        rate_limiter: Optional[RateLimiter] = None,
+        retry: Optional[RetryPolicy] = None,
+        cache: Optional[PasteCache] = None,
+        crypto_executor: Optional[Executor] = None,
+        crypto_threshold: int = CRYPTO_THRESHOLD,
+        json_backend: "JSONBackend | str | None" = None,
+        compression: "Codec | str | None" = None,
+        compression_threshold: int = COMPRESSION_THRESHOLD,
+        accept_encoding: Optional[str] = None,
+        vault: Optional[TokenVault] = None,
+        hooks: Optional[Hooks] = None,
+        dedup: Optional[DedupIndex] = None,
+        coalesce: bool = True,
+    ):
+        """
+        Pooled async client bound to a single pasty instance.
+
+        The underlying session is created on first use, so the client can be built
+        outside of a running event loop. Use it as an async context manager, or call
+        `close` when done.
+
+        Args:
+            site: Pasty instance, default official
+            limit: Maximum number of simultaneous connections
+            limit_per_host: Maximum number of simultaneous connections per host, 0 for no limit
+            ttl_dns_cache: Seconds to cache DNS lookups, `None` to cache forever
+            keep_alive: Reuse connections between requests
+            keepalive_timeout: Seconds an idle connection is kept open
+            timeout: Total request timeout in seconds, `None` to wait forever
+            session: Existing session to use instead of creating one
+            transport: HTTP library, `aiohttp`, `httpx`, or `http2` to multiplex requests
+                over one HTTP/2 connection, see `pastypy.transport`
+            rate_limiter: Limiter shared by every task using this client
+            retry: Retry policy, default `RetryPolicy()`
+            cache: Cache for fetched pastes, revalidated with conditional requests
+            crypto_executor: Executor for encryption, default the loop's thread pool
+            crypto_threshold: Content length from which encryption runs in the executor
+            json_backend: JSON backend or its name, default the fastest one installed
+            compression: Codec or Content-Encoding for request bodies, `None` to send them plain
+            compression_threshold: Minimum request body size in bytes worth compressing
+            accept_encoding: Accept-Encoding to send, default every coding aiohttp can decode
+            vault: Vault recording the modification token of every paste created
+            hooks: Instrumentation hooks, such as a `MetricsCollector`
+            dedup: Index returning existing pastes when saving identical content
+            coalesce: Share one request among concurrent gets of the same paste
+        """
+        self.site = site.rstrip("/")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keep_alive = keep_alive
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.transport = check_transport(transport)
+        self._session = session
+        self._owns_session = session is None
+        self.rate_limiter = rate_limiter
+        self.retry = retry or RetryPolicy()
+        self.stats = RetryStats()
+        self.cache = cache
+        self.crypto_executor = crypto_executor
+        self.crypto_threshold = crypto_threshold
+        self.json_backend = get_backend(json_backend)
+        self.compressor = RequestCompressor(compression, compression_threshold)
+        self.vault = vault
+        self.hooks = hooks
+        self.dedup = dedup
+        self.flights = AsyncSingleFlight() if coalesce else None
+        self.accept_encoding = accept_encoding or ACCEPT_ENCODING
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: site={self.site}>"
+
+    async def __aenter__(self) -> "AsyncPastyClient":
+        _ = self.session
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        await self.close()
+
+    @property
+    def sites(self) -> list[str]:
+        """Get every site the client can reach."""
+        return [self.site]
+
+    @property
+    def session(self) -> "ClientSession | HTTPXSession":
+        """Get the underlying session, creating it if needed."""
+        if self._session is None or self._session.closed:
+            self._session = _new_session(
+                self, [self._trace_config()] if self.hooks is not None else None
+            )
+            self._owns_session = True
+        return self._session
+
+    async def close(self) -> None:
+        """Close the session and all pooled connections."""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+        self._session = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        operation: Optional[str] = None,
+        retry: Optional[RetryPolicy] = None,
+        **kwargs: Any,
+    ) -> ClientResponse:
+        """
+        Send a request to the site, applying rate limiting and retries.
+
+        Args:
+            method: HTTP method
+            path: Path relative to the site root
+            operation: Operation reported to hooks, default the lowercase method
+            retry: Retry policy for this request, default the client's
+            kwargs: `json`, `data` and `headers`, and extra arguments for
+                `aiohttp.ClientSession.request`
+
+        Returns:
+            Response object, to be used as an async context manager
+        """
+        exchange = self._exchange(Request.from_kwargs(method, path, operation, retry, kwargs))
+        resp = await self._send(exchange, **kwargs)
+        exchange.read()
+        return resp
+
+    async def _send(self, exchange: Exchange, **kwargs: Any) -> ClientResponse:
+        """Send a request through its exchange, sleeping between attempts."""
+        request = exchange.request
+        if self.hooks is not None:
+            kwargs["trace_request_ctx"] = {"operation": request.operation}
+        url = self.site + request.path
+        while True:
+            if self.rate_limiter:
+                self.stats.record_throttle(await self.rate_limiter.acquire_async())
+            exchange.begin()
+            try:
+                resp = await self.session.request(
+                    request.method, url, data=exchange.data, headers=exchange.headers, **kwargs
+                )
+            except (ClientError, asyncio.TimeoutError) as e:
+                delay = exchange.failed(e)
+                if delay is None:
+                    raise
+            else:
+                delay = exchange.received(resp.status, resp.headers)
+                if delay is None:
+                    return resp
+                resp.release()
+            await asyncio.sleep(delay)
+
+    async def _run(self, op: Operation[T]) -> T:
+        """Run an operation, reading its response whole."""
+        exchange = self._exchange(next(op))
+        async with await self._send(exchange) as resp:
+            body = b""
+            try:
+                body = await resp.read()
+            finally:
+                exchange.read(len(body))
+            return finish(op, Response(resp.status, resp.headers, body, resp.raise_for_status))
+
+    def _trace_config(self) -> TraceConfig:
+        """Report DNS lookups and new connections to the hooks."""
+        trace = TraceConfig()
+
+        def phase(name: str) -> tuple[Callable, Callable]:
+            async def started(_: ClientSession, ctx: SimpleNamespace, __: Any) -> None:
+                setattr(ctx, name, time.perf_counter())
+
+            async def ended(_: ClientSession, ctx: SimpleNamespace, __: Any) -> None:
+                operation = (ctx.trace_request_ctx or {}).get("operation", "unknown")
+                elapsed = time.perf_counter() - getattr(ctx, name)
+                self.hooks.on_phase(self.site, operation, name, elapsed)
+
+            return started, ended
+
+        for name, start_signal, end_signal in (
+            ("dns", trace.on_dns_resolvehost_start, trace.on_dns_resolvehost_end),
+            ("connect", trace.on_connection_create_start, trace.on_connection_create_end),
+        ):
+            started, ended = phase(name)
+            start_signal.append(started)
+            end_signal.append(ended)
+        return trace
+
+    async def get_paste(self, id: str, cached: bool = True) -> dict:
+        """
+        Get the raw payload of a paste.
+
+        Args:
+            id: ID of paste to get
+            cached: Use the cache and share concurrent requests, `False` to ask the site
+
+        Returns:
+            Raw paste payload
+        """
+        if not cached:
+            return await self._run(self._get_op(id, None))
+        entry = self._cache_entry(id)
+        if entry and entry.fresh:
+            return entry.payload()
+
+        if self.flights is None:
+            return await self._run(self._get_op(id, entry))
+        raw, shared = await self.flights.do(id, lambda: self._run(self._get_op(id, entry)))
+        return self._coalesced(raw, shared)
+
+    def _forget(self, id: str) -> None:
+        """Drop what is known of a paste, including gets of it over temporary clients."""
+        super()._forget(id)
+        flights = _loop_flights.get(asyncio.get_running_loop())
+        if flights is not None:
+            flights.forget((self.site, id))
+
+    async def stream_paste(self, id: str, chunk_size: int = 65536) -> AsyncIterator[bytes]:
+        """
+        Stream the raw response body of a paste, bypassing the cache.
+
+        Args:
+            id: ID of paste to get
+            chunk_size: Bytes to read at a time
+
+        Returns:
+            Async iterator of response body chunks
+        """
+        exchange = self._exchange(self._paste_request(id))
+        size = 0
+        try:
+            async with await self._send(exchange) as resp:
+                resp.raise_for_status()
+                async for data in resp.content.iter_chunked(chunk_size):
+                    size += len(data)
+                    yield data
+        finally:
+            exchange.read(size)
+
+    async def create_paste(self, content: str, metadata: dict) -> dict:
+        """
+        Create a new paste.
+
+        Args:
+            content: Paste content
+            metadata: Paste metadata
+
+        Returns:
+            Raw paste payload, including the modification token
+        """
+        return await self._run(self._create_op(content, metadata))
+
+    async def upload_paste(
+        self, chunks: "Iterable[str] | AsyncIterable[str]", metadata: dict
+    ) -> dict:
+        """
+        Create a new paste from content produced in pieces, streaming the request body.
+
+        The body is sent with chunked transfer encoding as `chunks` yields, so the
+        content is never held whole. It cannot be replayed, so it is neither
+        compressed nor retried.
+
+        Args:
+            chunks: Paste content, in pieces, sync or async iterable
+            metadata: Paste metadata
+
+        Returns:
+            Raw paste payload, including the modification token
+        """
+        return await self._run(self._upload_op(_paste_body(self.json_backend, chunks, metadata)))
+
+    async def edit_paste(self, id: str, token: str, content: str, metadata: dict) -> None:
+        """
+        Replace the content and metadata of a paste.
+
+        Args:
+            id: ID of paste to edit
+            token: Modification token
+            content: New content
+            metadata: New metadata
+        """
+        await self._run(self._edit_op(id, token, content, metadata))
+
+    async def delete_paste(self, id: str, token: str) -> None:
+        """
+        Delete a paste.
+
+        Args:
+            id: ID of paste to delete
+            token: Modification token
+        """
+        await self._run(self._delete_op(id, token))
+
+    async def site_for(self, id: str) -> str:
+        """
+        Get the site a paste lives on.
+
+        Args:
+            id: Paste ID
+
+        Returns:
+            Pasty instance, always this client's site
+        """
+        return self.site
+
+    async def report_paste(self, id: str, reason: str) -> Optional[dict]:
+        """
+        Report a paste.
+
+        Args:
+            id: ID of paste to report
+            reason: Report reason
+
+        Returns:
+            Raw report response, `None` if the site does not support reporting
+        """
+        return await self._run(self._report_op(id, reason))
+
+
+async def _paste_body(
+    backend: JSONBackend, chunks: "Iterable[str] | AsyncIterable[str]", metadata: dict
+) -> AsyncIterator[bytes]:
+    """Encode a paste creation body a piece of content at a time, as `iter_paste_body`."""
+    if not isinstance(chunks, AsyncIterable):
+        for part in iter_paste_body(backend, chunks, metadata):
+            yield part
+        return
+    head, tail = paste_body_parts(backend, metadata)
+    yield head
+    async for chunk in chunks:
+        if chunk:
+            yield escape_chunk(backend, chunk)
+    yield tail
+
+
+def _unavailable(error: Exception) -> bool:
+    """Check if an error means the site is down rather than the request being wrong."""
+    if isinstance(error, ClientResponseError):
+        return error.status >= 500
+    return isinstance(error, (ClientConnectionError, asyncio.TimeoutError))
+
+
+def _not_found(error: Exception) -> bool:
+    return isinstance(error, ClientResponseError) and error.status == 404
+
+
+class AsyncMultiSiteClient:
+    def __init__(
+        self,
+        sites: Iterable[str],
+        limit: int = 100,
+        limit_per_host: int = 0,
+        ttl_dns_cache: Optional[int] = 10,
+        keep_alive: bool = True,
+        keepalive_timeout: float = 15.0,
+        timeout: Optional[float] = 30.0,
+        session: "ClientSession | HTTPXSession | None" = None,
+        transport: str = "aiohttp",
+        accept_encoding: Optional[str] = None,
+        health_interval: Optional[float] = 60.0,
+        health_timeout: float = 5.0,
+        recheck_interval: float = 30.0,
+        **kwargs: Any,
+    ):
+        """
+        Async client spreading pastes over several pasty instances, such as mirrors.
+
+        New pastes go to the healthy site with the lowest latency, failing over to the
+        next one on connection errors and 5xx responses. The site of every paste seen is
+        remembered, so later operations on it go to the right instance. Pastes on
+        unknown sites are looked up in the vault, then searched for in latency order.
+
+        Every site shares one session, each host keeping its own connection pool.
+        Usable anywhere an `AsyncPastyClient` is.
+
+        Args:
+            sites: Pasty instances, in order of preference until latencies are measured
+            limit: Maximum number of simultaneous connections over all sites
+            limit_per_host: Maximum number of simultaneous connections per site, 0 for no limit
+            ttl_dns_cache: Seconds to cache DNS lookups, `None` to cache forever
+            keep_alive: Reuse connections between requests
+            keepalive_timeout: Seconds an idle connection is kept open
+            timeout: Total request timeout in seconds, `None` to wait forever
+            session: Existing session to use instead of creating one
+            transport: HTTP library, `aiohttp`, `httpx` or `http2`, see `pastypy.transport`
+            accept_encoding: Accept-Encoding to send, default every coding aiohttp can decode
+            health_interval: Seconds between health checks, `None` to only run `check_health`
+            health_timeout: Timeout of each health check request in seconds
+            recheck_interval: Seconds a failed site is tried last before being trusted again
+            kwargs: Extra arguments for the `AsyncPastyClient` of each site, such as `retry`;
+                a `rate_limiter` is copied so that each site has its own bucket
+
+        Raises:
+            ValueError: No sites given
+        """
+        self.router = SiteRouter(sites, health_interval, recheck_interval)
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keep_alive = keep_alive
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.transport = check_transport(transport)
+        self.accept_encoding = accept_encoding or ACCEPT_ENCODING
+        self.health_timeout = health_timeout
+        self.vault: Optional[TokenVault] = kwargs.get("vault")
+        self.hooks: Optional[Hooks] = kwargs.get("hooks")
+        self.dedup: Optional[DedupIndex] = kwargs.get("dedup")
+        self.crypto_executor: Optional[Executor] = kwargs.get("crypto_executor")
+        self.crypto_threshold: int = kwargs.get("crypto_threshold", CRYPTO_THRESHOLD)
+        self._session = session
+        self._owns_session = session is None
+        limiter: Optional[RateLimiter] = kwargs.pop("rate_limiter", None)
+        self.clients = {
+            site: AsyncPastyClient(site, rate_limiter=limiter and limiter.copy(), **kwargs)
+            for site in self.router.sites
+        }
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: sites={self.router.sites}>"
+
+    async def __aenter__(self) -> "AsyncMultiSiteClient":
+        _ = self.session
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        await self.close()
+
+    @property
+    def site(self) -> str:
+        """Get the site new pastes currently go to."""
+        return self.router.ranked()[0]
+
+    @property
+    def sites(self) -> list[str]:
+        """Get every site the client can reach."""
+        return self.router.sites
+
+    @property
+    def session(self) -> "ClientSession | HTTPXSession":
+        """Get the session shared by every site, creating it if needed."""
+        if self._session is None or self._session.closed:
+            self._session = _new_session(self, None)
+            self._owns_session = True
+        return self._session
+
+    async def close(self) -> None:
+        """Close the session and all pooled connections."""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+        self._session = None
+
+    def _client(self, site: str) -> AsyncPastyClient:
+        """Get the client of a site, bound to the shared session."""
+        client = self.clients[site]
+        client._session, client._owns_session = self.session, False
+        return client
+
+    async def check_health(self) -> dict[str, Optional[float]]:
+        """
+        Probe every site concurrently, updating its health and latency.
+
+        Any answer below 500 counts as healthy, so sites without an info endpoint
+        are still measured.
+
+        Returns:
+            Smoothed latency in seconds by site, `None` for sites never reached
+        """
+        timeout = ClientTimeout(total=self.health_timeout)
+
+        async def probe(site: str) -> None:
+            start = time.perf_counter()
+            try:
+                async with self.session.get(site + HEALTH_PATH, timeout=timeout) as resp:
+                    status = resp.status
+            except (ClientError, asyncio.TimeoutError):
+                status = None
+            if status is None or status >= 500:
+                self.router.failed(site)
+            else:
+                self.router.succeeded(site, time.perf_counter() - start)
+
+        await asyncio.gather(*(probe(site) for site in self.router.sites))
+        return dict(self.router.latency)
+
+    async def _ranked(self) -> list[str]:
+        """Get the order to try sites in, running a health check first if due."""
+        if self.router.claim_health_check():
+            await self.check_health()
+        return self.router.ranked()
+
+    async def _failover(
+        self,
+        sites: list[str],
+        call: Callable[[AsyncPastyClient], Awaitable[Any]],
+        search: bool = False,
+    ) -> tuple[str, Any]:
+        """
+        Call `call` with the client of each site in turn until one succeeds.
+
+        Args:
+            sites: Sites to try, in order
+            call: Operation to run against a site's client
+            search: Also move on when the paste is not found
+
+        Returns:
+            Site that succeeded and the result of `call`
+        """
+        for i, site in enumerate(sites):
+            try:
+                result = await call(self._client(site))
+            except (ClientError, asyncio.TimeoutError) as e:
+                if _unavailable(e):
+                    self.router.failed(site)
+                elif not (search and _not_found(e)):
+                    raise
+                if i == len(sites) - 1:
+                    raise
+                continue
+            self.router.succeeded(site)
+            return site, result
+
+    async def site_for(self, id: str) -> str:
+        """
+        Get the site a paste lives on, searching every site if not known.
+
+        Args:
+            id: Paste ID
+
+        Returns:
+            Pasty instance
+
+        Raises:
+            aiohttp.ClientResponseError: Paste not found on any site
+        """
+        site = self.router.site_of(id)
+        if site is None and self.vault is not None:
+            site = next((s for s in self.router.sites if self.vault.get(s, id)), None)
+        if site is None:
+            sites = await self._ranked()
+            site, _ = await self._failover(sites, lambda c: c.get_paste(id), search=True)
+        self.router.remember(id, site)
+        return site
+
+    async def get_paste(self, id: str, cached: bool = True) -> dict:
+        """
+        Get the raw payload of a paste.
+
+        Args:
+            id: ID of paste to get
+            cached: Use the cache and share concurrent requests, `False` to ask the site
+
+        Returns:
+            Raw paste payload
+        """
+        site = self.router.site_of(id)
+        sites = [site] if site else await self._ranked()
+        site, raw = await self._failover(sites, lambda c: c.get_paste(id, cached), search=True)
+        self.router.remember(id, site)
+        return raw
+
+    async def stream_paste(self, id: str, chunk_size: int = 65536) -> AsyncIterator[bytes]:
+        """
+        Stream the raw response body of a paste, bypassing the cache.
+
+        Args:
+            id: ID of paste to get
+            chunk_size: Bytes to read at a time
+
+        Returns:
+            Async iterator of response body chunks
+        """
+        client = self._client(await self.site_for(id))
+        async for data in client.stream_paste(id, chunk_size):
+            yield data
+
+    async def create_paste(self, content: str, metadata: dict) -> dict:
+        """
+        Create a new paste on the best available site.
+
+        Args:
+            content: Paste content
+            metadata: Paste metadata
+
+        Returns:
+            Raw paste payload, including the modification token
+        """
+        sites = await self._ranked()
+        site, raw = await self._failover(sites, lambda c: c.create_paste(content, metadata))
+        self.router.remember(raw["id"], site)
+        return raw
+
+    async def upload_paste(
+        self, chunks: "Iterable[str] | AsyncIterable[str]", metadata: dict
+    ) -> dict:
+        """
+        Create a new paste on the best available site, streaming the request body.
+
+        A streamed body cannot be replayed, so there is no failover once sending starts.
+
+        Args:
+            chunks: Paste content, in pieces, sync or async iterable
+            metadata: Paste metadata
+
+        Returns:
+            Raw paste payload, including the modification token
+        """
+        sites = (await self._ranked())[:1]
+        site, raw = await self._failover(sites, lambda c: c.upload_paste(chunks, metadata))
+        self.router.remember(raw["id"], site)
+        return raw
+
+    async def edit_paste(self, id: str, token: str, content: str, metadata: dict) -> None:
+        """
+        Replace the content and metadata of a paste.
+
+        Args:
+            id: ID of paste to edit
+            token: Modification token
+            content: New content
+            metadata: New metadata
+        """
+        sites = [await self.site_for(id)]
+        await self._failover(sites, lambda c: c.edit_paste(id, token, content, metadata))
+
+    async def delete_paste(self, id: str, token: str) -> None:
+        """
+        Delete a paste.
+
+        Args:
+            id: ID of paste to delete
+            token: Modification token
+        """
+        await self._failover([await self.site_for(id)], lambda c: c.delete_paste(id, token))
+        self.router.forget(id)
+
+    async def report_paste(self, id: str, reason: str) -> Optional[dict]:
+        """
+        Report a paste.
+
+        Args:
+            id: ID of paste to report
+            reason: Report reason
+
+        Returns:
+            Raw report response, `None` if the site does not support reporting
+        """
+        sites = [await self.site_for(id)]
+        return (await self._failover(sites, lambda c: c.report_paste(id, reason)))[1]
+
+
+async def _run_crypto(
+    func: Callable[..., str],
+    data: str,
+    key: bytes,
+    iv: bytes,
+    executor: Optional[Executor],
+    threshold: int,
+) -> str:
+    """Run an encryption function inline for small data, or in `executor` above `threshold`."""
+    if len(data) < threshold:
+        return func(data, key, iv)
+    func = partial(func, chunk_size=CHUNK_SIZE)
+    return await asyncio.get_running_loop().run_in_executor(executor, func, data, key, iv)
+
+
+async def _encrypt_chunks_async(
+    chunks: AsyncIterable[str], encryptor: "CBCEncryptor | AEADEncryptor"
+) -> AsyncIterator[str]:
+    async for chunk in chunks:
+        yield encryptor.update(chunk)
+    yield encryptor.finalize()
+
+
+@asynccontextmanager
+async def _client_for(
+    site: Optional[str], client: Optional[AsyncPastyClient]
+) -> AsyncIterator[AsyncPastyClient]:
+    """Yield the given client, or a temporary one for `site`."""
+    if client is not None:
+        yield client
+        return
+    async with AsyncPastyClient(site) as client:
+        yield client
+
+
+async def _get_temporary(site: str, id: str) -> dict:
+    """Get the raw payload of a paste over a temporary client, shared by concurrent callers."""
+    loop = asyncio.get_running_loop()
+    flights = _loop_flights.get(loop)
+    if flights is None:
+        flights = _loop_flights[loop] = AsyncSingleFlight()
+
+    async def fetch() -> dict:
+        async with AsyncPastyClient(site) as client:
+            return await client.get_paste(id)
+
+    raw, _ = await flights.do((site.rstrip("/"), id), fetch)
+    return copy_payload(raw)
 
 
 class AsyncPaste(Paste):
+    __slots__ = ()
+
     @classmethod
-    async def get(cls, id: str, site: Optional[str] = "https://pasty.lus.pm") -> "AsyncPaste":
+    async def get(
+        cls,
+        id: str,
+        site: Optional[str] = "https://pasty.lus.pm",
+        client: Optional[AsyncPastyClient] = None,
+        key: Optional[str] = None,
+    ) -> "AsyncPaste":
         """
         Get a paste.
 
         Args:
             id: ID of paste to get
+            site: Target site, default official
+            client: Client to use, default temporary client for `site`, concurrent gets of
+                the same paste sharing one
+            key: Key to decrypt the paste with, off the event loop for large pastes
 
         Returns:
             New Paste instance
         """
-        endpoint = site + "/api/v2/pastes/"
-        async with ClientSession() as session:
-            resp = await session.get(endpoint + id)
-            resp.raise_for_status()
-            raw = await resp.json(content_type="text/plain")
-        raw["site"] = site
-        return cls(**raw)
+        if client is None:
+            paste = cls(**await _get_temporary(site, id))
+            if key:
+                await paste.decrypt_async(key)
+            return paste
+        async with _client_for(site, client) as c:
+            paste = await cls._get_with(id, c, client)
+            if key:
+                await paste.decrypt_async(key, c.crypto_executor, c.crypto_threshold)
+        return paste
+
+    @classmethod
+    async def get_many(
+        cls,
+        ids: Iterable[str],
+        site: Optional[str] = "https://pasty.lus.pm",
+        concurrency: int = 8,
+        client: Optional[AsyncPastyClient] = None,
+    ) -> list[BulkResult]:
+        """
+        Get many pastes concurrently.
+
+        Args:
+            ids: IDs of pastes to get
+            site: Target site, default official
+            concurrency: Maximum simultaneous requests
+            client: Client to use, default temporary client for `site` shared by the batch
+
+        Returns:
+            Results in input order, with the AsyncPaste or the error for each ID
+        """
+        async with _client_for(site, client) as c:
+            return await gather_limited(lambda id: cls._get_with(id, c, client), ids, concurrency)
+
+    @classmethod
+    async def iter_many(
+        cls,
+        ids: "Iterable[str] | AsyncIterable[str]",
+        site: Optional[str] = "https://pasty.lus.pm",
+        concurrency: int = 8,
+        client: Optional[AsyncPastyClient] = None,
+    ) -> AsyncIterator[BulkResult]:
+        """
+        Get many pastes concurrently, yielding them as they arrive.
+
+        Args:
+            ids: IDs of pastes to get
+            site: Target site, default official
+            concurrency: Maximum simultaneous requests
+            client: Client to use, default temporary client for `site` shared by the batch
+
+        Returns:
+            Async iterator of results in completion order
+        """
+        async with _client_for(site, client) as c:
+            async for result in run_concurrent(
+                lambda id: cls._get_with(id, c, client), ids, concurrency
+            ):
+                yield result
+
+    @classmethod
+    async def _get_with(
+        cls, id: str, client: AsyncPastyClient, bind: Optional[AsyncPastyClient]
+    ) -> "AsyncPaste":
+        """Get a paste over `client`, binding the result to `bind`."""
+        raw = await client.get_paste(id)
+        return cls(**raw, client=bind)
+
+    @classmethod
+    async def save_many(
+        cls,
+        contents: "Iterable[str] | AsyncIterable[str]",
+        site: Optional[str] = "https://pasty.lus.pm",
+        encrypt: bool = False,
+        concurrency: int = 8,
+        client: Optional[AsyncPastyClient] = None,
+    ) -> AsyncIterator[UploadRecord]:
+        """
+        Create many pastes concurrently, yielding records as uploads finish.
+
+        Contents are pulled from `contents` only as upload slots free up, so
+        memory stays flat for arbitrarily large inputs.
+
+        Args:
+            contents: Contents of the pastes to create, sync or async iterable
+            site: Pasty instance, default official
+            encrypt: Encrypt each paste before uploading
+            concurrency: Maximum simultaneous uploads
+            client: Client to use, default temporary client for `site` shared by the batch
+
+        Returns:
+            Async iterator of upload records in completion order
+        """
+
+        async def upload(content: str) -> tuple[str, str, Optional[str], str]:
+            paste = cls(content=content, client=c)
+            if encrypt:
+                await paste.encrypt_async(c.crypto_executor, c.crypto_threshold)
+            token = await paste.save(client=c)
+            return paste.id, token, paste.key, paste._site
+
+        async with _client_for(site, client) as c:
+            async for result in run_concurrent(upload, contents, concurrency):
+                yield UploadRecord.from_result(result)
+
+    @classmethod
+    async def delete_many(
+        cls,
+        ids: Iterable[str],
+        site: Optional[str] = "https://pasty.lus.pm",
+        concurrency: int = 8,
+        client: Optional[AsyncPastyClient] = None,
+        vault: Optional[TokenVault] = None,
+    ) -> list[BulkResult]:
+        """
+        Delete many pastes concurrently, looking up their tokens in a vault.
+
+        Args:
+            ids: IDs of pastes to delete
+            site: Target site, default official
+            concurrency: Maximum simultaneous requests
+            client: Client to use, default temporary client for `site` shared by the batch
+            vault: Vault holding the tokens, default the client's
+
+        Returns:
+            Results in input order, with the error for each failed ID
+
+        Raises:
+            ValueError: No vault given
+        """
+        vault = require_vault(vault, client.vault if client else None)
+        async with _client_for(site, client) as c:
+
+            async def delete(id: str) -> None:
+                site = await c.site_for(id)
+                await c.delete_paste(id, vault.require(site, id))
+                vault.discard(site, id)
+
+            return await gather_limited(delete, ids, concurrency)
+
+    @classmethod
+    async def edit_many(
+        cls,
+        edits: "Mapping[str, str] | Iterable[tuple[str, str]]",
+        site: Optional[str] = "https://pasty.lus.pm",
+        encrypt: bool = False,
+        concurrency: int = 8,
+        client: Optional[AsyncPastyClient] = None,
+        vault: Optional[TokenVault] = None,
+    ) -> list[BulkResult]:
+        """
+        Replace the content of many pastes concurrently, looking up their tokens in a vault.
+
+        Args:
+            edits: New content by paste ID, as a mapping or `(id, content)` pairs
+            site: Target site, default official
+            encrypt: Encrypt each new content with a fresh key
+            concurrency: Maximum simultaneous requests
+            client: Client to use, default temporary client for `site` shared by the batch
+            vault: Vault holding the tokens, default the client's
+
+        Returns:
+            Results in input order, with the new key (if encrypting) or the error for each ID
+
+        Raises:
+            ValueError: No vault given
+        """
+        vault = require_vault(vault, client.vault if client else None)
+        async with _client_for(site, client) as c:
+
+            async def edit(item: tuple[str, str]) -> Optional[str]:
+                id, content = item
+                paste = cls(content=content, client=c)
+                key = None
+                if encrypt:
+                    key = await paste.encrypt_async(c.crypto_executor, c.crypto_threshold)
+                token = vault.require(await c.site_for(id), id)
+                await c.edit_paste(id, token, paste._content, paste.metadata)
+                return key
+
+            pairs = edits.items() if isinstance(edits, Mapping) else edits
+            results = await gather_limited(edit, pairs, concurrency)
+        return [r._replace(item=r.item[0]) for r in results]
 
     @classmethod
-    async def report(cls, target: "Paste | str", reason: str, site: Optional[str] = "https://pasty.lus.pm") -> str:
+    async def stream(
+        cls,
+        id: str,
+        site: Optional[str] = "https://pasty.lus.pm",
+        key: Optional[str] = None,
+        client: Optional[AsyncPastyClient] = None,
+        chunk_size: int = 65536,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the content of a paste without holding all of it in memory.
+
+        Args:
+            id: ID of paste to get
+            site: Target site, default official
+            key: Hexlified decryption key, content is yielded as stored without it
+            client: Client to use, default temporary client for `site`
+            chunk_size: Bytes of response to read at a time
+
+        Returns:
+            Async iterator of content chunks
+
+        Raises:
+            ValueError: Malformed response or wrong key
+        """
+        stream = PasteStream(key)
+        async with _client_for(site, client) as c:
+            async for data in c.stream_paste(id, chunk_size):
+                for piece in stream.feed(data):
+                    yield piece
+        for piece in stream.close():
+            yield piece
+
+    @classmethod
+    async def save_stream(
+        cls,
+        chunks: "Iterable[str] | AsyncIterable[str]",
+        site: Optional[str] = "https://pasty.lus.pm",
+        encrypt: bool = False,
+        alg: "Algorithm | str | None" = None,
+        metadata: Optional[dict] = None,
+        client: Optional[AsyncPastyClient] = None,
+    ) -> UploadRecord:
+        """
+        Create a paste from content produced in pieces, without holding all of it in memory.
+
+        Args:
+            chunks: Paste content, in pieces, sync or async iterable
+            site: Pasty instance, default official
+            encrypt: Encrypt the content as it is sent
+            alg: Encryption algorithm or its name, default `AES-CBC`
+            metadata: Paste metadata
+            client: Client to use, default temporary client for `site`
+
+        Returns:
+            Upload record, with index 0
+
+        Raises:
+            ValueError: Unknown algorithm
+        """
+        key = None
+        metadata = metadata or {}
+        if encrypt:
+            metadata, encryptor, key = _stream_encryptor(metadata, alg)
+            if isinstance(chunks, AsyncIterable):
+                chunks = _encrypt_chunks_async(chunks, encryptor)
+            else:
+                chunks = _encrypt_chunks(chunks, encryptor)
+        async with _client_for(site, client) as c:
+            raw = await c.upload_paste(chunks, metadata)
+        return UploadRecord(0, raw["id"], raw["modificationToken"], key, None, raw["site"])
+
+    @classmethod
+    async def report(
+        cls,
+        target: "Paste | str",
+        reason: str,
+        site: Optional[str] = "https://pasty.lus.pm",
+        client: Optional[AsyncPastyClient] = None,
+    ) -> str:
         """
         Report a paste.
 
         Args:
             target: Paste or paste ID
             site: Target site, default official
+            client: Client to use, default temporary client for `site`
         """
         if isinstance(target, cls):
+            client = client or target._client
             target = target.id
 
-        endpoint = site + f"/api/v2/pastes/{target}/report"
-        async with ClientSession() as session:
-            resp = await session.get(endpoint)
-            if resp.status == 404:
-                return "This site does not support reporting"
-            resp.raise_for_status()
+        async with _client_for(site, client) as c:
+            return cls._reported(await c.report_paste(target, reason))
 
-            raw = await resp.json(content_type="text/plain")
+    def _crypto_options(
+        self, executor: Optional[Executor], threshold: Optional[int]
+    ) -> tuple[Optional[Executor], int]:
+        """Fill in crypto options from the bound client."""
+        if self._client is not None:
+            executor = executor or self._client.crypto_executor
+            if threshold is None:
+                threshold = self._client.crypto_threshold
+        return executor, CRYPTO_THRESHOLD if threshold is None else threshold
 
-        if not raw["success"]:
-            return f"Failed to report message: {raw['message']}"
+    async def encrypt_async(
+        self,
+        executor: Optional[Executor] = None,
+        threshold: Optional[int] = None,
+        alg: "Algorithm | str | None" = None,
+    ) -> str:
+        """
+        Encrypt a paste without blocking the event loop.
 
-        return f"Reported message: {raw['message']}"
+        Args:
+            executor: Thread or process pool to encrypt in, default the client's or the loop's
+            threshold: Content length from which to use the executor, default the client's
+            alg: Algorithm or its name, such as `AES-GCM`, default `AES-CBC`
+
+        Returns:
+            Hexlified key
 
-    async def save(self, site: Optional[str] = "https://pasty.lus.pm") -> str:
+        Raises:
+            ValueError: Cannot encrypt encrypted paste, or unknown algorithm
         """
-        Save a paste to the designated pasty instance
+        algorithm = get_algorithm(alg)
+        key, iv = self._encryption_params(algorithm)
+        executor, threshold = self._crypto_options(executor, threshold)
+        start = time.perf_counter()
+        ciphertext = await _run_crypto(
+            algorithm.encrypt, self._content, key, iv, executor, threshold
+        )
+        self._crypto_done("encrypt", len(self._content), start)
+        return self._encrypted(ciphertext, key, iv, algorithm)
+
+    async def decrypt_async(
+        self,
+        key: Optional[str] = None,
+        executor: Optional[Executor] = None,
+        threshold: Optional[int] = None,
+    ) -> bool:
+        """
+        Decrypt a paste without blocking the event loop.
 
         Args:
-            site: Pasty instance, default official
+            key: Decryption key
+            executor: Thread or process pool to decrypt in, default the client's or the loop's
+            threshold: Content length from which to use the executor, default the client's
 
         Returns:
-            Modification token
+            If decryption was successful
+
+        Raises:
+            ValueError: Wrong key, corrupted content or unknown algorithm
         """
-        if not self._site:
-            self._site = site
-        endpoint = self._site + "/api/v2/pastes"
+        if not self.encrypted:
+            return True
+        key, iv = self._decryption_params(key)
+        executor, threshold = self._crypto_options(executor, threshold)
+        start = time.perf_counter()
+        self._plaintext = await _run_crypto(
+            self.algorithm.decrypt, self._content, key, iv, executor, threshold
+        )
+        self._crypto_done("decrypt", len(self._content), start)
+        self._key = key
+        return True
 
-        payload = {
-            "content": self._content,
-            "metadata": self.metadata,
-        }
+    async def save(
+        self,
+        site: Optional[str] = "https://pasty.lus.pm",
+        client: Optional[AsyncPastyClient] = None,
+    ) -> str:
+        """
+        Save a paste to the designated pasty instance
 
-        async with ClientSession() as session:
-            resp = await session.post(endpoint, json=payload)
-            resp.raise_for_status()
-            raw = await resp.json(content_type="text/plain")
+        Args:
+            site: Pasty instance, default official
+            client: Client to use, default temporary client for `site`
 
-        self.id = raw["id"]
-        self.metadata = raw["metadata"]
-        self.created = raw["created"]
-        self._token = raw["modificationToken"]
+        Returns:
+            Modification token
+        """
+        self._client = client = client or self._client
+        async with _client_for(self._site or site, client) as c:
+            dedup, digest = c.dedup, self._dedup_digest(c.dedup)
+            if digest is not None:
+                entry = dedup.lookup(digest, c.sites)
+                if entry is not None and await self._dedup_reuse_async(dedup, digest, entry, c):
+                    return self._token
+            raw = await c.create_paste(self._content, self.metadata)
+        return self._saved(raw, dedup, digest)
 
-        return self._token
+    async def _dedup_reuse_async(
+        self, dedup: DedupIndex, digest: str, entry: DedupEntry, client: AsyncPastyClient
+    ) -> bool:
+        """Adopt an indexed paste, checking it is unchanged on its site if due."""
+        stored = None
+        checked = dedup.needs_check(entry)
+        if checked:
+            try:
+                stored = (await client.get_paste(entry.id, cached=False))["content"]
+            except ClientResponseError as e:
+                if not _not_found(e):
+                    raise
+        elif self.encrypted:
+            iv = bytes.fromhex(entry.metadata["pf_encryption"]["iv"])
+            stored = await _run_crypto(
+                self.algorithm.encrypt,
+                self._plaintext,
+                self._key,
+                iv,
+                client.crypto_executor,
+                client.crypto_threshold,
+            )
+        return self._dedup_adopt(dedup, digest, entry, checked, stored)
 
     async def edit(
         self,
         content: str,
         modification_token: Optional[str] = None,
         site: Optional[str] = "https://pasty.lus.pm",
+        client: Optional[AsyncPastyClient] = None,
+        reuse_key: bool = False,
     ) -> Optional[str]:
         """
-        Edit an existing paste.
+        Edit an existing paste in place.
+
+        Encrypted pastes are encrypted again with their algorithm and a fresh IV,
+        off the event loop for large contents.
 
         Args:
             content: New content
             modification_token: Modification token
             site: Pasty instance, default official
+            client: Client to use, default temporary client for `site`
+            reuse_key: Keep the current key so readers need no new one, instead of
+                generating one
 
         Returns:
-            New key if necessary
+            Hexlified key if encrypted
 
         Raises:
-            ValueError: Unsaved Paste or missing token
+            ValueError: Unsaved Paste, missing token, or key to reuse unknown
         """
-        site = self._site or site
-        endpoint = site + "/api/v2/pastes/"
-
-        if not self.id:
-            raise ValueError("Paste must be saved before editing")
+        token = self._modification_token(modification_token, "edit")
+        plan = self._plan_edit(content, reuse_key)
+        self._client = client = client or self._client
+        async with _client_for(self._site or site, client) as c:
+            return await self._send_edit(plan, token, c)
 
-        token = self._token or modification_token
-        if not token:
-            raise ValueError("Token required to edit Paste")
-
-        self._token = token
-        key = None
-        if self.encrypted:
-            _ = self.metadata.pop("pf_encryption")
-        new_p = AsyncPaste(
-            content=content,
-            id=self.id,
-            created=self.created,
-            metadata=self.metadata,
-            site=self._site,
-        )
-        if self.encrypted:
-            key = new_p.encrypt()
+    async def append(
+        self,
+        text: str,
+        modification_token: Optional[str] = None,
+        key: Optional[str] = None,
+        site: Optional[str] = "https://pasty.lus.pm",
+        client: Optional[AsyncPastyClient] = None,
+    ) -> Optional[str]:
+        """
+        Append to the content of an existing paste in place, keeping its key.
 
-        payload = {"content": new_p._content, "metadata": new_p.metadata}
+        AES-CBC pastes are extended by continuing the cipher chain from their last
+        block, so the unchanged content is not decrypted or encrypted again, and its
+        ciphertext (and so the IV) stays the same. Other algorithms must not reuse a
+        nonce, so their content is decrypted if not known and encrypted again once.
 
-        headers = {"Authorization": f"Bearer {token}"}
+        Args:
+            text: Text to append
+            modification_token: Modification token
+            key: Hexlified key, if not encrypted or decrypted locally
+            site: Pasty instance, default official
+            client: Client to use, default temporary client for `site`
 
-        async with ClientSession(headers=headers) as session:
-            resp = await session.patch(endpoint + self.id, json=payload, headers=headers)
-            resp.raise_for_status()
+        Returns:
+            Hexlified key if encrypted
 
-        self._content = new_p._content
-        self._plaintext = new_p._plaintext
-        self._key = new_p._key
-        self.metadata = new_p.metadata
+        Raises:
+            ValueError: Unsaved Paste, missing token or key, or wrong key
+        """
+        token = self._modification_token(modification_token, "edit")
+        self._client = client = client or self._client
+        async with _client_for(self._site or site, client) as c:
+            if self.encrypted and self.algorithm.append is None and self._plaintext is None:
+                await self.decrypt_async(key, c.crypto_executor, c.crypto_threshold)
+            return await self._send_edit(self._plan_append(text, key), token, c)
 
-        return key  # noqa: R504
+    async def _send_edit(self, plan: _Edit, token: str, client: AsyncPastyClient) -> Optional[str]:
+        """Encrypt and send a planned edit, then apply it."""
+        content = plan.data
+        if plan.encrypt is not None:
+            executor, threshold = self._crypto_options(
+                client.crypto_executor, client.crypto_threshold
+            )
+            start = time.perf_counter()
+            content = await _run_crypto(
+                plan.encrypt, plan.data, plan.key, plan.iv, executor, threshold
+            )
+            self._crypto_done("encrypt", len(plan.data), start)
+        await client.edit_paste(self.id, token, content, plan.metadata)
+        return self._edited(content, plan)
 
     async def delete(
-        self, modification_token: Optional[str] = None, site: Optional[str] = "https://pasty.lus.pm"
+        self,
+        modification_token: Optional[str] = None,
+        site: Optional[str] = "https://pasty.lus.pm",
+        client: Optional[AsyncPastyClient] = None,
     ) -> None:
         """
         Delete a paste.
@@ -151,24 +1355,12 @@ class AsyncPaste(Paste):
         Args:
             modification_token: Modification token
             site: Pasty instance, default official
+            client: Client to use, default temporary client for `site`
 
         Raises:
             ValueError: Unsaved Paste or missing token
         """
-        site = self._site or site
-        endpoint = site + "/api/v2/pastes/"
-
-        if not self.id:
-            raise ValueError("Paste must be saved before deleting")
-
-        token = self._token or modification_token
-        if not token:
-            raise ValueError("Token required to delete Paste")
-
-        self._token = token
-
-        headers = {"Authorization": f"Bearer {token}"}
-
-        async with ClientSession(headers=headers) as session:
-            resp = await session.delete(endpoint + self.id, headers=headers)
-            resp.raise_for_status()
+        token = self._modification_token(modification_token, "delete")
+        self._client = client = client or self._client
+        async with _client_for(self._site or site, client) as c:
+            await c.delete_paste(self.id, token)
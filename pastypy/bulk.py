@@ -0,0 +1,196 @@
+"""Helpers for bulk paste operations."""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+)
+
+
+class BulkResult(NamedTuple):
+    """
+    Outcome of a single item in a bulk operation.
+
+    Attributes:
+        index: Position of the item in the input
+        item: Input item, usually a paste ID
+        value: Return value of the operation, `None` on failure
+        error: Exception raised by the operation, `None` on success
+    """
+
+    index: int
+    item: Any
+    value: Any
+    error: Optional[Exception]
+
+    @property
+    def ok(self) -> bool:
+        """If the operation succeeded."""
+        return self.error is None
+
+
+class UploadRecord(NamedTuple):
+    """
+    Outcome of a single upload in a bulk save.
+
+    Attributes:
+        index: Position of the content in the input
+        id: ID of the new paste, `None` on failure
+        modification_token: Modification token of the new paste, `None` on failure
+        key: Hexlified key if the paste was encrypted
+        error: Exception raised while uploading, `None` on success
+        site: Pasty instance the paste was created on, `None` on failure
+    """
+
+    index: int
+    id: Optional[str]
+    modification_token: Optional[str]
+    key: Optional[str]
+    error: Optional[Exception]
+    site: Optional[str] = None
+
+    @classmethod
+    def from_result(cls, result: BulkResult) -> "UploadRecord":
+        """Build a record from a BulkResult holding an `(id, token, key, site)` value."""
+        id, token, key, site = result.value or (None, None, None, None)
+        return cls(result.index, id, token, key, result.error, site)
+
+    @property
+    def url(self) -> Optional[str]:
+        """URL of the new paste, with the key as fragment if encrypted, `None` on failure."""
+        if self.id is None:
+            return None
+        url = f"{self.site}/{self.id}"
+        return f"{url}#{self.key}" if self.key else url
+
+    @property
+    def ok(self) -> bool:
+        """If the upload succeeded."""
+        return self.error is None
+
+
+def run_threaded(
+    func: Callable[[Any], Any], items: Iterable, max_workers: int = 8
+) -> Iterator[BulkResult]:
+    """
+    Run `func` over `items` in a thread pool, yielding results as they complete.
+
+    Items are pulled lazily, with at most `max_workers * 2` submitted at a time,
+    so arbitrarily long inputs run in constant memory.
+
+    Args:
+        func: Operation to run on each item
+        items: Input items
+        max_workers: Number of worker threads
+
+    Returns:
+        Iterator of results in completion order
+    """
+    items = enumerate(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {}
+
+        def submit(count: int) -> None:
+            for index, item in islice(items, count):
+                pending[pool.submit(func, item)] = (index, item)
+
+        submit(max_workers * 2)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, item = pending.pop(future)
+                error = future.exception()
+                value = None if error else future.result()
+                yield BulkResult(index, item, value, error)
+            submit(len(done))
+
+
+async def _capture(index: int, item: Any, awaitable: Awaitable) -> BulkResult:
+    try:
+        return BulkResult(index, item, await awaitable, None)
+    except Exception as e:
+        return BulkResult(index, item, None, e)
+
+
+async def gather_limited(
+    func: Callable[[Any], Awaitable], items: Iterable, concurrency: int = 8
+) -> list[BulkResult]:
+    """
+    Run `func` over `items` with at most `concurrency` calls in flight.
+
+    Args:
+        func: Coroutine function to run on each item
+        items: Input items
+        concurrency: Maximum simultaneous calls
+
+    Returns:
+        Results in input order
+    """
+    import asyncio
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(item: Any) -> Any:
+        async with semaphore:
+            return await func(item)
+
+    return list(
+        await asyncio.gather(*(_capture(i, item, limited(item)) for i, item in enumerate(items)))
+    )
+
+
+async def _as_async(items: Iterable) -> AsyncIterator:
+    for item in items:
+        yield item
+
+
+async def run_concurrent(
+    func: Callable[[Any], Awaitable],
+    items: "Iterable | AsyncIterable",
+    concurrency: int = 8,
+) -> AsyncIterator[BulkResult]:
+    """
+    Run `func` over `items` with bounded concurrency, yielding results as they complete.
+
+    Items are pulled lazily, with at most `concurrency` calls in flight, so
+    arbitrarily long inputs run in constant memory.
+
+    Args:
+        func: Coroutine function to run on each item
+        items: Input items, sync or async iterable
+        concurrency: Maximum simultaneous calls
+
+    Returns:
+        Async iterator of results in completion order
+    """
+    import asyncio
+
+    source = aiter(items) if isinstance(items, AsyncIterable) else _as_async(items)
+    index = 0
+    pending: set[asyncio.Task] = set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    item = await anext(source)
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(_capture(index, item, func(item))))
+                index += 1
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,474 @@
+"""Paste caches."""
+from collections import OrderedDict
+from copy import deepcopy
+import json
+import os
+from threading import Lock
+import time
+from typing import NamedTuple, Optional
+
+
+class CacheEntry(NamedTuple):
+    """
+    Cached paste payload.
+
+    Attributes:
+        raw: Raw paste payload
+        etag: `ETag` the server sent with the payload
+        last_modified: `Last-Modified` the server sent with the payload
+        expires: Timestamp after which the entry must be revalidated
+    """
+
+    raw: dict
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires: float
+
+    @property
+    def fresh(self) -> bool:
+        """If the entry can be used without revalidation."""
+        return self.expires > time.time()
+
+    @property
+    def validators(self) -> dict[str, str]:
+        """Conditional request headers to revalidate the entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def payload(self) -> dict:
+        """Get a copy of the payload that callers are free to mutate."""
+        return copy_payload(self.raw)
+
+
+def copy_payload(raw: dict) -> dict:
+    """Copy a raw paste payload deeply enough for callers to mutate it."""
+    return {**raw, "metadata": deepcopy(raw.get("metadata") or {})}
+
+
+class CacheStats:
+    def __init__(self):
+        """Cache counters."""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__}: hits={self.hits}, misses={self.misses}, "
+            f"evictions={self.evictions}, revalidations={self.revalidations}>"
+        )
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served without a full download."""
+        lookups = self.hits + self.misses
+        return (self.hits + self.revalidations) / lookups if lookups else 0.0
+
+
+class PasteCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        """
+        In-memory LRU cache of paste payloads, safe to share between threads and clients.
+
+        Args:
+            maxsize: Maximum number of pastes kept
+            ttl: Seconds an entry is served before it is revalidated
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: OrderedDict[tuple[str, str], CacheEntry] = OrderedDict()
+        self._lock = Lock()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: size={len(self)}, maxsize={self.maxsize}>"
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, site: str, id: str) -> Optional[CacheEntry]:
+        """
+        Look up a paste.
+
+        Stale entries are still returned so they can be revalidated, but count as misses.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+
+        Returns:
+            Cached entry, if any
+        """
+        with self._lock:
+            entry = self._entries.get((site, id))
+            if entry is not None:
+                self._entries.move_to_end((site, id))
+            if entry is not None and entry.fresh:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+        return entry
+
+    def set(
+        self,
+        site: str,
+        id: str,
+        raw: dict,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        expires: Optional[float] = None,
+    ) -> None:
+        """
+        Store a paste.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+            raw: Raw paste payload
+            etag: `ETag` response header
+            last_modified: `Last-Modified` response header
+            expires: Expiry timestamp, default `ttl` seconds from now
+        """
+        raw = copy_payload(raw)
+        expires = time.time() + self.ttl if expires is None else expires
+        entry = CacheEntry(raw, etag, last_modified, expires)
+        with self._lock:
+            self._entries[(site, id)] = entry
+            self._entries.move_to_end((site, id))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def revalidated(self, site: str, id: str) -> Optional[CacheEntry]:
+        """
+        Mark an entry as confirmed unchanged by the server.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+
+        Returns:
+            Refreshed entry, if still cached
+        """
+        with self._lock:
+            entry = self._entries.get((site, id))
+            if entry is None:
+                return None
+            entry = self._entries[(site, id)] = entry._replace(expires=time.time() + self.ttl)
+            self.stats.revalidations += 1
+        return entry
+
+    def invalidate(self, site: str, id: str) -> None:
+        """
+        Drop a paste.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+        """
+        with self._lock:
+            self._entries.pop((site, id), None)
+
+    def clear(self) -> None:
+        """Drop every paste."""
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskPasteCache:
+    def __init__(
+        self,
+        directory: "str | os.PathLike",
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: float = 3600.0,
+    ):
+        """
+        SQLite-backed paste cache, safe to share between threads and processes.
+
+        Args:
+            directory: Directory holding the cache database, created if missing
+            max_bytes: Maximum total size of cached payloads
+            ttl: Seconds an entry is served before it is revalidated
+        """
+        import sqlite3
+
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "pastes.sqlite3")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pastes ("
+                "site TEXT NOT NULL, id TEXT NOT NULL, raw TEXT NOT NULL, etag TEXT, "
+                "last_modified TEXT, expires REAL NOT NULL, accessed REAL NOT NULL, "
+                "size INTEGER NOT NULL, PRIMARY KEY (site, id))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS pastes_accessed ON pastes (accessed)")
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: path={self.path}, max_bytes={self.max_bytes}>"
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM pastes").fetchone()[0]
+
+    @property
+    def size(self) -> int:
+        """Total size of cached payloads in bytes."""
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pastes").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+    def get(self, site: str, id: str) -> Optional[CacheEntry]:
+        """
+        Look up a paste.
+
+        Stale entries are still returned so they can be revalidated, but count as misses.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+
+        Returns:
+            Cached entry, if any
+        """
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT raw, etag, last_modified, expires FROM pastes WHERE site = ? AND id = ?",
+                (site, id),
+            ).fetchone()
+            if row is not None:
+                self._db.execute(
+                    "UPDATE pastes SET accessed = ? WHERE site = ? AND id = ?",
+                    (time.time(), site, id),
+                )
+        entry = None if row is None else CacheEntry(json.loads(row[0]), *row[1:])
+        with self._lock:
+            if entry is not None and entry.fresh:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+        return entry
+
+    def set(
+        self,
+        site: str,
+        id: str,
+        raw: dict,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        expires: Optional[float] = None,
+    ) -> None:
+        """
+        Store a paste, evicting least recently used pastes over `max_bytes`.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+            raw: Raw paste payload
+            etag: `ETag` response header
+            last_modified: `Last-Modified` response header
+            expires: Expiry timestamp, default `ttl` seconds from now
+        """
+        data = json.dumps(raw)
+        now = time.time()
+        expires = now + self.ttl if expires is None else expires
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pastes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (site, id, data, etag, last_modified, expires, now, len(data)),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used pastes until under `max_bytes`. Caller holds the lock."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pastes").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT site, id, size FROM pastes ORDER BY accessed")
+        victims = []
+        for site, id, size in rows:
+            if total <= self.max_bytes:
+                break
+            victims.append((site, id))
+            total -= size
+        self._db.executemany("DELETE FROM pastes WHERE site = ? AND id = ?", victims)
+        self.stats.evictions += len(victims)
+
+    def revalidated(self, site: str, id: str) -> Optional[CacheEntry]:
+        """
+        Mark an entry as confirmed unchanged by the server.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+
+        Returns:
+            Refreshed entry, if still cached
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE pastes SET expires = ? WHERE site = ? AND id = ?",
+                (time.time() + self.ttl, site, id),
+            )
+            row = self._db.execute(
+                "SELECT raw, etag, last_modified, expires FROM pastes WHERE site = ? AND id = ?",
+                (site, id),
+            ).fetchone()
+            if row is None:
+                return None
+            self.stats.revalidations += 1
+        return CacheEntry(json.loads(row[0]), *row[1:])
+
+    def invalidate(self, site: str, id: str) -> None:
+        """
+        Drop a paste.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+        """
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM pastes WHERE site = ? AND id = ?", (site, id))
+
+    def clear(self) -> None:
+        """Drop every paste."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM pastes")
+
+    def compact(self) -> int:
+        """
+        Drop expired pastes, enforce `max_bytes` and reclaim free space on disk.
+
+        Returns:
+            Number of pastes dropped
+        """
+        with self._lock:
+            with self._db:
+                dropped = self._db.execute(
+                    "DELETE FROM pastes WHERE expires <= ?", (time.time(),)
+                ).rowcount
+                evictions = self.stats.evictions
+                self._evict()
+                dropped += self.stats.evictions - evictions
+            self._db.execute("VACUUM")
+        return dropped
+
+
+class TieredCache:
+    def __init__(self, memory: PasteCache, disk: DiskPasteCache):
+        """
+        In-memory cache in front of a disk cache.
+
+        Lookups check memory first and promote disk hits into memory; writes and
+        invalidations go to both.
+
+        Args:
+            memory: In-process cache
+            disk: Shared disk cache
+        """
+        self.memory = memory
+        self.disk = disk
+        self.stats = CacheStats()
+        self._lock = Lock()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: memory={self.memory}, disk={self.disk}>"
+
+    def __len__(self):
+        return len(self.disk)
+
+    def get(self, site: str, id: str) -> Optional[CacheEntry]:
+        """
+        Look up a paste.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+
+        Returns:
+            Cached entry, if any
+        """
+        entry = self.memory.get(site, id)
+        if entry is None or not entry.fresh:
+            disk_entry = self.disk.get(site, id)
+            if disk_entry is not None:
+                entry = disk_entry
+                self.memory.set(site, id, *entry)
+        with self._lock:
+            if entry is not None and entry.fresh:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+        return entry
+
+    def set(
+        self,
+        site: str,
+        id: str,
+        raw: dict,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        expires: Optional[float] = None,
+    ) -> None:
+        """
+        Store a paste in both tiers.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+            raw: Raw paste payload
+            etag: `ETag` response header
+            last_modified: `Last-Modified` response header
+            expires: Expiry timestamp, default each tier's own TTL
+        """
+        self.memory.set(site, id, raw, etag, last_modified, expires)
+        self.disk.set(site, id, raw, etag, last_modified, expires)
+
+    def revalidated(self, site: str, id: str) -> Optional[CacheEntry]:
+        """
+        Mark an entry as confirmed unchanged by the server in both tiers.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+
+        Returns:
+            Refreshed entry, if still cached
+        """
+        entry = self.disk.revalidated(site, id)
+        memory_entry = self.memory.revalidated(site, id)
+        if entry is None and memory_entry is None:
+            return None
+        with self._lock:
+            self.stats.revalidations += 1
+        return memory_entry or entry
+
+    def invalidate(self, site: str, id: str) -> None:
+        """
+        Drop a paste from both tiers.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+        """
+        self.memory.invalidate(site, id)
+        self.disk.invalidate(site, id)
+
+    def clear(self) -> None:
+        """Drop every paste from both tiers."""
+        self.memory.clear()
+        self.disk.clear()
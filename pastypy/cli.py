@@ -0,0 +1,255 @@
+"""Command-line interface.
+
+Many files or pastes are handled at once over one pooled client per site, and
+contents are streamed rather than read whole.
+
+    pastypy put notes.txt build.log         # one URL per file, in argument order
+    make 2>&1 | pastypy put --encrypt       # URL#key of an encrypted paste
+    pastypy get ID https://site/ID#KEY      # contents in argument order
+    pastypy get -o downloads ID1 ID2 ID3    # one file per paste
+"""
+import argparse
+import codecs
+from functools import partial
+import os
+import sys
+from tempfile import SpooledTemporaryFile
+from typing import IO, Callable, Iterable, Iterator, Optional, Sequence
+from urllib.parse import urlsplit
+
+from pastypy import __version__
+from pastypy.bulk import BulkResult, UploadRecord, run_threaded
+from pastypy.crypto import ALGORITHMS, DEFAULT_ALGORITHM
+from pastypy.sync import Paste, PastyClient
+
+DEFAULT_SITE = "https://pasty.lus.pm"
+BLOCK_SIZE = 64 * 1024
+SPOOL_SIZE = 1024 * 1024
+
+Target = tuple[str, str, Optional[str]]
+
+
+def read_text(stream: IO[bytes], size: int = BLOCK_SIZE) -> Iterator[str]:
+    """
+    Read a binary stream as UTF-8 text, a block at a time.
+
+    Args:
+        stream: Binary stream, such as `sys.stdin.buffer`
+        size: Bytes to read at a time
+
+    Returns:
+        Iterator of text pieces
+
+    Raises:
+        UnicodeDecodeError: Stream is not UTF-8
+    """
+    decoder = codecs.getincrementaldecoder("UTF-8")()
+    for block in iter(partial(stream.read, size), b""):
+        yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
+
+
+def parse_target(target: str, site: str) -> Target:
+    """
+    Split a paste reference into site, ID and key.
+
+    Args:
+        target: `ID`, `ID#KEY` or a paste URL, with the key as fragment if encrypted
+        site: Site of bare IDs
+
+    Returns:
+        Site, paste ID and hexlified key or `None`
+    """
+    target, _, key = target.partition("#")
+    if "://" in target:
+        url = urlsplit(target)
+        prefix, _, target = url.path.rstrip("/").rpartition("/")
+        site = f"{url.scheme}://{url.netloc}{prefix}"
+    return site.rstrip("/"), target, key or None
+
+
+def _in_order(results: Iterable[BulkResult]) -> Iterator[BulkResult]:
+    """Put results arriving in completion order back in input order."""
+    waiting: dict[int, BulkResult] = {}
+    index = 0
+    for result in results:
+        waiting[result.index] = result
+        while index in waiting:
+            yield waiting.pop(index)
+            index += 1
+
+
+def _fail(item: str, error: BaseException) -> None:
+    sys.stderr.write(f"pastypy: {item}: {error}\n")
+
+
+def _upload(source: str, args: argparse.Namespace, client: PastyClient) -> UploadRecord:
+    """Upload a file, or standard input for `-`, without reading it whole."""
+    if source == "-":
+        return _save(sys.stdin.buffer, args, client)
+    with open(source, "rb") as f:
+        return _save(f, args, client)
+
+
+def _save(stream: IO[bytes], args: argparse.Namespace, client: PastyClient) -> UploadRecord:
+    return Paste.save_stream(
+        read_text(stream, args.block_size),
+        encrypt=args.encrypt,
+        alg=args.algorithm,
+        client=client,
+    )
+
+
+def put(args: argparse.Namespace) -> int:
+    """Upload files, printing one URL per file in argument order."""
+    sources = args.files or ["-"]
+    if sources.count("-") > 1:
+        _fail("-", ValueError("standard input can only be uploaded once"))
+        return 2
+    status = 0
+    with PastyClient(args.site, pool_size=args.jobs) as client:
+        results = run_threaded(lambda s: _upload(s, args, client), sources, args.jobs)
+        for result in _in_order(results):
+            if not result.ok:
+                _fail(result.item, result.error)
+                status = 1
+                continue
+            record = result.value
+            line = f"{record.url}\t{record.modification_token}" if args.tokens else record.url
+            print(line, flush=True)  # noqa: T201
+    return status
+
+
+def _stream_to(sink: IO[bytes], target: Target, clients: dict[str, PastyClient]) -> None:
+    site, id, key = target
+    for chunk in Paste.stream(id, key=key, client=clients[site]):
+        sink.write(chunk.encode("UTF-8"))
+
+
+def _download_file(target: Target, directory: str, clients: dict[str, PastyClient]) -> str:
+    """Stream a paste into a file named after its ID, removing it on failure."""
+    path = os.path.join(directory, target[1])
+    try:
+        with open(path, "wb") as f:
+            _stream_to(f, target, clients)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _download_spooled(target: Target, clients: dict[str, PastyClient]) -> IO[bytes]:
+    """Stream a paste into a temporary file, in memory until it grows large."""
+    spool = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    try:
+        _stream_to(spool, target, clients)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def get(args: argparse.Namespace) -> int:
+    """
+    Download pastes to standard output in argument order, or into a directory.
+
+    A single paste is streamed straight to standard output. With several, each is
+    spooled while downloading so outputs do not interleave.
+    """
+    targets = [parse_target(target, args.site) for target in args.targets]
+    clients = {site: PastyClient(site, pool_size=args.jobs) for site, _, _ in targets}
+    out = sys.stdout.buffer
+    status = 0
+    try:
+        if len(targets) == 1 and not args.output:
+            try:
+                _stream_to(out, targets[0], clients)
+            except Exception as e:
+                _fail(args.targets[0], e)
+                return 1
+            out.flush()
+            return 0
+
+        worker: Callable[[Target], "str | IO[bytes]"]
+        if args.output:
+            os.makedirs(args.output, exist_ok=True)
+            worker = partial(_download_file, directory=args.output, clients=clients)
+        else:
+            worker = partial(_download_spooled, clients=clients)
+        for result in _in_order(run_threaded(worker, targets, args.jobs)):
+            if not result.ok:
+                _fail(args.targets[result.index], result.error)
+                status = 1
+            elif args.output:
+                print(result.value, flush=True)  # noqa: T201
+            else:
+                with result.value as spool:
+                    for block in iter(partial(spool.read, BLOCK_SIZE), b""):
+                        out.write(block)
+                out.flush()
+    finally:
+        for client in clients.values():
+            client.close()
+    return status
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--site",
+        default=os.environ.get("PASTYPY_SITE", DEFAULT_SITE),
+        help="pasty instance, default $PASTYPY_SITE or the official one",
+    )
+    common.add_argument(
+        "-j", "--jobs", type=int, default=8, help="pastes transferred at once (default 8)"
+    )
+    parser = argparse.ArgumentParser(prog="pastypy", description="Upload and download pastes.")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    put_parser = commands.add_parser("put", parents=[common], help="upload files or standard input")
+    put_parser.add_argument("files", nargs="*", help="files to upload, - or none for stdin")
+    put_parser.add_argument(
+        "-e", "--encrypt", action="store_true", help="encrypt, printing URL#key"
+    )
+    put_parser.add_argument(
+        "-a",
+        "--algorithm",
+        default=DEFAULT_ALGORITHM,
+        choices=list(ALGORITHMS),
+        help=f"encryption algorithm (default {DEFAULT_ALGORITHM})",
+    )
+    put_parser.add_argument(
+        "-t", "--tokens", action="store_true", help="print modification tokens after URLs"
+    )
+    put_parser.add_argument(
+        "--block-size", type=int, default=BLOCK_SIZE, help="bytes read at a time"
+    )
+    put_parser.set_defaults(func=put)
+
+    get_parser = commands.add_parser("get", parents=[common], help="download pastes")
+    get_parser.add_argument("targets", nargs="+", help="paste IDs or URLs, as ID#KEY if encrypted")
+    get_parser.add_argument(
+        "-o", "--output", metavar="DIR", help="write each paste to DIR/ID instead of stdout"
+    )
+    get_parser.set_defaults(func=get)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Run the command-line interface.
+
+    Args:
+        argv: Arguments, default `sys.argv[1:]`
+
+    Returns:
+        Exit status
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    return args.func(args)
@@ -0,0 +1,147 @@
+"""Request body compression."""
+import gzip
+from typing import Callable, NamedTuple, Optional
+
+
+class Codec(NamedTuple):
+    """
+    HTTP content coding.
+
+    Attributes:
+        name: Content-Encoding token
+        compress: Compress a body
+        decompress: Decompress a body
+    """
+
+    name: str
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+def _gzip() -> Codec:
+    return Codec(
+        "gzip", lambda data: gzip.compress(data, compresslevel=6, mtime=0), gzip.decompress
+    )
+
+
+def _brotli() -> Codec:
+    try:
+        import brotli
+    except ImportError:
+        import brotlicffi as brotli
+
+    return Codec("br", lambda data: brotli.compress(data, quality=5), brotli.decompress)
+
+
+def _zstd() -> Codec:
+    import zstandard
+
+    compressor = zstandard.ZstdCompressor(level=3)
+    return Codec("zstd", compressor.compress, zstandard.ZstdDecompressor().decompress)
+
+
+CODECS: dict[str, Callable[[], Codec]] = {"zstd": _zstd, "br": _brotli, "gzip": _gzip}
+
+COMPRESSION_THRESHOLD = 1024
+
+
+def get_codec(codec: "Codec | str") -> Codec:
+    """
+    Get a content coding.
+
+    Args:
+        codec: Codec or its Content-Encoding token
+
+    Returns:
+        Codec
+
+    Raises:
+        ValueError: Unknown coding
+        ImportError: Library for the coding not installed
+    """
+    if isinstance(codec, Codec):
+        return codec
+    if codec not in CODECS:
+        raise ValueError(f"Unknown content coding {codec!r}, expected one of {list(CODECS)}")
+    return CODECS[codec]()
+
+
+def available() -> list[str]:
+    """Get the content codings usable here, best first."""
+    names = []
+    for name, factory in CODECS.items():
+        try:
+            factory()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+class RequestCompressor:
+    def __init__(self, codec: "Codec | str | None", threshold: int = COMPRESSION_THRESHOLD):
+        """
+        Compress request bodies, backing off for servers that reject them.
+
+        A server that answers a compressed request with 415 Unsupported Media Type
+        is assumed not to support request compression, and later requests are sent
+        uncompressed. One that answers 400 Bad Request gets the request again
+        uncompressed, and compression is only disabled if that one goes through,
+        since the request itself may be what is wrong.
+
+        Args:
+            codec: Codec or its Content-Encoding token, `None` to disable
+            threshold: Minimum body size in bytes worth compressing
+        """
+        self.codec: Optional[Codec] = get_codec(codec) if codec else None
+        self.threshold = threshold
+        self.supported = True
+
+    def __repr__(self):
+        name = self.codec.name if self.codec else None
+        return f"<{self.__class__.__name__}: codec={name}, supported={self.supported}>"
+
+    def compress(self, data: bytes, headers: dict[str, str]) -> tuple[bytes, dict[str, str]]:
+        """
+        Compress a request body if worthwhile.
+
+        Args:
+            data: Request body
+            headers: Request headers
+
+        Returns:
+            Body and headers to send
+        """
+        if not self.codec or not self.supported or len(data) < self.threshold:
+            return data, headers
+        return self.codec.compress(data), {**headers, "Content-Encoding": self.codec.name}
+
+    def rejected(self, status: int, headers: dict[str, str]) -> bool:
+        """
+        Check if a compressed request may have been rejected for its compression.
+
+        A 415 disables compression at once; after a 400, call `plain_accepted` with
+        the status of the uncompressed request.
+
+        Args:
+            status: Response status
+            headers: Headers the request was sent with
+
+        Returns:
+            If the request should be sent again uncompressed
+        """
+        if status not in (400, 415) or "Content-Encoding" not in headers:
+            return False
+        if status == 415:
+            self.supported = False
+        return True
+
+    def plain_accepted(self, status: int) -> None:
+        """
+        Disable compression if a request rejected with 400 went through uncompressed.
+
+        Args:
+            status: Response status of the uncompressed request
+        """
+        if status < 400:
+            self.supported = False
@@ -0,0 +1,535 @@
+"""Paste encryption."""
+import codecs
+from functools import partial
+from typing import Any, Callable, NamedTuple, Optional
+
+BLOCK_SIZE = 16
+NONCE_SIZE = 12
+TAG_SIZE = 16
+CHUNK_SIZE = 1024 * 1024
+
+
+def _cbc(key: bytes, iv: bytes) -> Any:
+    """Create an AES-CBC cipher, importing pycryptodome on first use."""
+    from Crypto.Cipher import AES
+
+    return AES.new(key, AES.MODE_CBC, iv)
+
+
+def _aead(alg: str, key: bytes, nonce: bytes) -> Any:
+    """Create an AES-GCM or ChaCha20-Poly1305 cipher, importing pycryptodome on first use."""
+    if alg == "AES-GCM":
+        from Crypto.Cipher import AES
+
+        return AES.new(key, AES.MODE_GCM, nonce=nonce, mac_len=TAG_SIZE)
+    from Crypto.Cipher import ChaCha20_Poly1305
+
+    return ChaCha20_Poly1305.new(key=key, nonce=nonce)
+
+
+def _encode(plaintext: str, chunk_size: Optional[int]) -> bytearray:
+    """Encode text into a fresh buffer, a chunk at a time if `chunk_size` is set."""
+    if chunk_size is None:
+        return bytearray(plaintext, "UTF-8")
+    buffer = bytearray()
+    for start in range(0, len(plaintext), chunk_size):
+        buffer += plaintext[start : start + chunk_size].encode("UTF-8")
+    return buffer
+
+
+def _padding(buffer: "bytearray | memoryview") -> int:
+    """Get the length of the PKCS#7 padding at the end of `buffer`."""
+    length = buffer[-1] if buffer else 0
+    if not 0 < length <= BLOCK_SIZE or any(b != length for b in buffer[-length:]):
+        raise ValueError("Padding is incorrect.")
+    return length
+
+
+def encrypt_cbc(plaintext: str, key: bytes, iv: bytes, chunk_size: Optional[int] = None) -> str:
+    """
+    Encrypt text with AES-CBC and PKCS#7 padding.
+
+    The plaintext is encoded straight into a bytearray that is padded and
+    encrypted in place, so the only full-size copies are that buffer and the
+    returned hex string.
+
+    Args:
+        plaintext: Text to encrypt
+        key: AES key
+        iv: Initialization vector
+        chunk_size: Work in chunks of this many bytes so other threads can run in
+            between, at the cost of one extra transient copy of the output
+
+    Returns:
+        Hex ciphertext
+    """
+    buffer = _encode(plaintext, chunk_size)
+    padding = BLOCK_SIZE - len(buffer) % BLOCK_SIZE
+    buffer.extend(bytes((padding,)) * padding)
+    cipher = _cbc(key, iv)
+    if chunk_size is None:
+        cipher.encrypt(buffer, output=buffer)
+        return buffer.hex()
+
+    chunk_size -= chunk_size % BLOCK_SIZE
+    chunks = []
+    with memoryview(buffer) as view:
+        for start in range(0, len(buffer), chunk_size):
+            chunk = view[start : start + chunk_size]
+            cipher.encrypt(chunk, output=chunk)
+            chunks.append(chunk.hex())
+            chunk.release()
+    del buffer
+    return "".join(chunks)
+
+
+def decrypt_cbc(ciphertext: str, key: bytes, iv: bytes, chunk_size: Optional[int] = None) -> str:
+    """
+    Decrypt hex AES-CBC ciphertext with PKCS#7 padding.
+
+    The ciphertext is decoded into a bytearray that is decrypted in place and
+    decoded to text through a memoryview, without intermediate copies.
+
+    Args:
+        ciphertext: Hex ciphertext
+        key: AES key
+        iv: Initialization vector
+        chunk_size: Work in chunks of this many bytes so other threads can run in between
+
+    Returns:
+        Plaintext
+
+    Raises:
+        ValueError: Wrong key or corrupted ciphertext
+    """
+    if len(ciphertext) % 2:
+        raise ValueError("Ciphertext length is not a multiple of the block size")
+    cipher = _cbc(key, iv)
+    if chunk_size is None:
+        buffer = bytearray.fromhex(ciphertext)
+    else:
+        buffer = bytearray(len(ciphertext) // 2)
+    if not buffer or len(buffer) % BLOCK_SIZE:
+        raise ValueError("Ciphertext length is not a multiple of the block size")
+
+    with memoryview(buffer) as view:
+        if chunk_size is None:
+            cipher.decrypt(buffer, output=buffer)
+        else:
+            chunk_size -= chunk_size % BLOCK_SIZE
+            for start in range(0, len(buffer), chunk_size):
+                chunk = view[start : start + chunk_size]
+                chunk[:] = bytes.fromhex(ciphertext[start * 2 : (start + chunk_size) * 2])
+                cipher.decrypt(chunk, output=chunk)
+                chunk.release()
+        return str(view[: len(buffer) - _padding(view)], "UTF-8")
+
+
+def append_cbc(
+    ciphertext: str, text: str, key: bytes, iv: bytes, chunk_size: Optional[int] = None
+) -> str:
+    """
+    Extend hex AES-CBC ciphertext with more plaintext, continuing the cipher chain.
+
+    Only the last block is decrypted, to strip its padding, and encrypted again with
+    the new text. The result is exactly what encrypting the whole plaintext would
+    give, without decoding or encrypting the unchanged content.
+
+    Args:
+        ciphertext: Hex ciphertext to extend
+        text: Plaintext to append
+        key: AES key
+        iv: Initialization vector the ciphertext was made with
+        chunk_size: Encode `text` in chunks of this many characters
+
+    Returns:
+        Hex ciphertext of the combined plaintext
+
+    Raises:
+        ValueError: Wrong key or corrupted ciphertext
+    """
+    hex_block = BLOCK_SIZE * 2
+    if not ciphertext or len(ciphertext) % hex_block:
+        raise ValueError("Ciphertext length is not a multiple of the block size")
+    chain = (
+        bytes.fromhex(ciphertext[-2 * hex_block : -hex_block])
+        if len(ciphertext) > hex_block
+        else iv
+    )
+    last = bytearray.fromhex(ciphertext[-hex_block:])
+    _cbc(key, chain).decrypt(last, output=last)
+    del last[BLOCK_SIZE - _padding(last) :]
+
+    last += _encode(text, chunk_size)
+    padding = BLOCK_SIZE - len(last) % BLOCK_SIZE
+    last.extend(bytes((padding,)) * padding)
+    with memoryview(last) as view:
+        _cbc(key, chain).encrypt(view, output=view)
+    return ciphertext[:-hex_block] + last.hex()
+
+
+def encrypt_aead(
+    plaintext: str,
+    key: bytes,
+    nonce: bytes,
+    chunk_size: Optional[int] = None,
+    alg: str = "AES-GCM",
+) -> str:
+    """
+    Encrypt text with AES-GCM or ChaCha20-Poly1305.
+
+    Neither mode needs padding, and both are hardware accelerated on most CPUs
+    (AES-NI and CLMUL for GCM, SIMD for ChaCha20). The authentication tag is
+    appended to the ciphertext, as WebCrypto does.
+
+    Args:
+        plaintext: Text to encrypt
+        key: 32 byte key
+        nonce: 12 byte nonce, never reused with the same key
+        chunk_size: Work in chunks of this many bytes so other threads can run in
+            between, at the cost of one extra transient copy of the output
+        alg: `AES-GCM` or `ChaCha20-Poly1305`
+
+    Returns:
+        Hex ciphertext followed by the tag
+    """
+    buffer = _encode(plaintext, chunk_size)
+    cipher = _aead(alg, key, nonce)
+    if chunk_size is None:
+        # pycryptodome copies bytearray slices when hashing, memoryview slices are free
+        with memoryview(buffer) as view:
+            cipher.encrypt(view, output=view)
+        buffer += cipher.digest()
+        return buffer.hex()
+
+    chunks = []
+    with memoryview(buffer) as view:
+        for start in range(0, len(buffer), chunk_size):
+            chunk = view[start : start + chunk_size]
+            cipher.encrypt(chunk, output=chunk)
+            chunks.append(chunk.hex())
+            chunk.release()
+    del buffer
+    chunks.append(cipher.digest().hex())
+    return "".join(chunks)
+
+
+def decrypt_aead(
+    ciphertext: str,
+    key: bytes,
+    nonce: bytes,
+    chunk_size: Optional[int] = None,
+    alg: str = "AES-GCM",
+) -> str:
+    """
+    Decrypt and authenticate hex AES-GCM or ChaCha20-Poly1305 ciphertext.
+
+    Args:
+        ciphertext: Hex ciphertext followed by the tag
+        key: 32 byte key
+        nonce: 12 byte nonce
+        chunk_size: Work in chunks of this many bytes so other threads can run in between
+        alg: `AES-GCM` or `ChaCha20-Poly1305`
+
+    Returns:
+        Plaintext
+
+    Raises:
+        ValueError: Wrong key, or ciphertext corrupted or tampered with
+    """
+    size = len(ciphertext) // 2 - TAG_SIZE
+    if len(ciphertext) % 2 or size < 0:
+        raise ValueError("Ciphertext is shorter than the authentication tag")
+    cipher = _aead(alg, key, nonce)
+    tag = bytes.fromhex(ciphertext[size * 2 :])
+    if chunk_size is None:
+        buffer = bytearray.fromhex(ciphertext)
+        del buffer[size:]
+    else:
+        buffer = bytearray(size)
+
+    with memoryview(buffer) as view:
+        if chunk_size is None:
+            cipher.decrypt(view, output=view)
+        else:
+            for start in range(0, size, chunk_size):
+                chunk = view[start : start + chunk_size]
+                chunk[:] = bytes.fromhex(ciphertext[start * 2 : (start + len(chunk)) * 2])
+                cipher.decrypt(chunk, output=chunk)
+                chunk.release()
+        cipher.verify(tag)
+        return str(view, "UTF-8")
+
+
+class CBCEncryptor:
+    def __init__(self, key: bytes, iv: bytes):
+        """
+        Incremental AES-CBC encryptor producing hex output, for contents too large to hold twice.
+
+        Args:
+            key: AES key
+            iv: Initialization vector
+        """
+        self._cipher = _cbc(key, iv)
+        self._pending = bytearray()
+
+    def update(self, text: str) -> str:
+        """
+        Encrypt the next piece of plaintext.
+
+        Args:
+            text: Plaintext chunk
+
+        Returns:
+            Hex ciphertext for every complete block so far
+        """
+        self._pending += text.encode("UTF-8")
+        ready = len(self._pending) - len(self._pending) % BLOCK_SIZE
+        if not ready:
+            return ""
+        with memoryview(self._pending) as view:
+            chunk = self._cipher.encrypt(view[:ready])
+        del self._pending[:ready]
+        return chunk.hex()
+
+    def finalize(self) -> str:
+        """
+        Pad and encrypt the remaining plaintext.
+
+        Returns:
+            Hex ciphertext of the final block(s)
+        """
+        padding = BLOCK_SIZE - len(self._pending) % BLOCK_SIZE
+        self._pending.extend(bytes((padding,)) * padding)
+        chunk = self._cipher.encrypt(self._pending)
+        self._pending.clear()
+        return chunk.hex()
+
+
+class CBCDecryptor:
+    def __init__(self, key: bytes, iv: bytes):
+        """
+        Incremental decryptor for hex AES-CBC ciphertext.
+
+        The last block is held back until `finalize`, since it carries the padding.
+
+        Args:
+            key: AES key
+            iv: Initialization vector
+        """
+        self._cipher = _cbc(key, iv)
+        self._hex = ""
+        self._pending = bytearray()
+        self._decoder = codecs.getincrementaldecoder("UTF-8")()
+
+    def update(self, ciphertext: str) -> str:
+        """
+        Decrypt the next piece of hex ciphertext.
+
+        Args:
+            ciphertext: Hex ciphertext chunk
+
+        Returns:
+            Plaintext for every complete block except the last
+        """
+        if self._hex:
+            ciphertext = self._hex + ciphertext
+        even = len(ciphertext) - len(ciphertext) % 2
+        self._hex = ciphertext[even:]
+        self._pending += bytes.fromhex(ciphertext[:even])
+
+        ready = len(self._pending) - len(self._pending) % BLOCK_SIZE
+        if ready == len(self._pending):
+            ready -= BLOCK_SIZE
+        if ready <= 0:
+            return ""
+        with memoryview(self._pending) as view:
+            self._cipher.decrypt(view[:ready], output=view[:ready])
+            text = self._decoder.decode(view[:ready])
+        del self._pending[:ready]
+        return text
+
+    def finalize(self) -> str:
+        """
+        Decrypt and unpad the last block.
+
+        Returns:
+            Remaining plaintext
+
+        Raises:
+            ValueError: Wrong key or truncated ciphertext
+        """
+        if self._hex or len(self._pending) != BLOCK_SIZE:
+            raise ValueError("Ciphertext length is not a multiple of the block size")
+        self._cipher.decrypt(self._pending, output=self._pending)
+        with memoryview(self._pending) as view:
+            text = self._decoder.decode(view[: BLOCK_SIZE - _padding(view)], final=True)
+        self._pending.clear()
+        return text
+
+
+class AEADEncryptor:
+    def __init__(self, key: bytes, nonce: bytes, alg: str = "AES-GCM"):
+        """
+        Incremental AES-GCM or ChaCha20-Poly1305 encryptor producing hex output.
+
+        Args:
+            key: 32 byte key
+            nonce: 12 byte nonce, never reused with the same key
+            alg: `AES-GCM` or `ChaCha20-Poly1305`
+        """
+        self._cipher = _aead(alg, key, nonce)
+
+    def update(self, text: str) -> str:
+        """
+        Encrypt the next piece of plaintext.
+
+        Args:
+            text: Plaintext chunk
+
+        Returns:
+            Hex ciphertext of the chunk
+        """
+        buffer = bytearray(text, "UTF-8")
+        with memoryview(buffer) as view:
+            self._cipher.encrypt(view, output=view)
+        return buffer.hex()
+
+    def finalize(self) -> str:
+        """
+        Finish encrypting.
+
+        Returns:
+            Hex authentication tag, which follows the ciphertext
+        """
+        return self._cipher.digest().hex()
+
+
+class AEADDecryptor:
+    def __init__(self, key: bytes, nonce: bytes, alg: str = "AES-GCM"):
+        """
+        Incremental decryptor for hex AES-GCM or ChaCha20-Poly1305 ciphertext.
+
+        The tag is held back until `finalize`, which authenticates everything
+        returned by `update` before it. Callers must discard that plaintext if
+        `finalize` raises.
+
+        Args:
+            key: 32 byte key
+            nonce: 12 byte nonce
+            alg: `AES-GCM` or `ChaCha20-Poly1305`
+        """
+        self._cipher = _aead(alg, key, nonce)
+        self._hex = ""
+        self._pending = bytearray()
+        self._decoder = codecs.getincrementaldecoder("UTF-8")()
+
+    def update(self, ciphertext: str) -> str:
+        """
+        Decrypt the next piece of hex ciphertext.
+
+        Args:
+            ciphertext: Hex ciphertext chunk
+
+        Returns:
+            Unauthenticated plaintext for everything except the possible tag
+        """
+        if self._hex:
+            ciphertext = self._hex + ciphertext
+        even = len(ciphertext) - len(ciphertext) % 2
+        self._hex = ciphertext[even:]
+        self._pending += bytes.fromhex(ciphertext[:even])
+
+        ready = len(self._pending) - TAG_SIZE
+        if ready <= 0:
+            return ""
+        with memoryview(self._pending) as view:
+            self._cipher.decrypt(view[:ready], output=view[:ready])
+            text = self._decoder.decode(view[:ready])
+        del self._pending[:ready]
+        return text
+
+    def finalize(self) -> str:
+        """
+        Check the tag.
+
+        Returns:
+            Remaining plaintext
+
+        Raises:
+            ValueError: Wrong key, or ciphertext truncated or tampered with
+        """
+        if self._hex or len(self._pending) != TAG_SIZE:
+            raise ValueError("Ciphertext is shorter than the authentication tag")
+        self._cipher.verify(bytes(self._pending))
+        self._pending.clear()
+        return self._decoder.decode(b"", final=True)
+
+
+class Algorithm(NamedTuple):
+    """
+    Paste encryption algorithm.
+
+    Attributes:
+        name: Name recorded as `alg` in the `pf_encryption` metadata
+        iv_size: Length of the IV or nonce in bytes
+        encrypt: Encrypt text to hex, as `encrypt(plaintext, key, iv, chunk_size=None)`
+        decrypt: Decrypt hex to text, as `decrypt(ciphertext, key, iv, chunk_size=None)`
+        decryptor: Incremental decryptor factory, as `decryptor(key, iv)`
+        encryptor: Incremental encryptor factory, as `encryptor(key, iv)`
+        append: Extend a ciphertext under the same key and IV, as
+            `append(ciphertext, text, key, iv, chunk_size=None)`, `None` if unsafe
+    """
+
+    name: str
+    iv_size: int
+    encrypt: Callable[..., str]
+    decrypt: Callable[..., str]
+    decryptor: Callable[[bytes, bytes], "CBCDecryptor | AEADDecryptor"]
+    encryptor: Callable[[bytes, bytes], "CBCEncryptor | AEADEncryptor"]
+    append: Optional[Callable[..., str]] = None
+
+
+def _aead_algorithm(name: str) -> Algorithm:
+    return Algorithm(
+        name,
+        NONCE_SIZE,
+        partial(encrypt_aead, alg=name),
+        partial(decrypt_aead, alg=name),
+        partial(AEADDecryptor, alg=name),
+        partial(AEADEncryptor, alg=name),
+    )
+
+
+ALGORITHMS: dict[str, Algorithm] = {
+    "AES-CBC": Algorithm(
+        "AES-CBC", BLOCK_SIZE, encrypt_cbc, decrypt_cbc, CBCDecryptor, CBCEncryptor, append_cbc
+    ),
+    "AES-GCM": _aead_algorithm("AES-GCM"),
+    "ChaCha20-Poly1305": _aead_algorithm("ChaCha20-Poly1305"),
+}
+
+DEFAULT_ALGORITHM = "AES-CBC"
+
+
+def get_algorithm(alg: "Algorithm | str | None" = None) -> Algorithm:
+    """
+    Get an encryption algorithm.
+
+    Args:
+        alg: Algorithm or its name, default `DEFAULT_ALGORITHM`
+
+    Returns:
+        Algorithm
+
+    Raises:
+        ValueError: Unknown algorithm
+    """
+    if isinstance(alg, Algorithm):
+        return alg
+    name = alg or DEFAULT_ALGORITHM
+    if name not in ALGORITHMS:
+        raise ValueError(
+            f"Unknown encryption algorithm {name!r}, expected one of {list(ALGORITHMS)}"
+        )
+    return ALGORITHMS[name]
@@ -0,0 +1,258 @@
+"""Content-addressed deduplication of uploads."""
+from hashlib import sha256
+import json
+import os
+from threading import Lock
+import time
+from typing import Iterable, NamedTuple, Optional
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def text_digest(text: str, prefix: bytes = b"") -> str:
+    """Hash text as UTF-8 a chunk at a time, without encoding all of it at once."""
+    digest = sha256(prefix)
+    for start in range(0, len(text), HASH_CHUNK_SIZE):
+        digest.update(text[start : start + HASH_CHUNK_SIZE].encode("UTF-8"))
+    return digest.hexdigest()
+
+
+class DedupEntry(NamedTuple):
+    """
+    Paste uploaded with some content.
+
+    Attributes:
+        site: Pasty instance
+        id: Paste ID
+        token: Modification token
+        key: Hexlified key, if encrypted
+        metadata: Metadata as stored, including `pf_encryption`
+        created: Creation timestamp reported by the site
+        stored: SHA-256 of the content as stored, ciphertext if encrypted
+        indexed: When the entry was added
+        checked: When the paste was last seen unchanged on the site
+    """
+
+    site: str
+    id: str
+    token: str
+    key: Optional[str]
+    metadata: dict
+    created: Optional[int]
+    stored: str
+    indexed: float
+    checked: float
+
+
+class DedupStats:
+    def __init__(self):
+        """Deduplication counters."""
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.validations = 0
+        self.bytes_saved = 0
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__}: hits={self.hits}, misses={self.misses}, "
+            f"stale={self.stale}, validations={self.validations}>"
+        )
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of saves served by an existing paste."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class DedupIndex:
+    def __init__(
+        self,
+        path: "str | os.PathLike | None" = None,
+        ttl: Optional[float] = None,
+        revalidate: Optional[float] = 300.0,
+    ):
+        """
+        Index of uploaded pastes by content, safe to share between threads and clients.
+
+        Saving a paste whose plaintext and metadata match an indexed one returns the
+        existing paste, with its ID and token, instead of uploading again. Encrypted
+        pastes only match pastes encrypted with the same key, so the key a caller
+        already holds keeps decrypting the paste saved. Entries
+        are kept in memory, and with a path also written through to an SQLite
+        database. Like a token vault, the database holds secrets: modification tokens
+        and keys.
+
+        Args:
+            path: Database file, created if missing, `None` to keep entries in memory only
+            ttl: Seconds an entry is used at all, `None` forever
+            revalidate: Seconds after which an entry is checked against the site before
+                reuse, catching deleted or edited pastes, `0` to always check, `None` never
+        """
+        self.path = path
+        self.ttl = ttl
+        self.revalidate = revalidate
+        self.stats = DedupStats()
+        self._entries: dict[str, DedupEntry] = {}
+        self._digests: dict[tuple[str, str], str] = {}
+        self._lock = Lock()
+        self._db = None
+        if path is None:
+            return
+
+        import sqlite3
+
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS dedup (digest TEXT PRIMARY KEY, site TEXT NOT NULL, "
+                "id TEXT NOT NULL, token TEXT NOT NULL, key TEXT, metadata TEXT NOT NULL, "
+                "created INTEGER, stored TEXT NOT NULL, indexed REAL NOT NULL, "
+                "checked REAL NOT NULL)"
+            )
+            for digest, *row in self._db.execute("SELECT * FROM dedup"):
+                row[4] = json.loads(row[4])
+                entry = self._entries[digest] = DedupEntry(*row)
+                self._digests[entry.site, entry.id] = digest
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: path={self.path}, entries={len(self)}>"
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def close(self) -> None:
+        """Close the database connection, if any."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    @staticmethod
+    def digest(
+        plaintext: str, metadata: dict, alg: Optional[str] = None, key: Optional[str] = None
+    ) -> str:
+        """
+        Get the index key of a paste.
+
+        Args:
+            plaintext: Content before encryption
+            metadata: Metadata, `pf_encryption` is ignored
+            alg: Encryption algorithm, `None` if not encrypted
+            key: Hexlified key, `None` if not encrypted
+
+        Returns:
+            Hex SHA-256 of the algorithm, key, metadata and plaintext
+        """
+        metadata = {k: v for k, v in metadata.items() if k != "pf_encryption"}
+        header = json.dumps([alg, key, metadata], sort_keys=True).encode("UTF-8") + b"\0"
+        return text_digest(plaintext, header)
+
+    def lookup(self, digest: str, sites: Iterable[str]) -> Optional[DedupEntry]:
+        """
+        Find an unexpired paste with some content on one of `sites`.
+
+        Misses are counted here, hits once the caller has used the entry with `hit`.
+
+        Args:
+            digest: Index key from `digest`
+            sites: Sites the caller can use
+
+        Returns:
+            Matching entry, if any
+        """
+        with self._lock:
+            entry = self._entries.get(digest)
+            if (
+                entry is not None
+                and self.ttl is not None
+                and entry.indexed + self.ttl < time.time()
+            ):
+                self._remove(digest)
+                self.stats.stale += 1
+                entry = None
+            if entry is None or entry.site not in sites:
+                self.stats.misses += 1
+                return None
+        return entry
+
+    def needs_check(self, entry: DedupEntry) -> bool:
+        """Check if an entry must be checked against its site before reuse."""
+        return self.revalidate is not None and entry.checked + self.revalidate <= time.time()
+
+    def hit(self, digest: str, size: int, checked: bool = False) -> None:
+        """
+        Record that an entry was used instead of uploading.
+
+        Args:
+            digest: Index key
+            size: Length of the content not uploaded
+            checked: If the entry was just checked against its site
+        """
+        with self._lock:
+            self.stats.hits += 1
+            self.stats.bytes_saved += size
+            if not checked:
+                return
+            self.stats.validations += 1
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._store(digest, entry._replace(checked=time.time()))
+
+    def reject(self, digest: str) -> None:
+        """Drop an entry whose paste is gone or changed, counting the lookup as a miss."""
+        with self._lock:
+            self._remove(digest)
+            self.stats.stale += 1
+            self.stats.validations += 1
+            self.stats.misses += 1
+
+    def add(self, digest: str, entry: DedupEntry) -> None:
+        """
+        Index a paste just uploaded.
+
+        Args:
+            digest: Index key from `digest`
+            entry: Uploaded paste
+        """
+        with self._lock:
+            self._store(digest, entry)
+
+    def discard(self, site: str, id: str) -> None:
+        """
+        Forget a paste that was deleted or edited, if indexed.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+        """
+        with self._lock:
+            digest = self._digests.get((site, id))
+            if digest is not None:
+                self._remove(digest)
+
+    def _store(self, digest: str, entry: DedupEntry) -> None:
+        """Insert or replace an entry. Callers hold the lock."""
+        previous = self._entries.get(digest)
+        if previous is not None:
+            self._digests.pop((previous.site, previous.id), None)
+        self._entries[digest] = entry
+        self._digests[entry.site, entry.id] = digest
+        if self._db is not None:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO dedup VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (digest, *entry[:4], json.dumps(entry.metadata), *entry[5:]),
+                )
+
+    def _remove(self, digest: str) -> None:
+        """Delete an entry. Callers hold the lock."""
+        entry = self._entries.pop(digest, None)
+        if entry is not None:
+            self._digests.pop((entry.site, entry.id), None)
+        if self._db is not None:
+            with self._db:
+                self._db.execute("DELETE FROM dedup WHERE digest = ?", (digest,))
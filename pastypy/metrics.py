@@ -0,0 +1,319 @@
+"""Instrumentation hooks and metrics."""
+from bisect import bisect_left
+from threading import Lock
+from typing import Any, NamedTuple, Optional
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestEvent(NamedTuple):
+    """
+    A single attempt of an HTTP request.
+
+    Attributes:
+        site: Pasty instance
+        operation: Client operation, such as `get` or `save`
+        method: HTTP method
+        path: Path relative to the site root
+        attempt: Number of retries made before this attempt
+        status: Response status, `None` before the response or on a connection error
+        elapsed: Seconds from sending the request to receiving the response headers
+        bytes_sent: Size of the request body on the wire
+        bytes_received: Size of the response body read by the client, after content
+            decoding, or its Content-Length for responses returned by `request`
+        error: Exception raised by the attempt, if any
+    """
+
+    site: str
+    operation: str
+    method: str
+    path: str
+    attempt: int = 0
+    status: Optional[int] = None
+    elapsed: float = 0.0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    error: Optional[BaseException] = None
+
+
+class Hooks:
+    """
+    Instrumentation callbacks, all no-ops by default.
+
+    Subclass and override the events of interest, then pass an instance to a client
+    as `hooks`. Callbacks run inline, so they must be fast and must not raise.
+    """
+
+    def on_request_start(self, event: RequestEvent) -> None:
+        """Called before each attempt of a request is sent."""
+
+    def on_request_end(self, event: RequestEvent) -> None:
+        """Called when each attempt gets a response or fails."""
+
+    def on_retry(self, event: RequestEvent, delay: float) -> None:
+        """Called before sleeping `delay` seconds to retry a failed attempt."""
+
+    def on_phase(self, site: str, operation: str, phase: str, elapsed: float) -> None:
+        """
+        Called when a part of an operation completes.
+
+        Phases are `read` (reading a response body, after its headers), `decode`
+        (parsing it) and, on the async client, `dns` and `connect` for new connections.
+        """
+
+    def on_crypto(self, operation: str, size: int, elapsed: float) -> None:
+        """Called after a paste is encrypted or decrypted, with the input length."""
+
+    def on_coalesce(self, site: str, operation: str) -> None:
+        """Called when an operation shares a request already in flight instead of sending one."""
+
+
+class CompositeHooks(Hooks):
+    def __init__(self, *hooks: Hooks):
+        """
+        Forward every event to several hooks.
+
+        Args:
+            hooks: Hooks to call, in order
+        """
+        self.hooks = hooks
+
+    def on_request_start(self, event: RequestEvent) -> None:
+        """Forward the event to every hook."""
+        for hooks in self.hooks:
+            hooks.on_request_start(event)
+
+    def on_request_end(self, event: RequestEvent) -> None:
+        """Forward the event to every hook."""
+        for hooks in self.hooks:
+            hooks.on_request_end(event)
+
+    def on_retry(self, event: RequestEvent, delay: float) -> None:
+        """Forward the event to every hook."""
+        for hooks in self.hooks:
+            hooks.on_retry(event, delay)
+
+    def on_phase(self, site: str, operation: str, phase: str, elapsed: float) -> None:
+        """Forward the event to every hook."""
+        for hooks in self.hooks:
+            hooks.on_phase(site, operation, phase, elapsed)
+
+    def on_crypto(self, operation: str, size: int, elapsed: float) -> None:
+        """Forward the event to every hook."""
+        for hooks in self.hooks:
+            hooks.on_crypto(operation, size, elapsed)
+
+    def on_coalesce(self, site: str, operation: str) -> None:
+        """Forward the event to every hook."""
+        for hooks in self.hooks:
+            hooks.on_coalesce(site, operation)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Cumulative histogram with fixed bucket bounds, as used by Prometheus.
+
+        Args:
+            buckets: Upper bounds of the buckets, ascending
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: count={self.count}, sum={self.sum:.3f}>"
+
+    def observe(self, value: float) -> None:
+        """Record a value. Not thread safe on its own."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """Get `(upper bound, count of values <= bound)` pairs, ending with infinity."""
+        total = 0
+        out = []
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            out.append((bound, total))
+        return out
+
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class MetricsCollector(Hooks):
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS, prefix: str = "pastypy"):
+        """
+        Hooks collecting latency histograms and counters, safe to share between clients.
+
+        Args:
+            buckets: Histogram bucket bounds in seconds
+            prefix: Prefix of exported metric names
+        """
+        self.buckets = buckets
+        self.prefix = prefix
+        self.histograms: dict[str, dict[Labels, Histogram]] = {}
+        self.counters: dict[str, dict[Labels, float]] = {}
+        self._lock = Lock()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: prefix={self.prefix}>"
+
+    def _observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def _inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def on_request_end(self, event: RequestEvent) -> None:
+        """Record the latency, status and bytes of the attempt."""
+        labels = {"site": event.site, "operation": event.operation}
+        status = "error" if event.status is None else str(event.status)
+        self._observe("request_duration_seconds", event.elapsed, **labels)
+        self._inc("requests_total", status=status, **labels)
+        self._inc("sent_bytes_total", event.bytes_sent, **labels)
+        self._inc("received_bytes_total", event.bytes_received, **labels)
+
+    def on_retry(self, event: RequestEvent, delay: float) -> None:
+        """Count the retry and its backoff."""
+        labels = {"site": event.site, "operation": event.operation}
+        self._inc("retries_total", **labels)
+        self._inc("backoff_seconds_total", delay, **labels)
+
+    def on_phase(self, site: str, operation: str, phase: str, elapsed: float) -> None:
+        """Record the duration of the phase."""
+        self._observe(
+            "phase_duration_seconds", elapsed, site=site, operation=operation, phase=phase
+        )
+
+    def on_crypto(self, operation: str, size: int, elapsed: float) -> None:
+        """Record the duration and size of the encryption or decryption."""
+        self._observe("crypto_duration_seconds", elapsed, operation=operation)
+        self._inc("crypto_bytes_total", size, operation=operation)
+
+    def on_coalesce(self, site: str, operation: str) -> None:
+        """Count the request saved."""
+        self._inc("coalesced_total", site=site, operation=operation)
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Get a copy of every metric, for exporting to other systems.
+
+        Returns:
+            Metric name to list of `(labels, value)` pairs, where histogram values are
+            dicts with `buckets` (cumulative), `sum` and `count`
+        """
+        with self._lock:
+            out: dict[str, Any] = {
+                name: [(dict(labels), value) for labels, value in series.items()]
+                for name, series in self.counters.items()
+            }
+            for name, series in self.histograms.items():
+                out[name] = [
+                    (dict(labels), {"buckets": h.cumulative(), "sum": h.sum, "count": h.count})
+                    for labels, h in series.items()
+                ]
+        return out
+
+    def prometheus(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text
+        """
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                name = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in series.items():
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+            for name, series in sorted(self.histograms.items()):
+                name = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series.items():
+                    for bound, count in histogram.cumulative():
+                        le = "+Inf" if bound == float("inf") else _number(bound)
+                        lines.append(f"{name}_bucket{_labels((*labels, ('le', le)))} {count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+                    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Drop every metric."""
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def request_started(
+    hooks: Optional[Hooks],
+    site: str,
+    operation: str,
+    method: str,
+    path: str,
+    attempt: int,
+    data: Any,
+) -> Optional[RequestEvent]:
+    """
+    Report the start of a request attempt, returning its event if anyone is listening.
+
+    Streamed bodies, of unknown size, are reported as 0 bytes sent.
+    """
+    if hooks is None:
+        return None
+    sent = len(data) if isinstance(data, (bytes, bytearray)) else 0
+    event = RequestEvent(site, operation, method, path, attempt, bytes_sent=sent)
+    hooks.on_request_start(event)
+    return event
+
+
+def request_ended(
+    hooks: Optional[Hooks],
+    event: Optional[RequestEvent],
+    elapsed: float,
+    status: Optional[int] = None,
+    length: "int | str | None" = None,
+    error: Optional[BaseException] = None,
+) -> None:
+    """
+    Report the end of a request attempt started with `request_started`.
+
+    The response body size is the bytes read, or the Content-Length header if given
+    as a string, 0 when unknown.
+    """
+    if hooks is None or event is None:
+        return
+    if isinstance(length, int):
+        received = length
+    else:
+        received = int(length) if length and length.isdigit() else 0
+    hooks.on_request_end(
+        event._replace(status=status, elapsed=elapsed, bytes_received=received, error=error)
+    )
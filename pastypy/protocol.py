@@ -0,0 +1,367 @@
+"""Sans-I/O core of the clients.
+
+Everything about talking to pasty that does not depend on how bytes are moved
+lives here: endpoints, request bodies, compression fallback, retry decisions,
+hooks, and what each response means for the cache, vault, deduplication index
+and coalesced gets. `PastyClient` and `AsyncPastyClient` only send the requests
+described and hand back what came in, so both behave the same.
+
+An operation is a generator yielding the `Request` to send and receiving its
+`Response`, its return value being the result of the operation:
+
+    op = client._create_op("content", {})
+    request = next(op)
+    ...  # send it, through `client._exchange(request)` for retries
+    result = finish(op, response)
+"""
+import time
+from typing import Any, Callable, Generator, Mapping, NamedTuple, Optional, TypeVar
+
+from pastypy.cache import CacheEntry, PasteCache, copy_payload
+from pastypy.compression import RequestCompressor
+from pastypy.dedup import DedupIndex
+from pastypy.metrics import Hooks, request_ended, request_started
+from pastypy.retry import RetryPolicy, RetryStats
+from pastypy.serialization import JSONBackend
+from pastypy.vault import TokenVault
+
+PASTES_PATH = "/api/v2/pastes"
+NO_RETRY = RetryPolicy(max_retries=0)
+
+T = TypeVar("T")
+
+
+class Request(NamedTuple):
+    """
+    Request to send to a site.
+
+    Attributes:
+        method: HTTP method
+        path: Path relative to the site root
+        operation: Operation reported to hooks
+        headers: Request headers
+        json: Payload to send as JSON, `None` for none
+        data: Raw body, such as an iterable to stream, `None` for none
+        retry: Retry policy, `None` for the client's
+    """
+
+    method: str
+    path: str
+    operation: str
+    headers: Optional[dict[str, str]] = None
+    json: Any = None
+    data: Any = None
+    retry: Optional[RetryPolicy] = None
+
+    @classmethod
+    def from_kwargs(
+        cls,
+        method: str,
+        path: str,
+        operation: Optional[str],
+        retry: Optional[RetryPolicy],
+        kwargs: dict[str, Any],
+    ) -> "Request":
+        """Build a request from `request()` arguments, taking `json`, `data` and `headers`."""
+        return cls(
+            method,
+            path,
+            operation or method.lower(),
+            kwargs.pop("headers", None),
+            kwargs.pop("json", None),
+            kwargs.pop("data", None),
+            retry,
+        )
+
+
+class Response(NamedTuple):
+    """
+    Response read whole.
+
+    Attributes:
+        status: HTTP status
+        headers: Response headers
+        body: Decoded response body
+        raise_for_status: Raise the transport's error for 4xx and 5xx statuses
+    """
+
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+    raise_for_status: Callable[[], None]
+
+
+Operation = Generator[Request, Response, T]
+
+
+def finish(op: Operation[T], response: Response) -> T:
+    """
+    Give an operation the response to its request.
+
+    Args:
+        op: Operation, its request already taken
+        response: Response to the request
+
+    Returns:
+        Result of the operation
+    """
+    try:
+        op.send(response)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("Operations send a single request")
+
+
+class Exchange:
+    def __init__(
+        self,
+        request: Request,
+        site: str,
+        retry: RetryPolicy,
+        stats: RetryStats,
+        json_backend: JSONBackend,
+        compressor: RequestCompressor,
+        hooks: Optional[Hooks],
+    ):
+        """
+        Attempts at sending a request, deciding what to do after each.
+
+        Call `begin` before each attempt and send `data` and `headers`, then report
+        the outcome with `received` or `failed`: they return `None` when done, or the
+        seconds to wait before the next attempt. Once done with a response, report
+        reading its body with `read`.
+
+        Args:
+            request: Request to send
+            site: Site it is sent to
+            retry: Retry policy
+            stats: Retry counters to update
+            json_backend: Encoder of JSON payloads
+            compressor: Compressor of JSON payloads
+            hooks: Instrumentation hooks
+        """
+        self.request = request
+        self.site = site
+        self.retry = retry
+        self.stats = stats
+        self.compressor = compressor
+        self.hooks = hooks
+        self.attempt = 0
+        self._event = None
+        self._start = 0.0
+        self._ending: Optional[tuple[float, int, Optional[str]]] = None
+        self._body = None
+        self._rejected: Optional[int] = None
+        self.data = request.data
+        self.headers = self._plain_headers = request.headers or {}
+        if request.json is not None:
+            self._body = json_backend.dumps(request.json)
+            self._plain_headers = {**self.headers, "Content-Type": "application/json"}
+            self.data, self.headers = compressor.compress(self._body, self._plain_headers)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.request.method} {self.request.path}>"
+
+    def begin(self) -> None:
+        """Report the start of an attempt."""
+        request = self.request
+        self._event = request_started(
+            self.hooks,
+            self.site,
+            request.operation,
+            request.method,
+            request.path,
+            self.attempt,
+            self.data,
+        )
+        self._start = time.perf_counter()
+
+    def received(self, status: int, headers: Mapping[str, str]) -> Optional[float]:
+        """
+        Handle a response to the attempt.
+
+        Args:
+            status: HTTP status
+            headers: Response headers
+
+        Returns:
+            `None` to use the response, else seconds to wait before sending again
+        """
+        self._ending = (time.perf_counter() - self._start, status, headers.get("Content-Length"))
+        if self._rejected == 400:
+            self.compressor.plain_accepted(status)
+        self._rejected = None
+        if self._body is not None and self.compressor.rejected(status, self.headers):
+            # Send again at once, plain
+            self.read()
+            self._rejected = status
+            self.data, self.headers = self._body, self._plain_headers
+            return 0.0
+        if status < 400 or not self.retry.should_retry(self.request.method, self.attempt, status):
+            return None
+        self.read()
+        return self._again(status, self.retry.delay(self.attempt, headers.get("Retry-After")))
+
+    def read(self, size: Optional[int] = None) -> None:
+        """
+        Report that the body of the response in use was read, ending the attempt.
+
+        Args:
+            size: Bytes of the body read, `None` if left to the caller, to report its
+                Content-Length and no read phase
+        """
+        if self._ending is None:
+            return
+        elapsed, status, length = self._ending
+        self._ending = None
+        if size is not None and self.hooks is not None:
+            reading = time.perf_counter() - self._start - elapsed
+            self.hooks.on_phase(self.site, self.request.operation, "read", reading)
+        request_ended(self.hooks, self._event, elapsed, status, length if size is None else size)
+
+    def failed(self, error: BaseException) -> Optional[float]:
+        """
+        Handle a connection error or timeout of the attempt.
+
+        Args:
+            error: Error raised by the transport
+
+        Returns:
+            `None` to raise the error, else seconds to wait before sending again
+        """
+        request_ended(self.hooks, self._event, time.perf_counter() - self._start, error=error)
+        if not self.retry.should_retry(self.request.method, self.attempt):
+            return None
+        return self._again(None, self.retry.delay(self.attempt))
+
+    def _again(self, status: Optional[int], delay: float) -> float:
+        self.stats.record_retry(delay, status)
+        if self._event is not None:
+            self.hooks.on_retry(self._event._replace(status=status), delay)
+        self.attempt += 1
+        return delay
+
+
+class PasteProtocol:
+    """
+    Base of the clients bound to one site, describing every operation without I/O.
+
+    Subclasses set the attributes below and drive the `_*_op` operations.
+    """
+
+    site: str
+    retry: RetryPolicy
+    stats: RetryStats
+    json_backend: JSONBackend
+    compressor: RequestCompressor
+    hooks: Optional[Hooks]
+    cache: Optional[PasteCache]
+    vault: Optional[TokenVault]
+    dedup: Optional[DedupIndex]
+    flights: Any
+
+    def _exchange(self, request: Request) -> Exchange:
+        """Start sending a request."""
+        return Exchange(
+            request,
+            self.site,
+            request.retry or self.retry,
+            self.stats,
+            self.json_backend,
+            self.compressor,
+            self.hooks,
+        )
+
+    def _decode(self, body: bytes, operation: str) -> Any:
+        """Decode a JSON response body, timing it for the hooks."""
+        if self.hooks is None:
+            return self.json_backend.loads(body)
+        start = time.perf_counter()
+        raw = self.json_backend.loads(body)
+        self.hooks.on_phase(self.site, operation, "decode", time.perf_counter() - start)
+        return raw
+
+    def _cache_entry(self, id: str) -> Optional[CacheEntry]:
+        """Get the cached copy of a paste, if any."""
+        return self.cache.get(self.site, id) if self.cache is not None else None
+
+    def _coalesced(self, raw: dict, shared: bool) -> dict:
+        """Get a caller's own copy of a payload fetched by a coalesced get."""
+        if shared and self.hooks is not None:
+            self.hooks.on_coalesce(self.site, "get")
+        return copy_payload(raw)
+
+    def _paste_request(self, id: str, entry: Optional[CacheEntry] = None) -> Request:
+        """Request for a paste, conditional on a stale cache entry."""
+        headers = entry.validators if entry else None
+        return Request("GET", f"{PASTES_PATH}/{id}", "get", headers)
+
+    def _get_op(self, id: str, entry: Optional[CacheEntry]) -> Operation[dict]:
+        """Get a paste from the site, revalidating a stale cache entry."""
+        resp = yield self._paste_request(id, entry)
+        if resp.status == 304 and entry:
+            entry = self.cache.revalidated(self.site, id) or entry
+            return entry.payload()
+        resp.raise_for_status()
+        raw = self._decode(resp.body, "get")
+        raw["site"] = self.site
+        if self.cache is not None:
+            etag, modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+            self.cache.set(self.site, id, raw, etag, modified)
+        return raw
+
+    def _create_op(self, content: str, metadata: dict) -> Operation[dict]:
+        """Create a paste."""
+        payload = {"content": content, "metadata": metadata}
+        resp = yield Request("POST", PASTES_PATH, "save", json=payload)
+        return self._created(resp)
+
+    def _upload_op(self, body: Any) -> Operation[dict]:
+        """Create a paste from a streamed JSON body, which cannot be sent twice."""
+        headers = {"Content-Type": "application/json"}
+        resp = yield Request("POST", PASTES_PATH, "save", headers, data=body, retry=NO_RETRY)
+        return self._created(resp)
+
+    def _created(self, resp: Response) -> dict:
+        """Read the payload of a created paste, recording its token in the vault."""
+        resp.raise_for_status()
+        raw = self._decode(resp.body, "save")
+        raw["site"] = self.site
+        if self.vault is not None:
+            self.vault.set(self.site, raw["id"], raw["modificationToken"])
+        return raw
+
+    def _edit_op(self, id: str, token: str, content: str, metadata: dict) -> Operation[None]:
+        """Replace the content and metadata of a paste."""
+        headers = {"Authorization": f"Bearer {token}"}
+        payload = {"content": content, "metadata": metadata}
+        resp = yield Request("PATCH", f"{PASTES_PATH}/{id}", "edit", headers, payload)
+        self._forget(id)
+        resp.raise_for_status()
+
+    def _delete_op(self, id: str, token: str) -> Operation[None]:
+        """Delete a paste."""
+        headers = {"Authorization": f"Bearer {token}"}
+        resp = yield Request("DELETE", f"{PASTES_PATH}/{id}", "delete", headers)
+        self._forget(id)
+        resp.raise_for_status()
+        if self.vault is not None:
+            self.vault.discard(self.site, id)
+
+    def _forget(self, id: str) -> None:
+        """Drop what is known of a paste that may have changed, whatever the outcome."""
+        if self.cache is not None:
+            self.cache.invalidate(self.site, id)
+        if self.dedup is not None:
+            self.dedup.discard(self.site, id)
+        if self.flights is not None:
+            self.flights.forget(id)
+
+    def _report_op(self, id: str, reason: str) -> Operation[Optional[dict]]:
+        """Report a paste, `None` if the site does not support reporting."""
+        payload = {"reason": reason}
+        resp = yield Request("POST", f"{PASTES_PATH}/{id}/report", "report", json=payload)
+        if resp.status == 404:
+            return None
+        resp.raise_for_status()
+        return self._decode(resp.body, "report")
@@ -0,0 +1,183 @@
+"""Client-side rate limiting and retries."""
+from email.utils import parsedate_to_datetime
+import random
+from threading import Lock
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        """
+        Token bucket rate limiter, safe to share between threads and tasks.
+
+        Args:
+            rate: Requests allowed per second
+            burst: Requests allowed at once after being idle, default `rate` rounded up
+        """
+        self.rate = rate
+        self.burst = burst or max(1, int(rate + 0.999))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: rate={self.rate}, burst={self.burst}>"
+
+    def copy(self) -> "RateLimiter":
+        """Get a new, full bucket with the same rate and burst."""
+        return self.__class__(self.rate, self.burst)
+
+    def reserve(self) -> float:
+        """
+        Take a token, going into debt if none are available.
+
+        Returns:
+            Seconds to wait before the reserved request may be sent
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """
+        Block the current thread until a request may be sent.
+
+        Returns:
+            Seconds spent waiting
+        """
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self) -> float:
+        """
+        Wait without blocking the event loop until a request may be sent.
+
+        Returns:
+            Seconds spent waiting
+        """
+        import asyncio
+
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        jitter: bool = True,
+        statuses: tuple[int, ...] = (429, 500, 502, 503, 504),
+        methods: tuple[str, ...] = ("GET", "HEAD", "PATCH", "DELETE"),
+    ):
+        """
+        Retry with exponential backoff, honoring `Retry-After`.
+
+        Rate-limited (429) requests are retried for every method, since the server
+        did not process them. Other statuses and connection errors are only retried
+        for `methods`, so a paste is never created twice.
+
+        Args:
+            max_retries: Maximum retries per request
+            backoff: Delay before the first retry, doubled on each retry
+            max_backoff: Maximum delay between retries
+            jitter: Randomize delays to spread out retrying clients
+            statuses: Response statuses to retry
+            methods: Methods safe to retry after server errors or connection errors
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = statuses
+        self.methods = methods
+
+    def should_retry(self, method: str, attempt: int, status: Optional[int] = None) -> bool:
+        """
+        Check if a request should be retried.
+
+        Args:
+            method: HTTP method
+            attempt: Number of retries already made
+            status: Response status, `None` for a connection error
+
+        Returns:
+            If the request should be retried
+        """
+        if attempt >= self.max_retries:
+            return False
+        if status == 429:
+            return True
+        if status is not None and status not in self.statuses:
+            return False
+        return method.upper() in self.methods
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Get the delay before the next retry.
+
+        Args:
+            attempt: Number of retries already made
+            retry_after: Value of the `Retry-After` header, if any
+
+        Returns:
+            Seconds to wait
+        """
+        if retry_after:
+            delay = _parse_retry_after(retry_after)
+            if delay is not None:
+                return min(delay, self.max_backoff)
+        delay = min(self.backoff * 2**attempt, self.max_backoff)
+        return random.uniform(delay / 2, delay) if self.jitter else delay
+
+
+def _parse_retry_after(value: str) -> Optional[float]:
+    """Parse a `Retry-After` header in seconds or HTTP-date form."""
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryStats:
+    def __init__(self):
+        """Counters for retries and throttling, safe to share between threads."""
+        self.retries = 0
+        self.rate_limited = 0
+        self.throttled_time = 0.0
+        self.backoff_time = 0.0
+        self._lock = Lock()
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__}: retries={self.retries}, "
+            f"rate_limited={self.rate_limited}, throttled_time={self.throttled_time:.3f}, "
+            f"backoff_time={self.backoff_time:.3f}>"
+        )
+
+    def record_throttle(self, delay: float) -> None:
+        """Record time spent waiting on a rate limiter."""
+        if delay:
+            with self._lock:
+                self.throttled_time += delay
+
+    def record_retry(self, delay: float, status: Optional[int] = None) -> None:
+        """Record a retry and the backoff before it."""
+        with self._lock:
+            self.retries += 1
+            self.backoff_time += delay
+            if status == 429:
+                self.rate_limited += 1
@@ -0,0 +1,135 @@
+"""Site selection for clients spread over several pasty instances."""
+from collections import OrderedDict
+from threading import Lock
+import time
+from typing import Iterable, Optional
+
+HEALTH_PATH = "/api/v2/info"
+
+
+class SiteRouter:
+    def __init__(
+        self,
+        sites: Iterable[str],
+        health_interval: Optional[float] = 60.0,
+        recheck_interval: float = 30.0,
+        smoothing: float = 0.3,
+        max_locations: int = 4096,
+    ):
+        """
+        Health, latency and paste locations of several pasty instances, thread safe.
+
+        Performs no I/O itself: clients report probes and request outcomes, and ask
+        for the order to try sites in.
+
+        Args:
+            sites: Pasty instances, in order of preference until latencies are known
+            health_interval: Seconds between health checks, `None` to only check on demand
+            recheck_interval: Seconds a failed site is ranked last before being trusted again
+            smoothing: Weight of each new latency sample in the moving average
+            max_locations: Maximum number of paste locations kept, least recently used
+                dropped first
+
+        Raises:
+            ValueError: No sites given
+        """
+        self.sites = list(dict.fromkeys(site.rstrip("/") for site in sites))
+        if not self.sites:
+            raise ValueError("At least one site required")
+        self.health_interval = health_interval
+        self.recheck_interval = recheck_interval
+        self.smoothing = smoothing
+        self.max_locations = max_locations
+        self.latency: dict[str, Optional[float]] = dict.fromkeys(self.sites)
+        self._down_until: dict[str, float] = {}
+        self._locations: OrderedDict[str, str] = OrderedDict()
+        self._checked: Optional[float] = None
+        self._lock = Lock()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: sites={self.sites}>"
+
+    def claim_health_check(self) -> bool:
+        """
+        Check if a health check is due, and if so claim it for the caller.
+
+        Returns:
+            If the caller should run a health check now
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.health_interval is None:
+                return False
+            if self._checked is not None and now - self._checked < self.health_interval:
+                return False
+            self._checked = now
+            return True
+
+    def succeeded(self, site: str, latency: Optional[float] = None) -> None:
+        """
+        Record that a site answered, optionally with a latency sample.
+
+        Args:
+            site: Pasty instance
+            latency: Seconds a health check took
+        """
+        with self._lock:
+            self._down_until.pop(site, None)
+            if latency is not None:
+                previous = self.latency[site]
+                self.latency[site] = (
+                    latency
+                    if previous is None
+                    else previous + self.smoothing * (latency - previous)
+                )
+
+    def failed(self, site: str) -> None:
+        """
+        Record that a site could not be reached or answered with a server error.
+
+        Args:
+            site: Pasty instance
+        """
+        with self._lock:
+            self._down_until[site] = time.monotonic() + self.recheck_interval
+
+    def healthy(self, site: str) -> bool:
+        """Check if a site has not failed within the recheck interval."""
+        with self._lock:
+            return self._down_until.get(site, 0) <= time.monotonic()
+
+    def ranked(self) -> list[str]:
+        """
+        Get the order to try sites in.
+
+        Returns:
+            Healthy sites by latency, unmeasured ones last in given order, then failed
+            sites by how soon they may be trusted again
+        """
+        now = time.monotonic()
+        with self._lock:
+            up = [s for s in self.sites if self._down_until.get(s, 0) <= now]
+            down = sorted(set(self.sites) - set(up), key=self._down_until.__getitem__)
+            up.sort(key=lambda s: (self.latency[s] is None, self.latency[s] or 0))
+        return up + down
+
+    def remember(self, id: str, site: str) -> None:
+        """Record the site a paste lives on."""
+        with self._lock:
+            self._locations[id] = site
+            self._locations.move_to_end(id)
+            while len(self._locations) > self.max_locations:
+                self._locations.popitem(last=False)
+
+    def forget(self, id: str) -> None:
+        """Drop the location of a deleted paste."""
+        with self._lock:
+            self._locations.pop(id, None)
+
+    def site_of(self, id: str) -> Optional[str]:
+        """Get the site a paste lives on, if known."""
+        with self._lock:
+            site = self._locations.get(id)
+            if site is not None:
+                self._locations.move_to_end(id)
+            return site
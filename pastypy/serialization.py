@@ -0,0 +1,110 @@
+"""Pluggable JSON backends."""
+import json
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional
+
+
+class JSONBackend(NamedTuple):
+    """
+    JSON encoder and decoder working on bytes.
+
+    Attributes:
+        name: Backend name
+        dumps: Encode an object to UTF-8 JSON bytes
+        loads: Decode JSON from bytes or text
+    """
+
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[["bytes | str"], Any]
+
+
+def _stdlib() -> JSONBackend:
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    return JSONBackend("json", lambda obj: encoder.encode(obj).encode("UTF-8"), json.loads)
+
+
+def _orjson() -> JSONBackend:
+    import orjson
+
+    return JSONBackend("orjson", orjson.dumps, orjson.loads)
+
+
+def _ujson() -> JSONBackend:
+    import ujson
+
+    def dumps(obj: Any) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode("UTF-8")
+
+    return JSONBackend("ujson", dumps, ujson.loads)
+
+
+BACKENDS: dict[str, Callable[[], JSONBackend]] = {
+    "orjson": _orjson,
+    "ujson": _ujson,
+    "json": _stdlib,
+}
+
+_default: Optional[JSONBackend] = None
+
+
+def get_backend(backend: "JSONBackend | str | None" = None) -> JSONBackend:
+    """
+    Get a JSON backend.
+
+    Args:
+        backend: Backend or backend name, default the fastest one installed
+
+    Returns:
+        JSON backend
+
+    Raises:
+        ValueError: Unknown backend name
+        ImportError: Backend not installed
+    """
+    global _default
+
+    if isinstance(backend, JSONBackend):
+        return backend
+    if backend is not None:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown JSON backend {backend!r}, expected one of {list(BACKENDS)}")
+        return BACKENDS[backend]()
+
+    if _default is None:
+        for factory in BACKENDS.values():
+            try:
+                _default = factory()
+                break
+            except ImportError:
+                continue
+    return _default
+
+
+def paste_body_parts(backend: JSONBackend, metadata: dict) -> tuple[bytes, bytes]:
+    """Get the JSON surrounding the content of a streamed paste creation body."""
+    return b'{"metadata":' + backend.dumps(metadata) + b',"content":"', b'"}'
+
+
+def escape_chunk(backend: JSONBackend, chunk: str) -> bytes:
+    """Encode a piece of text as the inside of a JSON string."""
+    return backend.dumps(chunk)[1:-1]
+
+
+def iter_paste_body(backend: JSONBackend, chunks: Iterable[str], metadata: dict) -> Iterator[bytes]:
+    """
+    Encode a paste creation body a piece of content at a time.
+
+    Args:
+        backend: JSON backend
+        chunks: Paste content, in pieces
+        metadata: Paste metadata
+
+    Returns:
+        Iterator of body pieces
+    """
+    head, tail = paste_body_parts(backend, metadata)
+    yield head
+    for chunk in chunks:
+        if chunk:
+            yield escape_chunk(backend, chunk)
+    yield tail
@@ -0,0 +1,152 @@
+"""Coalescing of concurrent identical requests."""
+from threading import Event, Lock
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Hashable
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+class FlightStats:
+    def __init__(self):
+        """Coalescing counters."""
+        self.calls = 0
+        self.coalesced = 0
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: calls={self.calls}, coalesced={self.coalesced}>"
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = Event()
+        self.result: Any = None
+        self.error: Any = None
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Run one call per key at a time, sharing its outcome with concurrent callers.
+
+        Thread safe. Callers arriving while a call with the same key runs wait for it
+        and get its result, or its exception, instead of calling again.
+        """
+        self.stats = FlightStats()
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = Lock()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: in_flight={len(self._calls)}>"
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> tuple[Any, bool]:
+        """
+        Call `func`, or join the call already running for `key`.
+
+        Args:
+            key: Identity of the call, such as `(site, id)`
+            func: Call to make
+
+        Returns:
+            Result of the call, and whether it was shared with another caller's call
+
+        Raises:
+            Exception: Whatever the call raised
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            joined = call is not None
+            if joined:
+                self.stats.coalesced += 1
+            else:
+                call = self._calls[key] = _Call()
+                self.stats.calls += 1
+        if joined:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self.forget(key, call)
+            call.done.set()
+        return call.result, False
+
+    def forget(self, key: Hashable, call: Any = None) -> None:
+        """
+        Stop sharing the running call for `key`, so later callers make a new one.
+
+        Used when the outcome of a running call may already be outdated, such as a
+        get racing an edit.
+
+        Args:
+            key: Identity of the call
+            call: Only forget this call, if still the running one
+        """
+        with self._lock:
+            if call is None or self._calls.get(key) is call:
+                self._calls.pop(key, None)
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        """
+        Run one call per key at a time, sharing its outcome with concurrent tasks.
+
+        Calls run in their own task, so a cancelled caller does not cancel the call
+        for the others waiting on it.
+        """
+        self.stats = FlightStats()
+        self._calls: dict[Hashable, "asyncio.Task"] = {}
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: in_flight={len(self._calls)}>"
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable]) -> tuple[Any, bool]:
+        """
+        Await `func()`, or join the call already running for `key`.
+
+        Args:
+            key: Identity of the call, such as `(site, id)`
+            func: Coroutine function to call
+
+        Returns:
+            Result of the call, and whether it was shared with another caller's call
+
+        Raises:
+            Exception: Whatever the call raised
+        """
+        import asyncio
+
+        task = self._calls.get(key)
+        if task is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(task), True
+
+        task = self._calls[key] = asyncio.ensure_future(func())
+        self.stats.calls += 1
+        task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task), False
+
+    def _done(self, key: Hashable, task: "asyncio.Task") -> None:
+        self.forget(key, task)
+        if not task.cancelled():
+            # Retrieve the exception so it is not reported when every caller gave up
+            task.exception()
+
+    def forget(self, key: Hashable, task: Any = None) -> None:
+        """
+        Stop sharing the running call for `key`, so later callers make a new one.
+
+        Args:
+            key: Identity of the call
+            task: Only forget this call, if still the running one
+        """
+        if task is None or self._calls.get(key) is task:
+            self._calls.pop(key, None)
@@ -0,0 +1,281 @@
+"""Incremental parsing and decryption of paste downloads."""
+import codecs
+import json
+import re
+from tempfile import SpooledTemporaryFile
+from typing import Any, Iterator, Optional
+
+from pastypy.crypto import AEADDecryptor, CBCDecryptor, get_algorithm
+
+_SPECIAL = re.compile(r'["\\]')
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+_START, _KEY_OR_END, _KEY, _COLON, _VALUE, _CONTENT, _RAW, _AFTER, _DONE = range(9)
+
+
+class PasteParser:
+    def __init__(self, field: str = "content"):
+        """
+        Incremental parser for a paste JSON object that streams one string field.
+
+        Every other top-level field is collected into `fields` once complete.
+
+        Args:
+            field: Name of the field to stream
+        """
+        self.field = field
+        self.fields: dict[str, Any] = {}
+        self._decoder = codecs.getincrementaldecoder("UTF-8")()
+        self._buffer = ""
+        self._state = _START
+        self._key: list[str] = []
+        self._key_escape = False
+        self._raw: list[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def done(self) -> bool:
+        """If the whole object has been parsed."""
+        return self._state == _DONE
+
+    def feed(self, data: bytes) -> list[str]:
+        """
+        Parse the next piece of the response body.
+
+        Args:
+            data: Raw response bytes
+
+        Returns:
+            Decoded pieces of the streamed field found in `data`
+        """
+        buffer = self._buffer + self._decoder.decode(data)
+        out: list[str] = []
+        pos = 0
+        end = len(buffer)
+        while pos < end:
+            state = self._state
+            if state == _CONTENT:
+                pos = self._content(buffer, pos, out)
+                if pos < 0:
+                    pos = -pos - 1
+                    break
+                continue
+            if state == _KEY:
+                pos = self._read_key(buffer, pos)
+                continue
+            if state == _RAW:
+                pos = self._read_raw(buffer, pos)
+                continue
+
+            char = buffer[pos]
+            if char.isspace():
+                pos += 1
+                continue
+            if state == _START and char == "{":
+                self._state = _KEY_OR_END
+            elif state == _KEY_OR_END and char == '"':
+                self._state = _KEY
+            elif state in (_KEY_OR_END, _AFTER) and char == "}":
+                self._state = _DONE
+            elif state == _AFTER and char == ",":
+                self._state = _KEY_OR_END
+            elif state == _COLON and char == ":":
+                self._state = _VALUE
+            elif state == _VALUE and char == '"' and self._current_key == self.field:
+                self._state = _CONTENT
+            elif state == _VALUE:
+                self._state = _RAW
+                continue
+            else:
+                raise ValueError(f"Unexpected {char!r} in paste response")
+            pos += 1
+        self._buffer = buffer[pos:]
+        return out
+
+    def close(self) -> None:
+        """
+        Check the whole object was received.
+
+        Raises:
+            ValueError: Truncated response
+        """
+        if self._state != _DONE:
+            raise ValueError("Paste response ended early")
+
+    @property
+    def _current_key(self) -> str:
+        return json.loads('"' + "".join(self._key) + '"')
+
+    def _read_key(self, buffer: str, pos: int) -> int:
+        for pos in range(pos, len(buffer)):  # noqa: B020
+            char = buffer[pos]
+            if self._key_escape:
+                self._key_escape = False
+            elif char == "\\":
+                self._key_escape = True
+            elif char == '"':
+                self._state = _COLON
+                return pos + 1
+            self._key.append(char)
+        return len(buffer)
+
+    def _read_raw(self, buffer: str, pos: int) -> int:
+        for pos in range(pos, len(buffer)):  # noqa: B020
+            char = buffer[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]" and self._depth:
+                self._depth -= 1
+            elif self._depth == 0 and (char in ",}" or char.isspace()):
+                self._finish_raw()
+                return pos
+            self._raw.append(char)
+        return len(buffer)
+
+    def _finish_raw(self) -> None:
+        self.fields[self._current_key] = json.loads("".join(self._raw))
+        self._key.clear()
+        self._raw.clear()
+        self._state = _AFTER
+
+    def _content(self, buffer: str, pos: int, out: list[str]) -> int:
+        """
+        Stream string content, returning the new position.
+
+        Returns `-pos - 1` when an escape sequence is split across chunks.
+        """
+        match = _SPECIAL.search(buffer, pos)
+        if match is None:
+            out.append(buffer[pos:])
+            return len(buffer)
+        start = match.start()
+        if start > pos:
+            out.append(buffer[pos:start])
+        if buffer[start] == '"':
+            self._key.clear()
+            self._state = _AFTER
+            return start + 1
+
+        if start + 1 >= len(buffer):
+            return -start - 1
+        escape = buffer[start + 1]
+        if escape != "u":
+            out.append(_ESCAPES[escape])
+            return start + 2
+
+        if start + 6 > len(buffer):
+            return -start - 1
+        code = int(buffer[start + 2 : start + 6], 16)
+        if 0xD800 <= code < 0xDC00:
+            if start + 12 > len(buffer):
+                return -start - 1
+            if buffer[start + 6 : start + 8] == "\\u":
+                low = int(buffer[start + 8 : start + 12], 16)
+                if 0xDC00 <= low < 0xE000:
+                    out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                    return start + 12
+        out.append(chr(code))
+        return start + 6
+
+
+class PasteStream:
+    def __init__(self, key: Optional[str] = None, spool_size: int = 1024 * 1024):
+        """
+        Turn a paste response body into plaintext chunks, decrypting on the fly.
+
+        Without a key, content is passed through as stored. With a key, content that
+        arrives before the metadata is spooled (to disk past `spool_size`) until the
+        metadata says whether the paste is encrypted.
+
+        Args:
+            key: Hexlified decryption key
+            spool_size: Bytes of content held in memory before spooling to disk
+        """
+        self.key = key
+        self.parser = PasteParser()
+        self._spool_size = spool_size
+        self._spool: Optional[SpooledTemporaryFile] = None
+        self._decryptor: Optional[CBCDecryptor | AEADDecryptor] = None
+        self._ready = key is None
+
+    @property
+    def fields(self) -> dict[str, Any]:
+        """Fields of the paste other than the content."""
+        return self.parser.fields
+
+    def feed(self, data: bytes) -> Iterator[str]:
+        """
+        Process the next piece of the response body.
+
+        Args:
+            data: Raw response bytes
+
+        Returns:
+            Iterator of plaintext chunks, which must be consumed
+        """
+        pieces = self.parser.feed(data)
+        if not self._ready:
+            if "metadata" not in self.fields:
+                self._spool_pieces(pieces)
+                return
+            yield from self._start()
+        for piece in pieces:
+            if piece := self._process(piece):
+                yield piece
+
+    def close(self) -> Iterator[str]:
+        """
+        Finish processing after the last piece of the body.
+
+        Returns:
+            Iterator of the remaining plaintext chunks, which must be consumed
+
+        Raises:
+            ValueError: Truncated response or bad key, or content failing
+                authentication, in which case every chunk already yielded must be discarded
+        """
+        self.parser.close()
+        if not self._ready:
+            yield from self._start()
+        if self._decryptor and (piece := self._decryptor.finalize()):
+            yield piece
+
+    def _process(self, piece: str) -> str:
+        return self._decryptor.update(piece) if self._decryptor else piece
+
+    def _spool_pieces(self, pieces: list[str]) -> None:
+        if not pieces:
+            return
+        if self._spool is None:
+            self._spool = SpooledTemporaryFile(self._spool_size, mode="w+", encoding="UTF-8")
+        for piece in pieces:
+            self._spool.write(piece)
+
+    def _start(self) -> Iterator[str]:
+        """Set up decryption from the metadata and replay spooled content."""
+        self._ready = True
+        encryption = (self.fields.get("metadata") or {}).get("pf_encryption")
+        if encryption:
+            iv = bytes.fromhex(encryption["iv"])
+            algorithm = get_algorithm(encryption.get("alg"))
+            self._decryptor = algorithm.decryptor(bytes.fromhex(self.key), iv)
+
+        if self._spool is None:
+            return
+        with self._spool:
+            self._spool.seek(0)
+            while chunk := self._spool.read(self._spool_size):
+                if piece := self._process(chunk):
+                    yield piece
+        self._spool = None
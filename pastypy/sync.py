@@ -1,14 +1,670 @@
 """Paste wrapper."""
 from binascii import hexlify
-from typing import Optional
+from copy import deepcopy
+from functools import partial
+from threading import Lock
+import time
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Optional,
+    TypeVar,
+)
 
-from Crypto.Cipher import AES
-from Crypto.Random import get_random_bytes
-from Crypto.Util.Padding import pad, unpad
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from pastypy.bulk import BulkResult, UploadRecord, run_threaded
+from pastypy.cache import PasteCache
+from pastypy.compression import COMPRESSION_THRESHOLD, Codec, RequestCompressor
+from pastypy.crypto import AEADEncryptor, Algorithm, CBCEncryptor, get_algorithm
+from pastypy.dedup import DedupEntry, DedupIndex, text_digest
+from pastypy.metrics import Hooks
+from pastypy.protocol import (
+    Exchange,
+    Operation,
+    PasteProtocol,
+    Request,
+    Response,
+    finish,
+)
+from pastypy.retry import RateLimiter, RetryPolicy, RetryStats
+from pastypy.routing import HEALTH_PATH, SiteRouter
+from pastypy.serialization import JSONBackend, get_backend, iter_paste_body
+from pastypy.singleflight import SingleFlight
+from pastypy.stream import PasteStream
+from pastypy.vault import TokenVault, require_vault
+
+_default_clients: dict[str, "PastyClient"] = {}
+_default_clients_lock = Lock()
+
+T = TypeVar("T")
+
+
+class PastyClient(PasteProtocol):
+    def __init__(
+        self,
+        site: str = "https://pasty.lus.pm",
+        pool_size: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        timeout: Optional[float] = 30.0,
+        session: Optional[requests.Session] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry: Optional[RetryPolicy] = None,
+        cache: Optional[PasteCache] = None,
+        json_backend: "JSONBackend | str | None" = None,
+        compression: "Codec | str | None" = None,
+        compression_threshold: int = COMPRESSION_THRESHOLD,
+        accept_encoding: Optional[str] = None,
+        vault: Optional[TokenVault] = None,
+        hooks: Optional[Hooks] = None,
+        dedup: Optional[DedupIndex] = None,
+        coalesce: bool = True,
+    ):
+        """
+        Pooled HTTP client bound to a single pasty instance.
+
+        Args:
+            site: Pasty instance, default official
+            pool_size: Maximum number of connections kept open to the site
+            pool_block: Block when the pool is exhausted instead of opening extra connections
+            keep_alive: Reuse connections between requests
+            timeout: Request timeout in seconds, `None` to wait forever
+            session: Existing session to use instead of creating one, keeping its adapters
+                and so ignoring `pool_size` and `pool_block`
+            rate_limiter: Limiter shared by every thread using this client
+            retry: Retry policy, default `RetryPolicy()`
+            cache: Cache for fetched pastes, revalidated with conditional requests
+            json_backend: JSON backend or its name, default the fastest one installed
+            compression: Codec or Content-Encoding for request bodies, `None` to send them plain
+            compression_threshold: Minimum request body size in bytes worth compressing
+            accept_encoding: Accept-Encoding to send, default every coding requests can decode
+            vault: Vault recording the modification token of every paste created
+            hooks: Instrumentation hooks, such as a `MetricsCollector`
+            dedup: Index returning existing pastes when saving identical content
+            coalesce: Share one request among concurrent gets of the same paste
+        """
+        self.site = site.rstrip("/")
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.retry = retry or RetryPolicy()
+        self.stats = RetryStats()
+        self.cache = cache
+        self.json_backend = get_backend(json_backend)
+        self.compressor = RequestCompressor(compression, compression_threshold)
+        self.vault = vault
+        self.hooks = hooks
+        self.dedup = dedup
+        self.flights = SingleFlight() if coalesce else None
+        self._session = session or requests.Session()
+        if session is None:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=pool_block)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+        self._session.headers["Accept-Encoding"] = accept_encoding or ACCEPT_ENCODING
+        if not keep_alive:
+            self._session.headers["Connection"] = "close"
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: site={self.site}>"
+
+    def __enter__(self) -> "PastyClient":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    @property
+    def sites(self) -> list[str]:
+        """Get every site the client can reach."""
+        return [self.site]
+
+    @classmethod
+    def default(cls, site: Optional[str] = "https://pasty.lus.pm") -> "PastyClient":
+        """
+        Get the shared client for a site, creating it if needed.
+
+        Args:
+            site: Pasty instance, default official
+
+        Returns:
+            Shared PastyClient instance
+        """
+        site = site.rstrip("/")
+        with _default_clients_lock:
+            client = _default_clients.get(site)
+            if client is None:
+                client = _default_clients[site] = cls(site)
+        return client
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self._session.close()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        operation: Optional[str] = None,
+        retry: Optional[RetryPolicy] = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """
+        Send a request to the site, applying rate limiting and retries.
+
+        Args:
+            method: HTTP method
+            path: Path relative to the site root
+            operation: Operation reported to hooks, default the lowercase method
+            retry: Retry policy for this request, default the client's
+            kwargs: `json`, `data` and `headers`, and extra arguments for
+                `requests.Session.request`
+
+        Returns:
+            Response object
+        """
+        exchange = self._exchange(Request.from_kwargs(method, path, operation, retry, kwargs))
+        resp = self._send(exchange, **kwargs)
+        exchange.read()
+        return resp
+
+    def _send(self, exchange: Exchange, **kwargs: Any) -> requests.Response:
+        """Send a request through its exchange, sleeping between attempts."""
+        kwargs.setdefault("timeout", self.timeout)
+        request = exchange.request
+        url = self.site + request.path
+        while True:
+            if self.rate_limiter:
+                self.stats.record_throttle(self.rate_limiter.acquire())
+            exchange.begin()
+            try:
+                resp = self._session.request(
+                    request.method, url, data=exchange.data, headers=exchange.headers, **kwargs
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                delay = exchange.failed(e)
+                if delay is None:
+                    raise
+            else:
+                delay = exchange.received(resp.status_code, resp.headers)
+                if delay is None:
+                    return resp
+                resp.close()
+            time.sleep(delay)
+
+    def _run(self, op: Operation[T]) -> T:
+        """Run an operation, reading its response whole."""
+        exchange = self._exchange(next(op))
+        with self._send(exchange, stream=True) as resp:
+            body = b""
+            try:
+                body = resp.content
+            finally:
+                exchange.read(len(body))
+            return finish(op, Response(resp.status_code, resp.headers, body, resp.raise_for_status))
+
+    def get_paste(self, id: str, cached: bool = True) -> dict:
+        """
+        Get the raw payload of a paste.
+
+        Args:
+            id: ID of paste to get
+            cached: Use the cache and share concurrent requests, `False` to ask the site
+
+        Returns:
+            Raw paste payload
+        """
+        if not cached:
+            return self._run(self._get_op(id, None))
+        entry = self._cache_entry(id)
+        if entry and entry.fresh:
+            return entry.payload()
+
+        if self.flights is None:
+            return self._run(self._get_op(id, entry))
+        raw, shared = self.flights.do(id, lambda: self._run(self._get_op(id, entry)))
+        return self._coalesced(raw, shared)
+
+    def stream_paste(self, id: str, chunk_size: int = 65536) -> Iterator[bytes]:
+        """
+        Stream the raw response body of a paste, bypassing the cache.
+
+        Args:
+            id: ID of paste to get
+            chunk_size: Bytes to read at a time
+
+        Returns:
+            Iterator of response body chunks
+        """
+        exchange = self._exchange(self._paste_request(id))
+        size = 0
+        try:
+            with self._send(exchange, stream=True) as resp:
+                resp.raise_for_status()
+                for data in resp.iter_content(chunk_size):
+                    size += len(data)
+                    yield data
+        finally:
+            exchange.read(size)
+
+    def create_paste(self, content: str, metadata: dict) -> dict:
+        """
+        Create a new paste.
+
+        Args:
+            content: Paste content
+            metadata: Paste metadata
+
+        Returns:
+            Raw paste payload, including the modification token
+        """
+        return self._run(self._create_op(content, metadata))
+
+    def upload_paste(self, chunks: Iterable[str], metadata: dict) -> dict:
+        """
+        Create a new paste from content produced in pieces, streaming the request body.
+
+        The body is sent with chunked transfer encoding as `chunks` yields, so the
+        content is never held whole. It cannot be replayed, so it is neither
+        compressed nor retried.
+
+        Args:
+            chunks: Paste content, in pieces
+            metadata: Paste metadata
+
+        Returns:
+            Raw paste payload, including the modification token
+        """
+        return self._run(self._upload_op(iter_paste_body(self.json_backend, chunks, metadata)))
+
+    def edit_paste(self, id: str, token: str, content: str, metadata: dict) -> None:
+        """
+        Replace the content and metadata of a paste.
+
+        Args:
+            id: ID of paste to edit
+            token: Modification token
+            content: New content
+            metadata: New metadata
+        """
+        self._run(self._edit_op(id, token, content, metadata))
+
+    def delete_paste(self, id: str, token: str) -> None:
+        """
+        Delete a paste.
+
+        Args:
+            id: ID of paste to delete
+            token: Modification token
+        """
+        self._run(self._delete_op(id, token))
+
+    def site_for(self, id: str) -> str:
+        """
+        Get the site a paste lives on.
+
+        Args:
+            id: Paste ID
+
+        Returns:
+            Pasty instance, always this client's site
+        """
+        return self.site
+
+    def report_paste(self, id: str, reason: str) -> Optional[dict]:
+        """
+        Report a paste.
+
+        Args:
+            id: ID of paste to report
+            reason: Report reason
+
+        Returns:
+            Raw report response, `None` if the site does not support reporting
+        """
+        return self._run(self._report_op(id, reason))
+
+
+def _unavailable(error: requests.RequestException) -> bool:
+    """Check if an error means the site is down rather than the request being wrong."""
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def _not_found(error: requests.RequestException) -> bool:
+    return (
+        isinstance(error, requests.HTTPError) and getattr(error.response, "status_code", 0) == 404
+    )
+
+
+class MultiSiteClient:
+    def __init__(
+        self,
+        sites: Iterable[str],
+        pool_size: int = 10,
+        pool_block: bool = False,
+        session: Optional[requests.Session] = None,
+        health_interval: Optional[float] = 60.0,
+        health_timeout: float = 5.0,
+        recheck_interval: float = 30.0,
+        **kwargs: Any,
+    ):
+        """
+        Client spreading pastes over several pasty instances, such as mirrors.
+
+        New pastes go to the healthy site with the lowest latency, failing over to the
+        next one on connection errors and 5xx responses. The site of every paste seen is
+        remembered, so later operations on it go to the right instance. Pastes on
+        unknown sites are looked up in the vault, then searched for in latency order.
+
+        Every site shares one session, each host keeping its own connection pool.
+        Usable anywhere a `PastyClient` is.
+
+        Args:
+            sites: Pasty instances, in order of preference until latencies are measured
+            pool_size: Maximum number of connections kept open to each site
+            pool_block: Block when a pool is exhausted instead of opening extra connections
+            session: Existing session to use instead of creating one, keeping its adapters
+                and so ignoring `pool_size` and `pool_block`
+            health_interval: Seconds between health checks, `None` to only run `check_health`
+            health_timeout: Timeout of each health check request in seconds
+            recheck_interval: Seconds a failed site is tried last before being trusted again
+            kwargs: Extra arguments for the `PastyClient` of each site, such as `retry`;
+                a `rate_limiter` is copied so that each site has its own bucket
+
+        Raises:
+            ValueError: No sites given
+        """
+        self.router = SiteRouter(sites, health_interval, recheck_interval)
+        self.health_timeout = health_timeout
+        self.vault: Optional[TokenVault] = kwargs.get("vault")
+        self.hooks: Optional[Hooks] = kwargs.get("hooks")
+        self.dedup: Optional[DedupIndex] = kwargs.get("dedup")
+        self._session = session or requests.Session()
+        if session is None:
+            adapter = HTTPAdapter(
+                pool_connections=len(self.router.sites),
+                pool_maxsize=pool_size,
+                pool_block=pool_block,
+            )
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+        limiter: Optional[RateLimiter] = kwargs.pop("rate_limiter", None)
+        self.clients = {
+            site: PastyClient(
+                site,
+                pool_size=pool_size,
+                session=self._session,
+                rate_limiter=limiter and limiter.copy(),
+                **kwargs,
+            )
+            for site in self.router.sites
+        }
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: sites={self.router.sites}>"
+
+    def __enter__(self) -> "MultiSiteClient":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    @property
+    def site(self) -> str:
+        """Get the site new pastes currently go to."""
+        return self._ranked()[0]
+
+    @property
+    def sites(self) -> list[str]:
+        """Get every site the client can reach."""
+        return self.router.sites
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self._session.close()
+
+    def check_health(self) -> dict[str, Optional[float]]:
+        """
+        Probe every site, updating its health and latency.
+
+        Any answer below 500 counts as healthy, so sites without an info endpoint
+        are still measured.
+
+        Returns:
+            Smoothed latency in seconds by site, `None` for sites never reached
+        """
+        for site in self.router.sites:
+            start = time.perf_counter()
+            try:
+                with self._session.get(site + HEALTH_PATH, timeout=self.health_timeout) as resp:
+                    status = resp.status_code
+            except requests.RequestException:
+                status = None
+            if status is None or status >= 500:
+                self.router.failed(site)
+            else:
+                self.router.succeeded(site, time.perf_counter() - start)
+        return dict(self.router.latency)
+
+    def _ranked(self) -> list[str]:
+        """Get the order to try sites in, running a health check first if due."""
+        if self.router.claim_health_check():
+            self.check_health()
+        return self.router.ranked()
+
+    def _failover(
+        self, sites: list[str], call: Callable[[PastyClient], Any], search: bool = False
+    ) -> tuple[str, Any]:
+        """
+        Call `call` with the client of each site in turn until one succeeds.
+
+        Args:
+            sites: Sites to try, in order
+            call: Operation to run against a site's client
+            search: Also move on when the paste is not found
+
+        Returns:
+            Site that succeeded and the result of `call`
+        """
+        for i, site in enumerate(sites):
+            try:
+                result = call(self.clients[site])
+            except requests.RequestException as e:
+                if _unavailable(e):
+                    self.router.failed(site)
+                elif not (search and _not_found(e)):
+                    raise
+                if i == len(sites) - 1:
+                    raise
+                continue
+            self.router.succeeded(site)
+            return site, result
+
+    def site_for(self, id: str) -> str:
+        """
+        Get the site a paste lives on, searching every site if not known.
+
+        Args:
+            id: Paste ID
+
+        Returns:
+            Pasty instance
+
+        Raises:
+            requests.HTTPError: Paste not found on any site
+        """
+        site = self.router.site_of(id)
+        if site is None and self.vault is not None:
+            site = next((s for s in self.router.sites if self.vault.get(s, id)), None)
+        if site is None:
+            site, _ = self._failover(self._ranked(), lambda c: c.get_paste(id), search=True)
+        self.router.remember(id, site)
+        return site
+
+    def get_paste(self, id: str, cached: bool = True) -> dict:
+        """
+        Get the raw payload of a paste.
+
+        Args:
+            id: ID of paste to get
+            cached: Use the cache and share concurrent requests, `False` to ask the site
+
+        Returns:
+            Raw paste payload
+        """
+        site = self.router.site_of(id)
+        sites = [site] if site else self._ranked()
+        site, raw = self._failover(sites, lambda c: c.get_paste(id, cached), search=True)
+        self.router.remember(id, site)
+        return raw
+
+    def stream_paste(self, id: str, chunk_size: int = 65536) -> Iterator[bytes]:
+        """
+        Stream the raw response body of a paste, bypassing the cache.
+
+        Args:
+            id: ID of paste to get
+            chunk_size: Bytes to read at a time
+
+        Returns:
+            Iterator of response body chunks
+        """
+        yield from self.clients[self.site_for(id)].stream_paste(id, chunk_size)
+
+    def create_paste(self, content: str, metadata: dict) -> dict:
+        """
+        Create a new paste on the best available site.
+
+        Args:
+            content: Paste content
+            metadata: Paste metadata
+
+        Returns:
+            Raw paste payload, including the modification token
+        """
+        site, raw = self._failover(self._ranked(), lambda c: c.create_paste(content, metadata))
+        self.router.remember(raw["id"], site)
+        return raw
+
+    def upload_paste(self, chunks: Iterable[str], metadata: dict) -> dict:
+        """
+        Create a new paste on the best available site, streaming the request body.
+
+        A streamed body cannot be replayed, so there is no failover once sending starts.
+
+        Args:
+            chunks: Paste content, in pieces
+            metadata: Paste metadata
+
+        Returns:
+            Raw paste payload, including the modification token
+        """
+        site, raw = self._failover(self._ranked()[:1], lambda c: c.upload_paste(chunks, metadata))
+        self.router.remember(raw["id"], site)
+        return raw
+
+    def edit_paste(self, id: str, token: str, content: str, metadata: dict) -> None:
+        """
+        Replace the content and metadata of a paste.
+
+        Args:
+            id: ID of paste to edit
+            token: Modification token
+            content: New content
+            metadata: New metadata
+        """
+        self._failover([self.site_for(id)], lambda c: c.edit_paste(id, token, content, metadata))
+
+    def delete_paste(self, id: str, token: str) -> None:
+        """
+        Delete a paste.
+
+        Args:
+            id: ID of paste to delete
+            token: Modification token
+        """
+        self._failover([self.site_for(id)], lambda c: c.delete_paste(id, token))
+        self.router.forget(id)
+
+    def report_paste(self, id: str, reason: str) -> Optional[dict]:
+        """
+        Report a paste.
+
+        Args:
+            id: ID of paste to report
+            reason: Report reason
+
+        Returns:
+            Raw report response, `None` if the site does not support reporting
+        """
+        return self._failover([self.site_for(id)], lambda c: c.report_paste(id, reason))[1]
+
+
+def _stream_encryptor(
+    metadata: dict, alg: "Algorithm | str | None"
+) -> tuple[dict, "CBCEncryptor | AEADEncryptor", str]:
+    """Set up encrypting a streamed paste, returning its metadata, encryptor and hex key."""
+    from Crypto.Random import get_random_bytes
+
+    algorithm = get_algorithm(alg)
+    key, iv = get_random_bytes(32), get_random_bytes(algorithm.iv_size)
+    encryption = {"alg": algorithm.name, "iv": hexlify(iv).decode("UTF8")}
+    metadata = {**metadata, "pf_encryption": encryption}
+    return metadata, algorithm.encryptor(key, iv), hexlify(key).decode("UTF8")
+
+
+def _encrypt_chunks(
+    chunks: Iterable[str], encryptor: "CBCEncryptor | AEADEncryptor"
+) -> Iterator[str]:
+    for chunk in chunks:
+        yield encryptor.update(chunk)
+    yield encryptor.finalize()
+
+
+class _Edit(NamedTuple):
+    """
+    Edit of a paste, planned without I/O so callers can run the encryption anywhere.
+
+    Attributes:
+        encrypt: Function to call as `encrypt(data, key, iv)` for the new content,
+            `None` if the paste is not encrypted
+        data: Plaintext to encrypt, or new content if not encrypted
+        key: Key to encrypt with and keep
+        iv: IV to encrypt with
+        plaintext: Full new plaintext, if known
+        metadata: Metadata to send with the new content
+    """
+
+    encrypt: Optional[Callable[..., str]]
+    data: str
+    key: Optional[bytes]
+    iv: Optional[bytes]
+    plaintext: Optional[str]
+    metadata: dict
 
 
 class Paste:
+    __slots__ = (
+        "_content",
+        "id",
+        "created",
+        "_metadata",
+        "_site",
+        "_client",
+        "encrypted",
+        "_plaintext",
+        "_token",
+        "_key",
+    )
+
     def __init__(
         self,
         content: str,
@@ -16,15 +672,17 @@ class Paste:
         created: Optional[int] = None,
         metadata: Optional[dict] = None,
         site: Optional[str] = None,
+        client: Optional[PastyClient] = None,
     ):
         self._content = content
         self.id = id
         self.created = created
-        self.metadata = metadata or {}
+        self._metadata = metadata or None
         self._site = site
+        self._client = client
 
-        self.encrypted = "pf_encryption" in self.metadata
-        self._plaintext = None if self.encrypted else self._content
+        self.encrypted = metadata is not None and "pf_encryption" in metadata
+        self._plaintext = None
         self._token = None
         self._key = None
 
@@ -32,43 +690,282 @@ class Paste:
         return f"<{self.__class__.__name__}: content={self.content}, encrypted={self.encrypted}>"
 
     @classmethod
-    def get(cls, id: str, site: Optional[str] = "https://pasty.lus.pm") -> "Paste":
+    def get(
+        cls,
+        id: str,
+        site: Optional[str] = "https://pasty.lus.pm",
+        client: Optional[PastyClient] = None,
+    ) -> "Paste":
         """
         Get a paste.
 
         Args:
             id: ID of paste to get
             site: Target site, default official
+            client: Client to use, default shared client for `site`
 
         Returns:
             New Paste instance
         """
-        endpoint = site + "/api/v2/pastes/"
-        resp = requests.get(endpoint + id)
-        resp.raise_for_status()
-        raw = resp.json()
-        raw["site"] = site
-        return cls(**raw)
+        client = client or PastyClient.default(site)
+        raw = client.get_paste(id)
+        return cls(**raw, client=client)
+
+    @classmethod
+    def get_many(
+        cls,
+        ids: Iterable[str],
+        site: Optional[str] = "https://pasty.lus.pm",
+        max_workers: int = 8,
+        client: Optional[PastyClient] = None,
+    ) -> list[BulkResult]:
+        """
+        Get many pastes concurrently.
+
+        Args:
+            ids: IDs of pastes to get
+            site: Target site, default official
+            max_workers: Number of worker threads
+            client: Client to use, default shared client for `site`
+
+        Returns:
+            Results in input order, with the Paste or the error for each ID
+        """
+        return sorted(cls.iter_many(ids, site, max_workers, client), key=lambda r: r.index)
+
+    @classmethod
+    def iter_many(
+        cls,
+        ids: Iterable[str],
+        site: Optional[str] = "https://pasty.lus.pm",
+        max_workers: int = 8,
+        client: Optional[PastyClient] = None,
+    ) -> Iterator[BulkResult]:
+        """
+        Get many pastes concurrently, yielding them as they arrive.
+
+        Args:
+            ids: IDs of pastes to get
+            site: Target site, default official
+            max_workers: Number of worker threads
+            client: Client to use, default shared client for `site`
+
+        Returns:
+            Iterator of results in completion order
+        """
+        client = client or PastyClient.default(site)
+        return run_threaded(lambda id: cls.get(id, client=client), ids, max_workers)
+
+    @classmethod
+    def save_many(
+        cls,
+        contents: Iterable[str],
+        site: Optional[str] = "https://pasty.lus.pm",
+        encrypt: bool = False,
+        max_workers: int = 8,
+        client: Optional[PastyClient] = None,
+    ) -> Iterator[UploadRecord]:
+        """
+        Create many pastes concurrently, yielding records as uploads finish.
+
+        Contents are pulled from `contents` only as upload slots free up, so
+        memory stays flat for arbitrarily large inputs.
+
+        Args:
+            contents: Contents of the pastes to create
+            site: Pasty instance, default official
+            encrypt: Encrypt each paste before uploading
+            max_workers: Number of worker threads, and so of requests in flight
+            client: Client to use, default shared client for `site`
+
+        Returns:
+            Iterator of upload records in completion order
+        """
+        client = client or PastyClient.default(site)
+
+        def upload(content: str) -> tuple[str, str, Optional[str], str]:
+            paste = cls(content=content, client=client)
+            if encrypt:
+                paste.encrypt()
+            token = paste.save(client=client)
+            return paste.id, token, paste.key, paste._site
+
+        for result in run_threaded(upload, contents, max_workers):
+            yield UploadRecord.from_result(result)
+
+    @classmethod
+    def delete_many(
+        cls,
+        ids: Iterable[str],
+        site: Optional[str] = "https://pasty.lus.pm",
+        max_workers: int = 8,
+        client: Optional[PastyClient] = None,
+        vault: Optional[TokenVault] = None,
+    ) -> list[BulkResult]:
+        """
+        Delete many pastes concurrently, looking up their tokens in a vault.
+
+        Args:
+            ids: IDs of pastes to delete
+            site: Target site, default official
+            max_workers: Number of worker threads
+            client: Client to use, default shared client for `site`
+            vault: Vault holding the tokens, default the client's
+
+        Returns:
+            Results in input order, with the error for each failed ID
+
+        Raises:
+            ValueError: No vault given
+        """
+        client = client or PastyClient.default(site)
+        vault = require_vault(vault, client.vault)
+
+        def delete(id: str) -> None:
+            site = client.site_for(id)
+            client.delete_paste(id, vault.require(site, id))
+            vault.discard(site, id)
+
+        return sorted(run_threaded(delete, ids, max_workers), key=lambda r: r.index)
+
+    @classmethod
+    def edit_many(
+        cls,
+        edits: "Mapping[str, str] | Iterable[tuple[str, str]]",
+        site: Optional[str] = "https://pasty.lus.pm",
+        encrypt: bool = False,
+        max_workers: int = 8,
+        client: Optional[PastyClient] = None,
+        vault: Optional[TokenVault] = None,
+    ) -> list[BulkResult]:
+        """
+        Replace the content of many pastes concurrently, looking up their tokens in a vault.
+
+        Args:
+            edits: New content by paste ID, as a mapping or `(id, content)` pairs
+            site: Target site, default official
+            encrypt: Encrypt each new content with a fresh key
+            max_workers: Number of worker threads
+            client: Client to use, default shared client for `site`
+            vault: Vault holding the tokens, default the client's
+
+        Returns:
+            Results in input order, with the new key (if encrypting) or the error for each ID
+
+        Raises:
+            ValueError: No vault given
+        """
+        client = client or PastyClient.default(site)
+        vault = require_vault(vault, client.vault)
+
+        def edit(item: tuple[str, str]) -> Optional[str]:
+            id, content = item
+            paste = cls(content=content, client=client)
+            key = paste.encrypt() if encrypt else None
+            token = vault.require(client.site_for(id), id)
+            client.edit_paste(id, token, paste._content, paste.metadata)
+            return key
+
+        pairs = edits.items() if isinstance(edits, Mapping) else edits
+        results = run_threaded(edit, pairs, max_workers)
+        return sorted((r._replace(item=r.item[0]) for r in results), key=lambda r: r.index)
+
+    @classmethod
+    def stream(
+        cls,
+        id: str,
+        site: Optional[str] = "https://pasty.lus.pm",
+        key: Optional[str] = None,
+        client: Optional[PastyClient] = None,
+        chunk_size: int = 65536,
+    ) -> Iterator[str]:
+        """
+        Stream the content of a paste without holding all of it in memory.
+
+        Args:
+            id: ID of paste to get
+            site: Target site, default official
+            key: Hexlified decryption key, content is yielded as stored without it
+            client: Client to use, default shared client for `site`
+            chunk_size: Bytes of response to read at a time
+
+        Returns:
+            Iterator of content chunks
+
+        Raises:
+            ValueError: Malformed response or wrong key
+        """
+        client = client or PastyClient.default(site)
+        stream = PasteStream(key)
+        for data in client.stream_paste(id, chunk_size):
+            yield from stream.feed(data)
+        yield from stream.close()
+
+    @classmethod
+    def save_stream(
+        cls,
+        chunks: Iterable[str],
+        site: Optional[str] = "https://pasty.lus.pm",
+        encrypt: bool = False,
+        alg: "Algorithm | str | None" = None,
+        metadata: Optional[dict] = None,
+        client: Optional[PastyClient] = None,
+    ) -> UploadRecord:
+        """
+        Create a paste from content produced in pieces, without holding all of it in memory.
+
+        Args:
+            chunks: Paste content, in pieces, such as blocks read from a file
+            site: Pasty instance, default official
+            encrypt: Encrypt the content as it is sent
+            alg: Encryption algorithm or its name, default `AES-CBC`
+            metadata: Paste metadata
+            client: Client to use, default shared client for `site`
+
+        Returns:
+            Upload record, with index 0
+
+        Raises:
+            ValueError: Unknown algorithm
+        """
+        client = client or PastyClient.default(site)
+        key = None
+        metadata = metadata or {}
+        if encrypt:
+            metadata, encryptor, key = _stream_encryptor(metadata, alg)
+            chunks = _encrypt_chunks(chunks, encryptor)
+        raw = client.upload_paste(chunks, metadata)
+        return UploadRecord(0, raw["id"], raw["modificationToken"], key, None, raw["site"])
 
     @classmethod
-    def report(cls, target: "Paste | str", reason: str, site: Optional[str] = "https://pasty.lus.pm") -> str:
+    def report(
+        cls,
+        target: "Paste | str",
+        reason: str,
+        site: Optional[str] = "https://pasty.lus.pm",
+        client: Optional[PastyClient] = None,
+    ) -> str:
         """
         Report a paste.
 
         Args:
             target: Paste or paste ID
             site: Target site, default official
+            client: Client to use, default shared client for `site`
         """
         if isinstance(target, cls):
+            client = client or target._client
             target = target.id
 
-        endpoint = site + f"/api/v2/pastes/{target}/report"
-        resp = requests.post(endpoint, json={"reason": reason})
-        if resp.status_code == 404:
+        client = client or PastyClient.default(site)
+        return cls._reported(client.report_paste(target, reason))
+
+    @staticmethod
+    def _reported(raw: Optional[dict]) -> str:
+        """Describe the outcome of a report."""
+        if raw is None:
             return "This site does not support reporting"
-        resp.raise_for_status()
 
-        raw = resp.json()
         if not raw["success"]:
             return f"Failed to report message: {raw['message']}"
 
@@ -77,7 +974,22 @@ class Paste:
     @property
     def content(self) -> str:
         """Get the Paste contents."""
-        return self._plaintext or f"<Encrypted: {self._content}>"
+        if not self.encrypted:
+            return self._content
+        if self._plaintext is None:
+            return f"<Encrypted: {self._content}>"
+        return self._plaintext
+
+    @property
+    def metadata(self) -> dict:
+        """Get the Paste metadata, created on first access when empty."""
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, metadata: dict) -> None:
+        self._metadata = metadata
 
     @property
     def url(self) -> str:
@@ -85,140 +997,341 @@ class Paste:
         if self.id:
             return self._site + f"/{self.id}"
 
-    def encrypt(self) -> str:
+    def encrypt(self, alg: "Algorithm | str | None" = None) -> str:
         """
         Encrypt a paste.
 
+        Args:
+            alg: Algorithm or its name, such as `AES-GCM`, default `AES-CBC`
+
         Returns:
             Hexlified key
 
         Raises:
-            ValueError: Cannot encrypt encrypted paste
+            ValueError: Cannot encrypt encrypted paste, or unknown algorithm
         """
+        algorithm = get_algorithm(alg)
+        key, iv = self._encryption_params(algorithm)
+        start = time.perf_counter()
+        ciphertext = algorithm.encrypt(self._content, key, iv)
+        self._crypto_done("encrypt", len(self._content), start)
+        return self._encrypted(ciphertext, key, iv, algorithm)
+
+    def _encryption_params(self, algorithm: Algorithm) -> tuple[bytes, bytes]:
+        """Generate a key and IV, checking the paste can be encrypted."""
         if self.encrypted:
             raise ValueError("Cannot encrypt encrypted paste")
-        key = get_random_bytes(32)
-        cipher = AES.new(key, mode=AES.MODE_CBC)
-        iv = cipher.iv
-        ct = cipher.encrypt(pad(self._content.encode("UTF-8"), AES.block_size))
+        from Crypto.Random import get_random_bytes
+
+        return get_random_bytes(32), get_random_bytes(algorithm.iv_size)
+
+    def _encrypted(self, ciphertext: str, key: bytes, iv: bytes, algorithm: Algorithm) -> str:
+        """Store the result of encrypting the paste and return the hexlified key."""
         self._plaintext = self._content
-        self._content = hexlify(ct).decode("UTF8")
+        self._content = ciphertext
         self._key = key
-        self.metadata["pf_encryption"] = {"alg": "AES-CBC", "iv": hexlify(iv).decode("UTF8")}
+        self.metadata["pf_encryption"] = {
+            "alg": algorithm.name,
+            "iv": hexlify(iv).decode("UTF8"),
+        }
         self.encrypted = True
         return hexlify(key).decode("UTF8")
 
+    @property
+    def key(self) -> Optional[str]:
+        """Get the hexlified key, if known."""
+        return hexlify(self._key).decode("UTF8") if self._key else None
+
+    @property
+    def algorithm(self) -> Optional[Algorithm]:
+        """Get the encryption algorithm of the paste, `None` if not encrypted."""
+        if not self.encrypted:
+            return None
+        return get_algorithm(self.metadata["pf_encryption"].get("alg"))
+
     def decrypt(self, key: Optional[str] = None) -> bool:
         """
-        Decrypt a paste
+        Decrypt a paste, with the algorithm named in its metadata.
 
         Args:
             key: Decryption key
 
         Returns:
             If decryption was successful
+
+        Raises:
+            ValueError: Wrong key, corrupted content or unknown algorithm
         """
         if not self.encrypted:
             return True
+        key, iv = self._decryption_params(key)
+        start = time.perf_counter()
+        self._plaintext = self.algorithm.decrypt(self._content, key, iv)
+        self._crypto_done("decrypt", len(self._content), start)
+        self._key = key
+        return True
+
+    def _crypto_done(self, operation: str, size: int, start: float) -> None:
+        """Report an encryption or decryption started at `start` to the client's hooks."""
+        hooks = self._client.hooks if self._client is not None else None
+        if hooks is not None:
+            hooks.on_crypto(operation, size, time.perf_counter() - start)
+
+    def _decryption_params(self, key: Optional[str]) -> tuple[bytes, bytes]:
+        """Get the key and IV to decrypt the paste with."""
         if not any([self._key, key]):
             raise ValueError("Key required if not encrypted/decrypted locally")
         key = self._key or bytes.fromhex(key)
-        iv = bytes.fromhex(self.metadata["pf_encryption"]["iv"])
-        cipher = AES.new(key, AES.MODE_CBC, iv)
-        padded = cipher.decrypt(bytes.fromhex(self._content))
-        self._plaintext = unpad(padded, AES.block_size).decode("UTF8")
-        self._key = key
-        return True
+        return key, bytes.fromhex(self.metadata["pf_encryption"]["iv"])
+
+    def _resolve_client(self, site: Optional[str], client: Optional[PastyClient]) -> PastyClient:
+        """Pick the client for an operation and bind it to this paste."""
+        self._client = client or self._client or PastyClient.default(self._site or site)
+        return self._client
 
-    def save(self, site: Optional[str] = "https://pasty.lus.pm") -> str:
+    def save(
+        self, site: Optional[str] = "https://pasty.lus.pm", client: Optional[PastyClient] = None
+    ) -> str:
         """
         Save a paste to the designated pasty instance
 
         Args:
             site: Pasty instance, default official
+            client: Client to use, default shared client for `site`
 
         Returns:
             Modification token
         """
-        if not self._site:
-            self._site = site
-        endpoint = self._site + "/api/v2/pastes"
-
-        payload = {
-            "content": self._content,
-            "metadata": self.metadata,
-        }
-
-        resp = requests.post(endpoint, json=payload)
-        resp.raise_for_status()
-        raw = resp.json()
+        client = self._resolve_client(site, client)
+        dedup, digest = client.dedup, self._dedup_digest(client.dedup)
+        if digest is not None:
+            entry = dedup.lookup(digest, client.sites)
+            if entry is not None and self._dedup_reuse(dedup, digest, entry, client):
+                return self._token
+        return self._saved(client.create_paste(self._content, self.metadata), dedup, digest)
 
+    def _saved(self, raw: dict, dedup: Optional[DedupIndex], digest: Optional[str]) -> str:
+        """Store the payload of the created paste and index it, returning its token."""
+        self._site = raw["site"]
         self.id = raw["id"]
         self.metadata = raw["metadata"]
         self.created = raw["created"]
         self._token = raw["modificationToken"]
 
+        if digest is not None:
+            dedup.add(digest, self._dedup_entry())
         return self._token
 
+    def _dedup_digest(self, dedup: Optional[DedupIndex]) -> Optional[str]:
+        """Get the deduplication key of the paste, `None` if not deduplicating."""
+        if dedup is None or (self.encrypted and (self._plaintext is None or self._key is None)):
+            return None
+        plaintext = self._plaintext if self.encrypted else self._content
+        return dedup.digest(
+            plaintext, self.metadata, self.algorithm and self.algorithm.name, self.key
+        )
+
+    def _dedup_reuse(
+        self, dedup: DedupIndex, digest: str, entry: DedupEntry, client: PastyClient
+    ) -> bool:
+        """Adopt an indexed paste, checking it is unchanged on its site if due."""
+        stored = None
+        checked = dedup.needs_check(entry)
+        if checked:
+            try:
+                stored = client.get_paste(entry.id, cached=False)["content"]
+            except requests.HTTPError as e:
+                if not _not_found(e):
+                    raise
+        return self._dedup_adopt(dedup, digest, entry, checked, stored)
+
+    def _dedup_adopt(
+        self,
+        dedup: DedupIndex,
+        digest: str,
+        entry: DedupEntry,
+        checked: bool,
+        stored: Optional[str],
+    ) -> bool:
+        """
+        Take over an indexed paste unless a check found it gone or changed.
+
+        Args:
+            dedup: Index
+            digest: Index key
+            entry: Indexed paste
+            checked: If the paste was fetched to check it
+            stored: Content fetched or already encrypted for the entry, `None` if not found
+
+        Returns:
+            If the paste was adopted
+        """
+        if checked and (stored is None or text_digest(stored) != entry.stored):
+            dedup.reject(digest)
+            return False
+        size = len(self._content)
+        if self.encrypted:
+            # The digest covers the key, so the same key and the entry's IV on the same
+            # plaintext give the stored ciphertext back
+            iv = bytes.fromhex(entry.metadata["pf_encryption"]["iv"])
+            self._content = stored or self.algorithm.encrypt(self._plaintext, self._key, iv)
+        self._site = entry.site
+        self.id = entry.id
+        self.metadata = deepcopy(entry.metadata)
+        self.created = entry.created
+        self._token = entry.token
+        dedup.hit(digest, size, checked)
+        return True
+
+    def _dedup_entry(self) -> DedupEntry:
+        """Describe the paste just uploaded for the deduplication index."""
+        now = time.time()
+        return DedupEntry(
+            self._site,
+            self.id,
+            self._token,
+            self.key,
+            deepcopy(self.metadata),
+            self.created,
+            text_digest(self._content),
+            now,
+            now,
+        )
+
     def edit(
         self,
         content: str,
         modification_token: Optional[str] = None,
         site: Optional[str] = "https://pasty.lus.pm",
+        client: Optional[PastyClient] = None,
+        reuse_key: bool = False,
     ) -> Optional[str]:
         """
-        Edit an existing paste.
+        Edit an existing paste in place.
+
+        Encrypted pastes are encrypted again with their algorithm and a fresh IV.
 
         Args:
             content: New content
             modification_token: Modification token
             site: Pasty instance, default official
+            client: Client to use, default shared client for `site`
+            reuse_key: Keep the current key so readers need no new one, instead of
+                generating one
 
         Returns:
-            New key if necessary
+            Hexlified key if encrypted
 
         Raises:
-            ValueError: Unsaved Paste or missing token
+            ValueError: Unsaved Paste, missing token, or key to reuse unknown
+        """
+        token = self._modification_token(modification_token, "edit")
+        client = self._resolve_client(site, client)
+        return self._run_edit(self._plan_edit(content, reuse_key), token, client)
+
+    def append(
+        self,
+        text: str,
+        modification_token: Optional[str] = None,
+        key: Optional[str] = None,
+        site: Optional[str] = "https://pasty.lus.pm",
+        client: Optional[PastyClient] = None,
+    ) -> Optional[str]:
         """
-        site = self._site or site
-        endpoint = site + "/api/v2/pastes/"
+        Append to the content of an existing paste in place, keeping its key.
+
+        AES-CBC pastes are extended by continuing the cipher chain from their last
+        block, so the unchanged content is not decrypted or encrypted again, and its
+        ciphertext (and so the IV) stays the same. Other algorithms must not reuse a
+        nonce, so their content is decrypted if not known and encrypted again once.
+
+        Args:
+            text: Text to append
+            modification_token: Modification token
+            key: Hexlified key, if not encrypted or decrypted locally
+            site: Pasty instance, default official
+            client: Client to use, default shared client for `site`
+
+        Returns:
+            Hexlified key if encrypted
 
+        Raises:
+            ValueError: Unsaved Paste, missing token or key, or wrong key
+        """
+        token = self._modification_token(modification_token, "edit")
+        client = self._resolve_client(site, client)
+        if self.encrypted and self.algorithm.append is None and self._plaintext is None:
+            self.decrypt(key)
+        return self._run_edit(self._plan_append(text, key), token, client)
+
+    def _modification_token(self, modification_token: Optional[str], action: str) -> str:
+        """Check the paste can be edited or deleted and remember its token."""
         if not self.id:
-            raise ValueError("Paste must be saved before editing")
+            raise ValueError(f"Paste must be saved before {action.rstrip('e')}ing")
 
         token = self._token or modification_token
         if not token:
-            raise ValueError("Token required to edit Paste")
+            raise ValueError(f"Token required to {action} Paste")
 
         self._token = token
-        key = None
-        if self.encrypted:
-            _ = self.metadata.pop("pf_encryption")
-        new_p = Paste(
-            content=content,
-            id=self.id,
-            created=self.created,
-            metadata=self.metadata,
-            site=self._site,
-        )
-        if self.encrypted:
-            key = new_p.encrypt()
+        return token
+
+    def _plan_edit(self, content: str, reuse_key: bool) -> _Edit:
+        """Plan replacing the content, with a fresh IV and optionally a fresh key."""
+        if not self.encrypted:
+            return _Edit(None, content, None, None, None, self.metadata)
+        if reuse_key and self._key is None:
+            raise ValueError("Key must be known to reuse it, decrypt the paste first")
+        from Crypto.Random import get_random_bytes
 
-        payload = {"content": new_p._content, "metadata": new_p.metadata}
+        algorithm = self.algorithm
+        key = self._key if reuse_key else get_random_bytes(32)
+        iv = get_random_bytes(algorithm.iv_size)
+        metadata = self._with_iv(algorithm, iv)
+        return _Edit(algorithm.encrypt, content, key, iv, content, metadata)
 
-        headers = {"Authorization": f"Bearer {token}"}
+    def _plan_append(self, text: str, key: Optional[str]) -> _Edit:
+        """Plan appending, continuing the ciphertext if the algorithm allows it."""
+        if not self.encrypted:
+            return _Edit(None, self._content + text, None, None, None, self.metadata)
+        algorithm = self.algorithm
+        plaintext = None if self._plaintext is None else self._plaintext + text
+        if algorithm.append is None:
+            return self._plan_edit(plaintext, reuse_key=True)
+        key, iv = self._decryption_params(key)
+        encrypt = partial(algorithm.append, self._content)
+        return _Edit(encrypt, text, key, iv, plaintext, self.metadata)
+
+    def _with_iv(self, algorithm: Algorithm, iv: bytes) -> dict:
+        """Get a copy of the metadata recording a new IV."""
+        encryption = {"alg": algorithm.name, "iv": hexlify(iv).decode("UTF8")}
+        return {**self.metadata, "pf_encryption": encryption}
 
-        resp = requests.patch(endpoint + self.id, json=payload, headers=headers)
-        resp.raise_for_status()
-        self._content = new_p._content
-        self._plaintext = new_p._plaintext
-        self._key = new_p._key
-        self.metadata = new_p.metadata
+    def _run_edit(self, plan: _Edit, token: str, client: PastyClient) -> Optional[str]:
+        """Encrypt and send a planned edit, then apply it."""
+        content = plan.data
+        if plan.encrypt is not None:
+            start = time.perf_counter()
+            content = plan.encrypt(plan.data, plan.key, plan.iv)
+            self._crypto_done("encrypt", len(plan.data), start)
+        client.edit_paste(self.id, token, content, plan.metadata)
+        return self._edited(content, plan)
 
-        return key  # noqa: R504
+    def _edited(self, content: str, plan: _Edit) -> Optional[str]:
+        """Store the result of an edit accepted by the site, returning the hexlified key."""
+        self._content = content
+        self.metadata = plan.metadata
+        if plan.key is None:
+            return None
+        self._plaintext = plan.plaintext
+        self._key = plan.key
+        return hexlify(plan.key).decode("UTF8")
 
     def delete(
-        self, modification_token: Optional[str] = None, site: Optional[str] = "https://pasty.lus.pm"
+        self,
+        modification_token: Optional[str] = None,
+        site: Optional[str] = "https://pasty.lus.pm",
+        client: Optional[PastyClient] = None,
     ) -> None:
         """
         Delete a paste.
@@ -226,22 +1339,11 @@ class Paste:
         Args:
             modification_token: Modification token
             site: Pasty instance, default official
+            client: Client to use, default shared client for `site`
 
         Raises:
             ValueError: Unsaved Paste or missing token
         """
-        site = self._site or site
-        endpoint = site + "/api/v2/pastes/"
-
-        if not self.id:
-            raise ValueError("Paste must be saved before deleting")
-
-        token = self._token or modification_token
-        if not token:
-            raise ValueError("Token required to delete Paste")
-
-        self._token = token
-
-        headers = {"Authorization": f"Bearer {token}"}
-        resp = requests.delete(endpoint + self.id, headers=headers)
-        resp.raise_for_status()
+        token = self._modification_token(modification_token, "delete")
+        client = self._resolve_client(site, client)
+        client.delete_paste(self.id, token)
@@ -0,0 +1,499 @@
+"""Local pasty-compatible stub servers for tests and benchmarks."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import secrets
+from threading import Event, Lock, Thread
+import time
+from typing import Any, Optional
+
+from pastypy.compression import COMPRESSION_THRESHOLD, available, get_codec
+
+CHUNK_SIZE = 16 * 1024
+
+
+class StubPasty:
+    def __init__(
+        self,
+        compression: bool = True,
+        latency: float = 0.0,
+        rate_limit: Optional[float] = None,
+        burst: Optional[int] = None,
+        chunked: bool = False,
+    ):
+        """
+        In-memory implementation of the pasty v2 paste API.
+
+        Args:
+            compression: Accept compressed request bodies and compress responses
+            latency: Seconds to wait before answering each request, to mimic a remote server
+            rate_limit: Requests allowed per second before answering 429, `None` for no limit
+            burst: Requests allowed at once after being idle, default `rate_limit` rounded up
+            chunked: Send HTTP/1.1 response bodies in chunks, without a Content-Length
+        """
+        self.compression = compression
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.burst = burst or max(1, int((rate_limit or 0) + 0.999))
+        self.chunked = chunked
+        self.rate_limited = 0
+        self._allowance = float(self.burst)
+        self._allowance_updated = time.monotonic()
+        self.pastes: dict[str, dict] = {}
+        self.tokens: dict[str, str] = {}
+        self.modified: dict[str, float] = {}
+        self.reports: list[tuple[str, str]] = []
+        self.requests = 0
+        self.connections = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self._codings = available() if compression else []
+        self._lock = Lock()
+
+    def connected(self) -> None:
+        """Count a new client connection."""
+        with self._lock:
+            self.connections += 1
+
+    def handle(
+        self, method: str, path: str, headers: dict[str, str], body: bytes
+    ) -> tuple[int, dict[str, str], bytes]:
+        """
+        Handle a single request.
+
+        Args:
+            method: HTTP method
+            path: Request path
+            headers: Request headers, lowercase names
+            body: Raw request body
+
+        Returns:
+            Status, response headers and response body
+        """
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += len(body)
+        if self.latency:
+            time.sleep(self.latency)
+        retry_after = self._throttle()
+        if retry_after:
+            status, resp_headers, resp_body = self._json(429, {"message": "rate limited"})
+            resp_headers["Retry-After"] = f"{retry_after:.3f}"
+            return status, resp_headers, resp_body
+
+        encoding = headers.get("content-encoding", "identity")
+        if encoding != "identity":
+            if encoding not in self._codings:
+                status, resp_headers, resp_body = self._json(415, {"message": "unsupported"})
+                resp_headers["Accept-Encoding"] = ", ".join(self._codings) or "identity"
+                return status, resp_headers, resp_body
+            body = get_codec(encoding).decompress(body)
+
+        status, resp_headers, resp_body = self._route(method, path, headers, body)
+        resp_body = self._compress(headers, resp_headers, resp_body)
+        with self._lock:
+            self.bytes_sent += len(resp_body)
+        return status, resp_headers, resp_body
+
+    def _throttle(self) -> float:
+        """Take a token from the rate limit bucket, returning the wait if none is left."""
+        if self.rate_limit is None:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._allowance_updated
+            self._allowance = min(self.burst, self._allowance + elapsed * self.rate_limit)
+            self._allowance_updated = now
+            if self._allowance >= 1:
+                self._allowance -= 1
+                return 0.0
+            self.rate_limited += 1
+            return (1 - self._allowance) / self.rate_limit
+
+    def _route(
+        self, method: str, path: str, headers: dict[str, str], body: bytes
+    ) -> tuple[int, dict[str, str], bytes]:
+        parts = path.split("?", 1)[0].strip("/").split("/")
+        if parts == ["api", "v2", "info"] and method == "GET":
+            return self._json(200, {"version": "stub", "modificationTokens": True, "reports": True})
+        if parts[:3] != ["api", "v2", "pastes"]:
+            return self._json(404, {"message": "not found"})
+
+        if len(parts) == 3 and method == "POST":
+            return self._create(body)
+        if len(parts) == 4:
+            if method == "GET":
+                return self._get(parts[3], headers)
+            if method == "PATCH":
+                return self._edit(parts[3], headers, body)
+            if method == "DELETE":
+                return self._delete(parts[3], headers)
+        if len(parts) == 5 and parts[4] == "report" and method in ("GET", "POST"):
+            return self._report(parts[3], body)
+        return self._json(405, {"message": "method not allowed"})
+
+    def _compress(
+        self, headers: dict[str, str], resp_headers: dict[str, str], body: bytes
+    ) -> bytes:
+        """Compress a response body with the best coding the client accepts."""
+        if len(body) < COMPRESSION_THRESHOLD:
+            return body
+        accepted = {c.split(";")[0].strip() for c in headers.get("accept-encoding", "").split(",")}
+        for coding in self._codings:
+            if coding in accepted:
+                resp_headers["Content-Encoding"] = coding
+                return get_codec(coding).compress(body)
+        return body
+
+    @staticmethod
+    def _json(status: int, payload: Optional[dict]) -> tuple[int, dict[str, str], bytes]:
+        body = b"" if payload is None else json.dumps(payload).encode("UTF8")
+        return status, {"Content-Type": "text/plain; charset=utf-8"}, body
+
+    def _authorized(self, id: str, headers: dict[str, str]) -> bool:
+        return headers.get("authorization") == f"Bearer {self.tokens.get(id)}"
+
+    def _create(self, body: bytes) -> tuple[int, dict[str, str], bytes]:
+        data = json.loads(body or b"{}")
+        id = secrets.token_hex(4)
+        token = secrets.token_urlsafe(24)
+        paste = {
+            "id": id,
+            "content": data.get("content", ""),
+            "created": int(time.time()),
+            "metadata": data.get("metadata") or {},
+        }
+        with self._lock:
+            self.pastes[id] = paste
+            self.tokens[id] = token
+            self.modified[id] = time.time()
+        return self._json(201, {**paste, "modificationToken": token})
+
+    def _get(self, id: str, headers: dict[str, str]) -> tuple[int, dict[str, str], bytes]:
+        paste = self.pastes.get(id)
+        if paste is None:
+            return self._json(404, {"message": "paste not found"})
+        status, resp_headers, body = self._json(200, paste)
+        modified = int(self.modified[id])
+        resp_headers["ETag"] = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        resp_headers["Last-Modified"] = formatdate(modified, usegmt=True)
+
+        if "if-none-match" in headers:
+            unchanged = headers["if-none-match"] == resp_headers["ETag"]
+        elif "if-modified-since" in headers:
+            since = parsedate_to_datetime(headers["if-modified-since"]).timestamp()
+            unchanged = modified <= since
+        else:
+            unchanged = False
+        if unchanged:
+            return 304, resp_headers, b""
+        return status, resp_headers, body
+
+    def _edit(
+        self, id: str, headers: dict[str, str], body: bytes
+    ) -> tuple[int, dict[str, str], bytes]:
+        if id not in self.pastes:
+            return self._json(404, {"message": "paste not found"})
+        if not self._authorized(id, headers):
+            return self._json(401, {"message": "unauthorized"})
+        data = json.loads(body or b"{}")
+        with self._lock:
+            paste = self.pastes[id]
+            if "content" in data:
+                paste["content"] = data["content"]
+            if "metadata" in data:
+                paste["metadata"] = data["metadata"] or {}
+            self.modified[id] = time.time()
+        return self._json(200, None)
+
+    def _delete(self, id: str, headers: dict[str, str]) -> tuple[int, dict[str, str], bytes]:
+        if id not in self.pastes:
+            return self._json(404, {"message": "paste not found"})
+        if not self._authorized(id, headers):
+            return self._json(401, {"message": "unauthorized"})
+        with self._lock:
+            del self.pastes[id]
+            del self.tokens[id]
+            del self.modified[id]
+        return self._json(200, None)
+
+    def _report(self, id: str, body: bytes) -> tuple[int, dict[str, str], bytes]:
+        if id not in self.pastes:
+            return self._json(200, {"success": False, "message": "paste not found"})
+        reason = json.loads(body).get("reason", "") if body else ""
+        with self._lock:
+            self.reports.append((id, reason))
+        return self._json(200, {"success": True, "message": "paste reported"})
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "_HTTPServer"
+
+    def setup(self) -> None:
+        """Count the connection."""
+        super().setup()
+        self.server.app.connected()
+
+    def _read_body(self) -> bytes:
+        if "chunked" not in self.headers.get("Transfer-Encoding", "").lower():
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else b""
+        body = bytearray()
+        while True:
+            size = int(self.rfile.readline().split(b";", 1)[0], 16)
+            if not size:
+                # Skip trailers up to the blank line ending the body
+                while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                return bytes(body)
+            body += self.rfile.read(size)
+            self.rfile.readline()
+
+    def _dispatch(self) -> None:
+        body = self._read_body()
+        headers = {k.lower(): v for k, v in self.headers.items()}
+        status, resp_headers, resp_body = self.server.app.handle(
+            self.command, self.path, headers, body
+        )
+        self.send_response(status)
+        for name, value in resp_headers.items():
+            self.send_header(name, value)
+        if not self.server.app.chunked:
+            self.send_header("Content-Length", str(len(resp_body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(resp_body)
+            return
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if self.command != "HEAD":
+            for start in range(0, len(resp_body), CHUNK_SIZE):
+                chunk = resp_body[start : start + CHUNK_SIZE]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+
+    do_GET = do_POST = do_PATCH = do_DELETE = do_HEAD = _dispatch
+
+    def log_message(self, *_: Any) -> None:
+        """Silence per-request logging."""
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under concurrent benchmarks
+    request_queue_size = 128
+    app: StubPasty
+
+
+class StubServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, app: Optional[StubPasty] = None):
+        """
+        Threaded HTTP server serving a StubPasty.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind, 0 picks a free one
+            app: Stub app to serve, default new empty StubPasty
+        """
+        self.app = app or StubPasty()
+        self._server = _HTTPServer((host, port), _Handler)
+        self._server.app = self.app
+        self._thread: Optional[Thread] = None
+
+    def __enter__(self) -> "StubServer":
+        self.start()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server, usable as a `site`."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        """Start serving in a background thread."""
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+class H2StubServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        app: Optional[StubPasty] = None,
+        workers: int = 256,
+    ):
+        """
+        HTTP/2 server serving a StubPasty, over cleartext with prior knowledge.
+
+        Streams of a connection are answered as soon as each request is complete, in a
+        thread pool so a slow request does not hold up the others. Requires `h2`.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind, 0 picks a free one
+            app: Stub app to serve, default new empty StubPasty
+            workers: Requests handled at once
+        """
+        import h2  # noqa: F401
+
+        self.app = app or StubPasty()
+        self._address = (host, port)
+        self._workers = workers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[Thread] = None
+        self._ready = Event()
+
+    def __enter__(self) -> "H2StubServer":
+        self.start()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server, usable as a `site`."""
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        """Start serving in a background thread."""
+        self._pool = ThreadPoolExecutor(self._workers)
+        self._loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self) -> None:
+        """Stop serving, closing every connection and the socket."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._pool.shutdown()
+
+    def _run(self) -> None:
+        loop = self._loop
+        asyncio.set_event_loop(loop)
+        self._server = loop.run_until_complete(
+            asyncio.start_server(self._serve, *self._address, backlog=128)
+        )
+        self._ready.set()
+        loop.run_forever()
+        self._server.close()
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.close()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        from h2 import events
+        from h2.config import H2Configuration
+        from h2.connection import H2Connection
+
+        self.app.connected()
+        conn = H2Connection(H2Configuration(client_side=False, header_encoding="UTF-8"))
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+        requests: dict[int, tuple[dict[str, str], bytearray]] = {}
+        window = asyncio.Event()
+        responses: set[asyncio.Task] = set()
+        try:
+            while data := await reader.read(65536):
+                for event in conn.receive_data(data):
+                    if isinstance(event, events.RequestReceived):
+                        requests[event.stream_id] = (dict(event.headers), bytearray())
+                    elif isinstance(event, events.DataReceived):
+                        if event.stream_id in requests:
+                            requests[event.stream_id][1].extend(event.data)
+                        conn.acknowledge_received_data(
+                            event.flow_controlled_length, event.stream_id
+                        )
+                    elif isinstance(event, events.StreamEnded):
+                        headers, body = requests.pop(event.stream_id)
+                        response = asyncio.ensure_future(
+                            self._respond(conn, writer, window, event.stream_id, headers, body)
+                        )
+                        responses.add(response)
+                        response.add_done_callback(responses.discard)
+                    elif isinstance(event, events.StreamReset):
+                        requests.pop(event.stream_id, None)
+                    elif isinstance(event, events.WindowUpdated):
+                        window.set()
+                    elif isinstance(event, events.ConnectionTerminated):
+                        return
+                writer.write(conn.data_to_send())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancelled by stop(), finish normally so asyncio does not report it
+            pass
+        finally:
+            for response in responses:
+                response.cancel()
+            writer.close()
+
+    async def _respond(
+        self,
+        conn: Any,
+        writer: asyncio.StreamWriter,
+        window: asyncio.Event,
+        stream_id: int,
+        headers: dict[str, str],
+        body: bytearray,
+    ) -> None:
+        """Answer a stream, sending the body as fast as flow control allows."""
+        from h2.exceptions import StreamClosedError
+
+        method, path = headers[":method"], headers[":path"]
+        headers = {k: v for k, v in headers.items() if not k.startswith(":")}
+        status, resp_headers, resp_body = await asyncio.get_running_loop().run_in_executor(
+            self._pool, self.app.handle, method, path, headers, bytes(body)
+        )
+        if method == "HEAD":
+            resp_body = b""
+        try:
+            conn.send_headers(
+                stream_id,
+                [
+                    (":status", str(status)),
+                    *((k.lower(), v) for k, v in resp_headers.items()),
+                    ("content-length", str(len(resp_body))),
+                ],
+                end_stream=not resp_body,
+            )
+            writer.write(conn.data_to_send())
+            view = memoryview(resp_body)
+            while view:
+                size = min(
+                    conn.local_flow_control_window(stream_id),
+                    conn.max_outbound_frame_size,
+                    len(view),
+                )
+                if size <= 0:
+                    window.clear()
+                    await window.wait()
+                    continue
+                conn.send_data(stream_id, view[:size].tobytes(), end_stream=size == len(view))
+                writer.write(conn.data_to_send())
+                view = view[size:]
+            await writer.drain()
+        except StreamClosedError:
+            pass
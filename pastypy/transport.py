@@ -0,0 +1,243 @@
+"""HTTP transports of the async client."""
+import asyncio
+from typing import Any, AsyncIterator, Optional
+
+from aiohttp import (
+    ClientConnectionError,
+    ClientResponseError,
+    ClientTimeout,
+    RequestInfo,
+)
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+TRANSPORTS = ("aiohttp", "httpx", "http2")
+
+
+def check_transport(transport: str) -> str:
+    """
+    Check a transport name, and that the library behind it is installed.
+
+    Transports are `aiohttp` (default), `httpx` for HTTP/1.1 over httpx, and `http2`
+    for HTTP/2 over httpx: negotiated with ALPN on https sites, assumed on http sites.
+
+    Args:
+        transport: Transport name
+
+    Returns:
+        Transport name
+
+    Raises:
+        ValueError: Unknown transport
+        ImportError: httpx, or h2 for `http2`, not installed
+    """
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown transport {transport!r}, expected one of {list(TRANSPORTS)}")
+    if transport != "aiohttp":
+        import httpx  # noqa: F401
+    if transport == "http2":
+        import h2  # noqa: F401
+    return transport
+
+
+class HTTPXSession:
+    def __init__(
+        self,
+        limit: int = 100,
+        keep_alive: bool = True,
+        keepalive_timeout: float = 15.0,
+        timeout: Optional[float] = 30.0,
+        headers: Optional[dict[str, str]] = None,
+        http2: bool = False,
+        prior_knowledge: bool = False,
+    ):
+        """
+        Session of httpx behind the subset of the aiohttp session API the async client uses.
+
+        Responses and errors look like aiohttp's, so retries, failover and error
+        handling work unchanged: failed statuses raise `aiohttp.ClientResponseError`,
+        network errors `aiohttp.ClientConnectionError` and timeouts
+        `asyncio.TimeoutError`. DNS and connect phases are not reported to hooks.
+
+        Args:
+            limit: Maximum number of simultaneous connections
+            keep_alive: Reuse connections between requests
+            keepalive_timeout: Seconds an idle connection is kept open
+            timeout: Total request timeout in seconds, `None` to wait forever
+            headers: Headers sent with every request
+            http2: Use HTTP/2 where the server supports it, multiplexing requests over
+                one connection per host
+            prior_knowledge: Speak HTTP/2 without negotiating it, needed for http sites,
+                ignored without `http2`
+        """
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=limit or None,
+            max_keepalive_connections=None if keep_alive else 0,
+            keepalive_expiry=keepalive_timeout,
+        )
+        self._client = httpx.AsyncClient(
+            http1=not (http2 and prior_knowledge),
+            http2=http2,
+            limits=limits,
+            timeout=timeout,
+            headers=headers,
+        )
+        self._timeout = timeout
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: closed={self.closed}>"
+
+    @property
+    def closed(self) -> bool:
+        """If the session was closed."""
+        return self._client.is_closed
+
+    async def close(self) -> None:
+        """Close every connection."""
+        await self._client.aclose()
+
+    def request(self, method: str, url: str, **kwargs: Any) -> "_RequestContext":
+        """
+        Start a request, like `aiohttp.ClientSession.request`.
+
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            kwargs: `data`, `headers` and `timeout`, others are ignored
+
+        Returns:
+            Awaitable response, also usable as an async context manager
+        """
+        return _RequestContext(self._send(method, url, **kwargs))
+
+    def get(self, url: str, **kwargs: Any) -> "_RequestContext":
+        """Start a GET request, like `aiohttp.ClientSession.get`."""
+        return self.request("GET", url, **kwargs)
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        data: Any = None,
+        headers: Optional[dict[str, str]] = None,
+        timeout: "ClientTimeout | float | None" = None,
+        **_: Any,
+    ) -> "HTTPXResponse":
+        import httpx
+
+        if isinstance(timeout, ClientTimeout):
+            timeout = timeout.total
+        request = self._client.build_request(
+            method,
+            url,
+            content=data,
+            headers=headers,
+            timeout=self._timeout if timeout is None else timeout,
+        )
+        try:
+            response = await self._client.send(request, stream=True)
+        except httpx.TimeoutException as e:
+            raise asyncio.TimeoutError(str(e)) from e
+        except httpx.TransportError as e:
+            raise ClientConnectionError(str(e)) from e
+        return HTTPXResponse(response)
+
+
+class _RequestContext:
+    __slots__ = ("_coro", "_response")
+
+    def __init__(self, coro: Any):
+        self._coro = coro
+        self._response: Optional[HTTPXResponse] = None
+
+    def __await__(self) -> Any:
+        return self._coro.__await__()
+
+    async def __aenter__(self) -> "HTTPXResponse":
+        self._response = await self._coro
+        return self._response
+
+    async def __aexit__(self, *_: Any) -> None:
+        await self._response.aclose()
+
+
+class _Content:
+    __slots__ = ("_response",)
+
+    def __init__(self, response: Any):
+        self._response = response
+
+    async def iter_chunked(self, size: int) -> AsyncIterator[bytes]:
+        """Yield the decoded body in chunks of up to `size` bytes."""
+        import httpx
+
+        try:
+            async for chunk in self._response.aiter_bytes(size):
+                yield chunk
+        except httpx.TransportError as e:
+            raise ClientConnectionError(str(e)) from e
+
+
+class HTTPXResponse:
+    def __init__(self, response: Any):
+        """
+        Response of httpx behind the subset of the aiohttp response API the async client uses.
+
+        Args:
+            response: Streamed `httpx.Response`
+        """
+        self._response = response
+        self.status: int = response.status_code
+        self.reason: str = response.reason_phrase
+        self.headers = CIMultiDictProxy(CIMultiDict(response.headers.multi_items()))
+        self.content = _Content(response)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: status={self.status}>"
+
+    async def __aenter__(self) -> "HTTPXResponse":
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        await self.aclose()
+
+    @property
+    def http_version(self) -> str:
+        """Protocol the response came over, such as `HTTP/2`."""
+        return self._response.http_version
+
+    async def read(self) -> bytes:
+        """Read the whole decoded body."""
+        import httpx
+
+        try:
+            return await self._response.aread()
+        except httpx.TransportError as e:
+            raise ClientConnectionError(str(e)) from e
+
+    def release(self) -> None:
+        """Give the connection back without reading the rest of the body."""
+        if not self._response.is_closed:
+            asyncio.ensure_future(self._response.aclose())
+
+    async def aclose(self) -> None:
+        """Close the response, giving the connection back."""
+        await self._response.aclose()
+
+    def raise_for_status(self) -> None:
+        """
+        Raise for 4xx and 5xx statuses, like aiohttp.
+
+        Raises:
+            aiohttp.ClientResponseError: Failed status
+        """
+        if self.status < 400:
+            return
+        request = self._response.request
+        url = URL(str(request.url))
+        info = RequestInfo(url, request.method, CIMultiDictProxy(CIMultiDict()), url)
+        raise ClientResponseError(
+            info, (), status=self.status, message=self.reason, headers=self.headers
+        )
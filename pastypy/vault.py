@@ -0,0 +1,158 @@
+"""Storage for paste modification tokens."""
+import os
+from threading import Lock
+import time
+from typing import Optional
+
+
+class TokenVault:
+    def __init__(self, path: "str | os.PathLike | None" = None):
+        """
+        Modification tokens by site and paste ID, safe to share between threads.
+
+        Tokens are kept in memory. With a path they are also written through to an
+        SQLite database, so they outlive the process and can be shared between processes.
+
+        Args:
+            path: Database file, created if missing, `None` to keep tokens in memory only
+        """
+        self.path = path
+        self._tokens: dict[tuple[str, str], str] = {}
+        self._lock = Lock()
+        self._db = None
+        if path is None:
+            return
+
+        import sqlite3
+
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tokens (site TEXT NOT NULL, id TEXT NOT NULL, "
+                "token TEXT NOT NULL, created REAL NOT NULL, PRIMARY KEY (site, id))"
+            )
+            for site, id, token in self._db.execute("SELECT site, id, token FROM tokens"):
+                self._tokens[site, id] = token
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: path={self.path}, tokens={len(self)}>"
+
+    def __len__(self):
+        with self._lock:
+            return len(self._tokens)
+
+    def close(self) -> None:
+        """Close the database connection, if any."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get(self, site: str, id: str) -> Optional[str]:
+        """
+        Look up the token for a paste.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+
+        Returns:
+            Modification token, if known
+        """
+        with self._lock:
+            token = self._tokens.get((site, id))
+            if token is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT token FROM tokens WHERE site = ? AND id = ?", (site, id)
+                ).fetchone()
+                if row is not None:
+                    token = self._tokens[site, id] = row[0]
+        return token
+
+    def require(self, site: str, id: str) -> str:
+        """
+        Look up the token for a paste that must be known.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+
+        Returns:
+            Modification token
+
+        Raises:
+            ValueError: No token for the paste
+        """
+        token = self.get(site, id)
+        if token is None:
+            raise ValueError(f"No modification token for paste {id}")
+        return token
+
+    def set(self, site: str, id: str, token: str) -> None:
+        """
+        Record the token for a paste.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+            token: Modification token
+        """
+        with self._lock:
+            self._tokens[site, id] = token
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO tokens VALUES (?, ?, ?, ?)",
+                        (site, id, token, time.time()),
+                    )
+
+    def discard(self, site: str, id: str) -> None:
+        """
+        Forget the token for a paste, if known.
+
+        Args:
+            site: Pasty instance
+            id: Paste ID
+        """
+        with self._lock:
+            self._tokens.pop((site, id), None)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM tokens WHERE site = ? AND id = ?", (site, id))
+
+    def ids(self, site: str) -> list[str]:
+        """
+        Get the IDs of every paste with a known token on a site.
+
+        Args:
+            site: Pasty instance
+
+        Returns:
+            Paste IDs
+        """
+        with self._lock:
+            if self._db is not None:
+                rows = self._db.execute("SELECT id FROM tokens WHERE site = ?", (site,))
+                return [row[0] for row in rows]
+            return [id for token_site, id in self._tokens if token_site == site]
+
+
+def require_vault(vault: Optional[TokenVault], default: Optional[TokenVault]) -> TokenVault:
+    """
+    Pick the vault for a bulk operation.
+
+    Args:
+        vault: Vault passed to the operation
+        default: Fallback vault, usually the client's
+
+    Returns:
+        Vault to use
+
+    Raises:
+        ValueError: Neither vault is set
+    """
+    vault = vault if vault is not None else default
+    if vault is None:
+        raise ValueError("Token vault required for bulk operations")
+    return vault
@@ -19,6 +19,8 @@ setup(
     package_data={"pastypy": ["py.typed", "*.pyi", "**/*.pyi"]},
     python_requires=">=3.10",
     install_requires=(Path(__file__).parent / "requirements.txt").read_text().splitlines(),
+    extras_require={"http2": ["httpx[http2]>=0.23"]},
+    entry_points={"console_scripts": ["pastypy = pastypy.cli:main"]},
     classifiers=[
         "Framework :: AsyncIO",
         "Framework :: aiohttp",
@@ -0,0 +1,18 @@
+import os
+
+import pytest
+
+from pastypy.testing import StubServer
+
+
+@pytest.fixture(scope="session")
+def stub():
+    """Local pasty stub server."""
+    with StubServer() as server:
+        yield server
+
+
+@pytest.fixture(scope="session")
+def site(stub):
+    """Site for end-to-end tests, the stub unless `PASTYPY_TEST_SITE` names a live instance."""
+    return os.environ.get("PASTYPY_TEST_SITE") or stub.url
@@ -1,18 +1,20 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import statistics
+import time
 
 import pytest
 
 from pastypy import AsyncPaste
 
-TEST_SITE = "https://paste.zevs.me"
-
 
 def get_content(test_name):
     return f"---\nTest: {test_name}\nTime: {datetime.utcnow().timestamp()}"
 
 
-def create_paste(test_name):
-    return AsyncPaste(content=get_content(test_name), site=TEST_SITE)
+def create_paste(test_name, site=None):
+    return AsyncPaste(content=get_content(test_name), site=site)
 
 
 def test_create():
@@ -38,15 +40,15 @@ def test_content():
 
 
 @pytest.mark.asyncio
-async def test_save_delete():
+async def test_save_delete(site):
     """Test saving and deleting a paste."""
-    p = create_paste("test_save")
+    p = create_paste("test_save", site)
     with pytest.raises(ValueError):
         await p.delete()
-    token = await p.save(site=TEST_SITE)
+    token = await p.save(site=site)
     assert p.id is not None
     assert p._token == token
-    assert p.url == f"{TEST_SITE}/{p.id}"
+    assert p.url == f"{site}/{p.id}"
     p._token = None
     with pytest.raises(ValueError):
         await p.delete()
@@ -54,13 +56,13 @@ async def test_save_delete():
 
 
 @pytest.mark.asyncio
-async def test_edit():
+async def test_edit(site):
     """Test editing a paste."""
-    p = create_paste("test_edit")
+    p = create_paste("test_edit", site)
     with pytest.raises(ValueError):
         await p.edit(content="NI")
     content = p.content
-    token = await p.save(site=TEST_SITE)
+    token = await p.save(site=site)
     assert p.id is not None
     assert p._token == token
 
@@ -73,9 +75,9 @@ async def test_edit():
 
 
 @pytest.mark.asyncio
-async def test_edit_enc():
+async def test_edit_enc(site):
     """Test editing an encrypted paste."""
-    p = create_paste("test_edit_enc")
+    p = create_paste("test_edit_enc", site)
     key = p.encrypt()
     md = p.metadata
     await p.save()
@@ -88,14 +90,14 @@ async def test_edit_enc():
 
 
 @pytest.mark.asyncio
-async def test_get():
+async def test_get(site):
     """Test getting a paste."""
-    p = create_paste("test_get")
-    token = await p.save(site=TEST_SITE)
+    p = create_paste("test_get", site)
+    token = await p.save(site=site)
     assert p.id is not None
     assert p._token == token
 
-    p2 = await AsyncPaste.get(p.id, site=TEST_SITE)
+    p2 = await AsyncPaste.get(p.id, site=site)
     assert p.id == p2.id
     assert p.content == p2.content
     await p.delete()
@@ -126,3 +128,58 @@ def test_decrypt():
     p._key = None
     with pytest.raises(ValueError):
         p.decrypt()
+
+
+@pytest.mark.asyncio
+async def test_encrypt_async():
+    """Test encrypting and decrypting in executors."""
+    plaintext = "test_encrypt_async" * 10
+    p = AsyncPaste(content=plaintext)
+    key = await p.encrypt_async(threshold=0)
+    assert p.content == plaintext
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        p2 = AsyncPaste(content=p._content, metadata=p.metadata)
+        assert await p2.decrypt_async(key, executor=executor, threshold=0)
+    assert p2.content == plaintext
+
+    p3 = AsyncPaste(content=p._content, metadata=p.metadata)
+    await p3.decrypt_async(key)
+    assert p3.content == plaintext
+    with pytest.raises(ValueError):
+        await p.encrypt_async()
+
+
+async def max_loop_lag(coro):
+    """Run `coro` while measuring the longest stall of the event loop."""
+    lags = []
+    done = False
+
+    async def ticker():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    await coro
+    done = True
+    await task
+    return max(lags)
+
+
+@pytest.mark.asyncio
+async def test_encrypt_async_loop_lag():
+    """Test large encryption keeps the event loop responsive."""
+    content = "x" * (16 * 1024 * 1024)
+
+    async def blocking():
+        AsyncPaste(content=content).encrypt()
+
+    # Medians of several runs, so one slow tick on a busy machine does not decide it
+    blocked, offloaded = [], []
+    for _ in range(5):
+        blocked.append(await max_loop_lag(blocking()))
+        offloaded.append(await max_loop_lag(AsyncPaste(content=content).encrypt_async()))
+    assert statistics.median(offloaded) < statistics.median(blocked) / 2
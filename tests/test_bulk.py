@@ -0,0 +1,115 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from requests import HTTPError
+
+from pastypy import AsyncPaste, Paste, PastyClient
+from pastypy.asyncio import AsyncPastyClient
+
+
+def create_pastes(site, count):
+    with PastyClient(site) as client:
+        return [client.create_paste(f"test_bulk_{i}", {})["id"] for i in range(count)]
+
+
+def test_get_many(stub):
+    """Test getting many pastes with per-ID errors."""
+    ids = create_pastes(stub.url, 10)
+    ids.insert(3, "missing")
+    results = Paste.get_many(ids, site=stub.url, max_workers=4)
+    assert [r.item for r in results] == ids
+    assert [r.index for r in results] == list(range(len(ids)))
+    assert isinstance(results[3].error, HTTPError)
+    assert not results[3].ok
+    assert all(r.ok for i, r in enumerate(results) if i != 3)
+    assert results[4].value.content == "test_bulk_3"
+
+
+def test_iter_many(stub):
+    """Test streaming many pastes."""
+    ids = create_pastes(stub.url, 10)
+    results = list(Paste.iter_many(iter(ids), site=stub.url, max_workers=3))
+    assert sorted(r.item for r in results) == sorted(ids)
+    assert all(r.value.id == r.item for r in results)
+
+
+@pytest.mark.asyncio
+async def test_async_get_many(stub):
+    """Test getting many pastes asynchronously with per-ID errors."""
+    ids = create_pastes(stub.url, 10) + ["missing"]
+    results = await AsyncPaste.get_many(ids, site=stub.url, concurrency=3)
+    assert [r.item for r in results] == ids
+    assert not results[-1].ok
+    assert isinstance(results[0].value, AsyncPaste)
+    assert results[0].value._client is None
+
+
+@pytest.mark.asyncio
+async def test_async_iter_many(stub):
+    """Test streaming many pastes asynchronously from an async iterable."""
+    ids = create_pastes(stub.url, 10)
+
+    async def source():
+        for id in ids:
+            yield id
+
+    async with AsyncPastyClient(stub.url) as client:
+        results = [r async for r in AsyncPaste.iter_many(source(), concurrency=4, client=client)]
+    assert sorted(r.item for r in results) == sorted(ids)
+    assert all(r.ok and r.value._client is client for r in results)
+
+
+def test_save_many(stub):
+    """Test bulk uploads pull input lazily."""
+    pulled = []
+
+    def contents():
+        for i in range(50):
+            pulled.append(i)
+            yield f"test_save_many_{i}"
+
+    records = Paste.save_many(contents(), site=stub.url, encrypt=True, max_workers=4)
+    first = next(records)
+    assert len(pulled) <= 4 * 2 + 4
+    records = [first, *records]
+    assert len(records) == 50
+    assert all(r.ok and r.key for r in records)
+
+    record = next(r for r in records if r.index == 7)
+    paste = Paste.get(record.id, site=stub.url)
+    paste.decrypt(record.key)
+    assert paste.content == "test_save_many_7"
+    paste.delete(record.modification_token)
+
+
+@pytest.mark.asyncio
+async def test_async_save_many(stub):
+    """Test bulk uploads from an async iterable."""
+
+    async def contents():
+        for i in range(20):
+            yield f"test_async_save_many_{i}"
+
+    records = [r async for r in AsyncPaste.save_many(contents(), site=stub.url, concurrency=4)]
+    assert sorted(r.index for r in records) == list(range(20))
+    assert all(r.ok and r.key is None for r in records)
+    assert stub.app.pastes[records[0].id]["content"].startswith("test_async_save_many_")
+
+
+@pytest.mark.asyncio
+async def test_async_save_many_encrypt(stub):
+    """Test encrypted bulk uploads encrypt in the client's executor."""
+    executor = ThreadPoolExecutor(max_workers=2)
+    submit = executor.submit
+    calls = []
+    executor.submit = lambda *a, **kw: calls.append(a) or submit(*a, **kw)
+    contents = [f"test_async_save_many_encrypt_{i}" for i in range(4)]
+    with executor:
+        async with AsyncPastyClient(
+            stub.url, crypto_executor=executor, crypto_threshold=0
+        ) as client:
+            records = [r async for r in AsyncPaste.save_many(contents, encrypt=True, client=client)]
+            assert len(calls) == 4
+            paste = await AsyncPaste.get(records[0].id, client=client)
+    paste.decrypt(records[0].key)
+    assert paste.content in contents
@@ -0,0 +1,125 @@
+import time
+
+import pytest
+
+from pastypy import AsyncPaste, Paste, PastyClient
+from pastypy.asyncio import AsyncPastyClient
+from pastypy.cache import DiskPasteCache, PasteCache, TieredCache
+
+
+def test_lru():
+    """Test size-bounded eviction."""
+    cache = PasteCache(maxsize=2)
+    for id in "abc":
+        cache.set("site", id, {"id": id, "metadata": {}})
+    assert len(cache) == 2
+    assert cache.get("site", "a") is None
+    assert cache.get("site", "b") is not None
+    cache.set("site", "d", {"id": "d"})
+    assert cache.get("site", "c") is None
+    assert cache.stats.evictions == 2
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 2
+
+
+def test_ttl():
+    """Test expired entries are kept for revalidation."""
+    cache = PasteCache(ttl=0.01)
+    cache.set("site", "a", {"id": "a", "metadata": {"x": 1}}, etag='"abc"')
+    time.sleep(0.02)
+    entry = cache.get("site", "a")
+    assert not entry.fresh
+    assert entry.validators == {"If-None-Match": '"abc"'}
+    assert cache.revalidated("site", "a").fresh
+
+    payload = entry.payload()
+    payload["metadata"]["x"] = 2
+    assert cache.get("site", "a").raw["metadata"]["x"] == 1
+
+
+def test_client_cache(stub):
+    """Test cached gets, revalidation and invalidation."""
+    cache = PasteCache(ttl=60)
+    client = PastyClient(stub.url, cache=cache)
+    p = Paste(content="test_client_cache")
+    p.save(client=client)
+
+    requests = stub.app.requests
+    assert Paste.get(p.id, client=client).content == "test_client_cache"
+    assert Paste.get(p.id, client=client).content == "test_client_cache"
+    assert stub.app.requests == requests + 1
+    assert cache.stats.hits == 1
+
+    stale = PasteCache(ttl=0)
+    stale_client = PastyClient(stub.url, cache=stale)
+    Paste.get(p.id, client=stale_client)
+    assert Paste.get(p.id, client=stale_client).content == "test_client_cache"
+    assert stale.stats.revalidations == 1
+
+    p.edit("test_client_cache_post")
+    assert Paste.get(p.id, client=client).content == "test_client_cache_post"
+    p.delete()
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_async_client_cache(stub):
+    """Test cached gets on the async client."""
+    cache = PasteCache(ttl=0)
+    async with AsyncPastyClient(stub.url, cache=cache) as client:
+        p = AsyncPaste(content="test_async_client_cache")
+        await p.save(client=client)
+        await AsyncPaste.get(p.id, client=client)
+        p2 = await AsyncPaste.get(p.id, client=client)
+        assert p2.content == "test_async_client_cache"
+        assert cache.stats.revalidations == 1
+        await p.delete()
+        assert len(cache) == 0
+
+
+def test_disk_cache(tmp_path):
+    """Test the disk cache survives reopening and stays under its size cap."""
+    cache = DiskPasteCache(tmp_path, max_bytes=400)
+    cache.set("site", "a", {"id": "a", "content": "x" * 100, "metadata": {}}, etag='"a"')
+    cache.close()
+
+    cache = DiskPasteCache(tmp_path, max_bytes=400)
+    entry = cache.get("site", "a")
+    assert entry.raw["content"] == "x" * 100
+    assert entry.etag == '"a"'
+    assert cache.stats.hits == 1
+
+    for id in "bcd":
+        cache.set("site", id, {"id": id, "content": "y" * 100, "metadata": {}})
+    assert cache.size <= 400
+    assert cache.get("site", "a") is None
+    assert cache.stats.evictions == 2
+
+    cache.set("site", "e", {"id": "e", "metadata": {}}, expires=time.time() - 1)
+    assert not cache.get("site", "e").fresh
+    assert cache.revalidated("site", "e").fresh
+    cache.set("site", "e", {"id": "e", "metadata": {}}, expires=time.time() - 1)
+    assert cache.compact() == 1
+    assert len(cache) == 2
+
+
+def test_tiered_cache(tmp_path, stub):
+    """Test a fresh process reuses pastes cached on disk."""
+    p = Paste(content="test_tiered_cache")
+    p.save(site=stub.url)
+
+    disk = DiskPasteCache(tmp_path)
+    client = PastyClient(stub.url, cache=TieredCache(PasteCache(), disk))
+    Paste.get(p.id, client=client)
+
+    requests = stub.app.requests
+    cold = TieredCache(PasteCache(), DiskPasteCache(tmp_path))
+    client = PastyClient(stub.url, cache=cold)
+    assert Paste.get(p.id, client=client).content == "test_tiered_cache"
+    assert Paste.get(p.id, client=client).content == "test_tiered_cache"
+    assert stub.app.requests == requests
+    assert cold.memory.stats.hits == 1
+    assert cold.disk.stats.hits == 1
+
+    p.delete(client=client)
+    assert cold.disk.get(stub.url, p.id) is None
@@ -0,0 +1,74 @@
+import io
+import sys
+
+from pastypy.cli import main, parse_target
+
+
+def test_parse_target():
+    """Test IDs, keys and URLs are split into site, ID and key."""
+    assert parse_target("abc", "https://site/") == ("https://site", "abc", None)
+    assert parse_target("abc#00ff", "https://site") == ("https://site", "abc", "00ff")
+    assert parse_target("http://host:8080/pasty/abc#00ff", "https://site") == (
+        "http://host:8080/pasty",
+        "abc",
+        "00ff",
+    )
+
+
+def test_cli_put_get(stub, tmp_path, monkeypatch, capsys):
+    """Test uploading files and stdin and downloading them back in order."""
+    first = tmp_path / "first.txt"
+    first.write_text("first ünïcode\n" * 10000, encoding="UTF-8")
+    second = tmp_path / "second.txt"
+    second.write_text("second", encoding="UTF-8")
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(b"from stdin")))
+
+    args = ["put", "--site", stub.url, "-e", "-a", "AES-GCM", "--block-size", "1000"]
+    assert main([*args, str(first), "-", str(second)]) == 0
+    urls = capsys.readouterr().out.split()
+    assert len(urls) == 3
+    assert all("#" in url for url in urls)
+
+    assert main(["get", "--site", stub.url, *urls]) == 0
+    assert capsys.readouterr().out == first.read_text(encoding="UTF-8") + "from stdin" + "second"
+
+    assert main(["get", urls[2]]) == 0
+    assert capsys.readouterr().out == "second"
+
+    out = tmp_path / "out"
+    assert main(["get", "-j", "1", "-o", str(out), *urls]) == 0
+    paths = capsys.readouterr().out.split()
+    assert [open(p, encoding="UTF-8").read() for p in paths[1:]] == ["from stdin", "second"]
+
+
+def test_cli_encrypt_file(stub, tmp_path, capsys):
+    """Test encrypting a file given right after the flag."""
+    notes = tmp_path / "notes.txt"
+    notes.write_text("secret notes", encoding="UTF-8")
+    assert main(["put", "--site", stub.url, "-e", str(notes)]) == 0
+    url = capsys.readouterr().out.strip()
+    id, key = url.rsplit("/", 1)[1].split("#")
+    assert stub.app.pastes[id]["metadata"]["pf_encryption"]["alg"] == "AES-CBC"
+    assert stub.app.pastes[id]["content"] != "secret notes"
+
+    assert main(["get", url]) == 0
+    assert capsys.readouterr().out == "secret notes"
+
+
+def test_cli_errors(stub, tmp_path, capsys):
+    """Test failures are reported per item without stopping the others."""
+    assert main(["put", "--site", stub.url, "-t", str(tmp_path / "missing"), "-", "-"]) == 2
+    assert "only be uploaded once" in capsys.readouterr().err
+
+    present = tmp_path / "present.txt"
+    present.write_text("present")
+    assert main(["put", "--site", stub.url, "-t", str(tmp_path / "missing"), str(present)]) == 1
+    captured = capsys.readouterr()
+    assert "missing" in captured.err
+    url, token = captured.out.split()
+    assert stub.app.tokens[url.rsplit("/", 1)[1]] == token
+
+    assert main(["get", f"{stub.url}/nonexistent", url]) == 1
+    captured = capsys.readouterr()
+    assert "nonexistent" in captured.err
+    assert captured.out == "present"
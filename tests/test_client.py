@@ -0,0 +1,98 @@
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from pastypy import AsyncPaste, Paste, PastyClient
+from pastypy.asyncio import AsyncPastyClient
+from pastypy.sync import MultiSiteClient
+
+TEST_SITE = "https://paste.zevs.me"
+
+
+def test_default_shared():
+    """Test the default client is shared per site."""
+    client = PastyClient.default(TEST_SITE)
+    assert PastyClient.default(TEST_SITE + "/") is client
+    assert PastyClient.default("https://pasty.example.com") is not client
+
+
+def test_pool():
+    """Test pool configuration."""
+    with PastyClient(TEST_SITE, pool_size=32, keep_alive=False, timeout=5) as client:
+        adapter = client._session.get_adapter(TEST_SITE)
+        assert adapter._pool_maxsize == 32
+        assert client._session.headers["Connection"] == "close"
+        assert client.timeout == 5
+
+
+def test_own_session():
+    """Test a session passed in keeps its adapters."""
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=3)
+    session.mount("https://", adapter)
+    with PastyClient(TEST_SITE, pool_size=32, session=session) as client:
+        assert client._session.get_adapter(TEST_SITE) is adapter
+    with MultiSiteClient([TEST_SITE, "https://pasty.example.com"], session=session):
+        assert session.get_adapter(TEST_SITE) is adapter
+
+    with MultiSiteClient([TEST_SITE, "https://pasty.example.com"], pool_size=8) as client:
+        adapter = client._session.get_adapter(TEST_SITE)
+        assert adapter._pool_maxsize == 8
+        assert all(c._session.get_adapter(TEST_SITE) is adapter for c in client.clients.values())
+
+
+def test_bind():
+    """Test pastes remember their client."""
+    client = PastyClient(TEST_SITE)
+    p = Paste(content="test_bind", client=client)
+    assert p._resolve_client(None, None) is client
+
+    p = Paste(content="test_bind", site=TEST_SITE)
+    assert p._resolve_client(None, None) is PastyClient.default(TEST_SITE)
+
+
+def test_stub_roundtrip(stub):
+    """Test a full paste lifecycle over a pooled client."""
+    with PastyClient(stub.url) as client:
+        p = Paste(content="test_stub_roundtrip")
+        token = p.save(client=client)
+        assert p.url == f"{stub.url}/{p.id}"
+
+        p2 = Paste.get(p.id, client=client)
+        assert p2.content == p.content
+        assert p2._client is client
+
+        p.edit("test_stub_roundtrip_post")
+        assert Paste.get(p.id, client=client).content == "test_stub_roundtrip_post"
+        assert Paste.report(p, "spam").startswith("Reported")
+        p.delete(token)
+        assert p.id not in stub.app.pastes
+
+
+@pytest.mark.asyncio
+async def test_async_stub_roundtrip(stub):
+    """Test a full paste lifecycle over a shared async client."""
+    async with AsyncPastyClient(stub.url, limit=4, keep_alive=False) as client:
+        p = AsyncPaste(content="test_async_stub_roundtrip")
+        key = p.encrypt()
+        token = await p.save(client=client)
+
+        p2 = await AsyncPaste.get(p.id, client=client)
+        assert p2.decrypt(key)
+        assert p2.content == "test_async_stub_roundtrip"
+
+        assert await p.edit("test_async_stub_roundtrip_post") != key
+        await p.delete(token)
+        assert p.id not in stub.app.pastes
+    assert client._session is None
+
+
+@pytest.mark.asyncio
+async def test_async_temporary_client(stub):
+    """Test operations without an explicit client."""
+    p = AsyncPaste(content="test_async_temporary_client", site=stub.url)
+    await p.save()
+    assert p._client is None
+    p2 = await AsyncPaste.get(p.id, site=stub.url)
+    assert p2.content == p.content
+    await p.delete()
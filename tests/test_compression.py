@@ -0,0 +1,118 @@
+import pytest
+
+from pastypy import AsyncPaste, AsyncPastyClient, Paste, PastyClient
+from pastypy.asyncio import _accept_encoding
+from pastypy.compression import CODECS, RequestCompressor, _gzip, available, get_codec
+from pastypy.testing import StubPasty, StubServer
+
+LOG = "".join(
+    f"2024-01-01T00:00:{i % 60:02d}Z INFO worker-{i % 8} handled request {i} in {i % 97}ms\n"
+    for i in range(2000)
+)
+
+
+@pytest.mark.parametrize("name", available())
+def test_codecs(name):
+    """Test every installed codec round-trips."""
+    codec = get_codec(name)
+    data = LOG.encode()
+    assert codec.decompress(codec.compress(data)) == data
+    with pytest.raises(ValueError):
+        get_codec("lzma")
+
+
+def test_compressor():
+    """Test the size threshold and backing off after a 400 or 415."""
+    compressor = RequestCompressor("gzip", threshold=100)
+    headers = {"Content-Type": "application/json"}
+    assert compressor.compress(b"x" * 99, headers) == (b"x" * 99, headers)
+    data, sent = compressor.compress(b"x" * 100, headers)
+    assert sent["Content-Encoding"] == "gzip"
+    assert not compressor.rejected(500, sent)
+    assert not compressor.rejected(400, headers)
+    assert compressor.rejected(400, sent)
+    compressor.plain_accepted(400)
+    assert compressor.supported
+    assert compressor.rejected(415, sent)
+    assert compressor.compress(b"x" * 100, headers) == (b"x" * 100, headers)
+    assert RequestCompressor(None).compress(b"x" * 2000, headers)[0] == b"x" * 2000
+
+
+def test_compressed_roundtrip(stub):
+    """Test compressed uploads and downloads shrink the bytes on the wire."""
+    with PastyClient(stub.url, compression="gzip") as client:
+        received, sent = stub.app.bytes_received, stub.app.bytes_sent
+        p = Paste(content=LOG)
+        p.save(client=client)
+        assert stub.app.bytes_received - received < len(LOG) / 4
+        assert Paste.get(p.id, client=client).content == LOG
+        assert "".join(Paste.stream(p.id, client=client)) == LOG
+        assert stub.app.bytes_sent - sent < len(LOG) / 2
+
+
+def test_compression_fallback():
+    """Test a server rejecting compressed bodies gets them uncompressed."""
+    with StubServer(app=StubPasty(compression=False)) as server:
+        with PastyClient(server.url, compression="gzip") as client:
+            p = Paste(content=LOG)
+            p.save(client=client)
+            assert not client.compressor.supported
+            assert server.app.pastes[p.id]["content"] == LOG
+            assert server.app.requests == 2
+            p.edit(LOG + "edited")
+            assert server.app.requests == 3
+
+
+class BadRequestPasty(StubPasty):
+    def __init__(self, plain: bool = True):
+        """Stub that answers 400 to compressed bodies, and to plain ones unless `plain`."""
+        super().__init__()
+        self.plain = plain
+
+    def handle(self, method, path, headers, body):
+        if "content-encoding" in headers or not self.plain:
+            with self._lock:
+                self.requests += 1
+            return self._json(400, {"message": "invalid JSON"})
+        return super().handle(method, path, headers, body)
+
+
+def test_compression_fallback_bad_request():
+    """Test a 400 to a compressed body is retried uncompressed, backing off if that works."""
+    with StubServer(app=BadRequestPasty()) as server:
+        with PastyClient(server.url, compression="gzip") as client:
+            p = Paste(content=LOG)
+            p.save(client=client)
+            assert not client.compressor.supported
+            assert server.app.pastes[p.id]["content"] == LOG
+            assert server.app.requests == 2
+
+    with StubServer(app=BadRequestPasty(plain=False)) as server:
+        with PastyClient(server.url, compression="gzip") as client:
+            resp = client.request("POST", "/api/v2/pastes", json={"content": LOG})
+            assert resp.status_code == 400
+            assert client.compressor.supported
+            assert server.app.requests == 2
+
+
+@pytest.mark.asyncio
+async def test_async_compressed_roundtrip(stub):
+    """Test compressed uploads and downloads on the async client."""
+    async with AsyncPastyClient(stub.url, compression="gzip") as client:
+        received = stub.app.bytes_received
+        p = AsyncPaste(content=LOG)
+        await p.save(client=client)
+        assert stub.app.bytes_received - received < len(LOG) / 4
+        assert (await AsyncPaste.get(p.id, client=client)).content == LOG
+
+
+def test_accept_encoding(monkeypatch):
+    """Test the async client only accepts brotli when a library can decode it."""
+
+    def missing():
+        raise ImportError("brotli")
+
+    monkeypatch.setitem(CODECS, "br", missing)
+    assert _accept_encoding() == "gzip, deflate"
+    monkeypatch.setitem(CODECS, "br", _gzip)
+    assert _accept_encoding() == "gzip, deflate, br"
@@ -0,0 +1,135 @@
+import os
+
+from Crypto.Cipher import AES, ChaCha20_Poly1305
+from Crypto.Util.Padding import pad
+import pytest
+
+from pastypy import AsyncPaste, AsyncPastyClient, Paste, PastyClient
+from pastypy.crypto import (
+    AEADDecryptor,
+    AEADEncryptor,
+    CBCDecryptor,
+    CBCEncryptor,
+    decrypt_aead,
+    decrypt_cbc,
+    encrypt_aead,
+    encrypt_cbc,
+    get_algorithm,
+)
+
+KEY = os.urandom(32)
+IV = os.urandom(16)
+TEXTS = ["", "a", "x" * 16, "unicode: é€😀\n" * 1000]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_cbc(text):
+    """Test in-place encryption matches the reference implementation."""
+    ct = encrypt_cbc(text, KEY, IV)
+    assert ct == AES.new(KEY, AES.MODE_CBC, IV).encrypt(pad(text.encode(), 16)).hex()
+    assert decrypt_cbc(ct, KEY, IV) == text
+    assert encrypt_cbc(text, KEY, IV, chunk_size=100) == ct
+    assert decrypt_cbc(ct, KEY, IV, chunk_size=100) == text
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_cbc_incremental(text):
+    """Test chunked encryption and decryption with uneven chunk boundaries."""
+    encryptor = CBCEncryptor(KEY, IV)
+    ct = "".join(encryptor.update(text[i : i + 7]) for i in range(0, len(text), 7))
+    ct += encryptor.finalize()
+    assert ct == encrypt_cbc(text, KEY, IV)
+
+    decryptor = CBCDecryptor(KEY, IV)
+    plain = "".join(decryptor.update(ct[i : i + 13]) for i in range(0, len(ct), 13))
+    assert plain + decryptor.finalize() == text
+
+
+def test_cbc_errors():
+    """Test wrong keys and truncated ciphertexts are rejected."""
+    ct = encrypt_cbc("test_cbc_errors", KEY, IV)
+    with pytest.raises(ValueError):
+        decrypt_cbc(ct, os.urandom(32), IV)
+    with pytest.raises(ValueError):
+        decrypt_cbc(ct[:-2], KEY, IV)
+    decryptor = CBCDecryptor(KEY, IV)
+    decryptor.update(ct[:-32])
+    with pytest.raises(ValueError):
+        decryptor.finalize()
+
+
+@pytest.mark.parametrize("alg", ["AES-GCM", "ChaCha20-Poly1305"])
+@pytest.mark.parametrize("text", TEXTS)
+def test_aead(alg, text):
+    """Test AEAD encryption matches the reference implementation, tag appended."""
+    nonce = os.urandom(12)
+    if alg == "AES-GCM":
+        reference = AES.new(KEY, AES.MODE_GCM, nonce=nonce)
+    else:
+        reference = ChaCha20_Poly1305.new(key=KEY, nonce=nonce)
+    ct = encrypt_aead(text, KEY, nonce, alg=alg)
+    assert ct == b"".join(reference.encrypt_and_digest(text.encode())).hex()
+    assert decrypt_aead(ct, KEY, nonce, alg=alg) == text
+    assert encrypt_aead(text, KEY, nonce, chunk_size=100, alg=alg) == ct
+    assert decrypt_aead(ct, KEY, nonce, chunk_size=100, alg=alg) == text
+
+    encryptor = AEADEncryptor(KEY, nonce, alg)
+    chunked = "".join(encryptor.update(text[i : i + 7]) for i in range(0, len(text), 7))
+    assert chunked + encryptor.finalize() == ct
+
+    decryptor = AEADDecryptor(KEY, nonce, alg)
+    plain = "".join(decryptor.update(ct[i : i + 13]) for i in range(0, len(ct), 13))
+    assert plain + decryptor.finalize() == text
+
+
+def test_aead_errors():
+    """Test tampering, wrong keys and truncation are detected."""
+    nonce = os.urandom(12)
+    ct = encrypt_aead("test_aead_errors", KEY, nonce)
+    tampered = ("0" if ct[0] != "0" else "1") + ct[1:]
+    for bad in (tampered, ct[:-2], ct[:20]):
+        with pytest.raises(ValueError):
+            decrypt_aead(bad, KEY, nonce)
+    with pytest.raises(ValueError):
+        decrypt_aead(ct, os.urandom(32), nonce)
+    decryptor = AEADDecryptor(KEY, nonce)
+    with pytest.raises(ValueError):
+        # Unauthenticated plaintext may already fail to decode before the tag check
+        decryptor.update(tampered)
+        decryptor.finalize()
+    with pytest.raises(ValueError):
+        get_algorithm("ROT13")
+
+
+@pytest.mark.parametrize("alg", ["AES-CBC", "AES-GCM", "ChaCha20-Poly1305"])
+def test_paste_algorithms(stub, alg):
+    """Test pastes are encrypted with the chosen algorithm and decrypted by detecting it."""
+    with PastyClient(stub.url) as client:
+        paste = Paste(content="test_paste_algorithms")
+        key = paste.encrypt(alg)
+        paste.save(client=client)
+        assert paste.metadata["pf_encryption"]["alg"] == alg
+
+        fetched = Paste.get(paste.id, client=client)
+        assert fetched.algorithm.name == alg
+        fetched.decrypt(key)
+        assert fetched.content == "test_paste_algorithms"
+
+        key = paste.edit("edited")
+        assert paste.metadata["pf_encryption"]["alg"] == alg
+        fetched = Paste.get(paste.id, client=client)
+        fetched.decrypt(key)
+        assert fetched.content == "edited"
+        assert "".join(Paste.stream(paste.id, key=key, client=client)) == "edited"
+
+
+@pytest.mark.asyncio
+async def test_async_paste_algorithms(stub):
+    """Test async encryption in the executor with an AEAD algorithm."""
+    async with AsyncPastyClient(stub.url) as client:
+        paste = AsyncPaste(content="x" * 1000)
+        key = await paste.encrypt_async(threshold=0, alg="AES-GCM")
+        await paste.save(client=client)
+        fetched = await AsyncPaste.get(paste.id, client=client)
+        await fetched.decrypt_async(key, threshold=0)
+        assert fetched.content == "x" * 1000
@@ -0,0 +1,192 @@
+from copy import deepcopy
+import time
+
+import pytest
+
+from pastypy import AsyncPaste, AsyncPastyClient, Paste, PastyClient
+from pastypy.cache import PasteCache
+from pastypy.dedup import DedupIndex
+
+
+def test_dedup_plain(stub):
+    """Test saving the same content twice reuses the first paste."""
+    dedup = DedupIndex(revalidate=None)
+    with PastyClient(stub.url, dedup=dedup) as client:
+        first = Paste(content="test_dedup_plain")
+        token = first.save(client=client)
+        requests = stub.app.requests
+
+        second = Paste(content="test_dedup_plain")
+        assert second.save(client=client) == token
+        assert second.id == first.id
+        assert stub.app.requests == requests
+
+        other = Paste(content="test_dedup_plain", metadata={"lang": "py"})
+        other.save(client=client)
+        assert other.id != first.id
+
+    assert dedup.stats.hits == 1
+    assert dedup.stats.misses == 2
+    assert dedup.stats.bytes_saved == len("test_dedup_plain")
+    assert dedup.stats.hit_rate == pytest.approx(1 / 3)
+
+
+def test_dedup_encrypted(stub):
+    """Test encrypted pastes are only reused under the key their caller holds."""
+    dedup = DedupIndex(revalidate=None)
+    with PastyClient(stub.url, dedup=dedup) as client:
+        first = Paste(content="test_dedup_encrypted")
+        key = first.encrypt("AES-GCM")
+        first.save(client=client)
+
+        # A fresh key must keep decrypting what was saved, so nothing is reused
+        second = Paste(content="test_dedup_encrypted")
+        second_key = second.encrypt("AES-GCM")
+        second.save(client=client)
+        assert second.id != first.id
+        fetched = Paste.get(second.id, client=client)
+        fetched.decrypt(second_key)
+        assert fetched.content == "test_dedup_encrypted"
+
+        # The same plaintext under the same key is the paste already saved
+        again = Paste(content=first._content, metadata=deepcopy(first.metadata))
+        again.decrypt(key)
+        requests = stub.app.requests
+        again.save(client=client)
+        assert again.id == first.id
+        assert again.key == key
+        assert again._content == first._content
+        assert stub.app.requests == requests
+
+        cbc = Paste(content="test_dedup_encrypted")
+        cbc.encrypt()
+        cbc.save(client=client)
+        plain = Paste(content="test_dedup_encrypted")
+        plain.save(client=client)
+        assert len({first.id, second.id, cbc.id, plain.id}) == 4
+
+
+def test_dedup_stale(stub):
+    """Test deleted, edited and expired pastes are uploaded again."""
+    dedup = DedupIndex(revalidate=0)
+    with PastyClient(stub.url, dedup=dedup) as client:
+        first = Paste(content="test_dedup_stale")
+        first.save(client=client)
+        again = Paste(content="test_dedup_stale")
+        again.save(client=client)
+        assert again.id == first.id
+        assert dedup.stats.validations == 1
+
+        # Deleted behind the index's back
+        stub.app.pastes.pop(first.id)
+        replaced = Paste(content="test_dedup_stale")
+        replaced.save(client=client)
+        assert replaced.id != first.id
+        assert dedup.stats.stale == 1
+
+        # Edits through the client drop the entry without a check
+        replaced.edit("edited", client=client)
+        assert len(dedup) == 0
+
+    dedup = DedupIndex(ttl=0.05, revalidate=None)
+    with PastyClient(stub.url, dedup=dedup) as client:
+        first = Paste(content="test_dedup_ttl")
+        first.save(client=client)
+        time.sleep(0.1)
+        second = Paste(content="test_dedup_ttl")
+        second.save(client=client)
+        assert second.id != first.id
+
+
+def test_dedup_cached(stub):
+    """Test checks of indexed pastes ask the site, not the cache."""
+    dedup = DedupIndex(revalidate=0)
+    with PastyClient(stub.url, cache=PasteCache(ttl=60), dedup=dedup) as client:
+        first = Paste(content="test_dedup_cached")
+        first.save(client=client)
+        Paste.get(first.id, client=client)
+        stub.app.pastes.pop(first.id)
+        again = Paste(content="test_dedup_cached")
+        again.save(client=client)
+        assert again.id != first.id
+        assert dedup.stats.validations == 1
+        assert dedup.stats.stale == 1
+
+
+@pytest.mark.asyncio
+async def test_dedup_cached_async(stub):
+    """Test async checks of indexed pastes ask the site, not the cache."""
+    dedup = DedupIndex(revalidate=0)
+    async with AsyncPastyClient(stub.url, cache=PasteCache(ttl=60), dedup=dedup) as client:
+        first = AsyncPaste(content="test_dedup_cached_async")
+        await first.save(client=client)
+        await AsyncPaste.get(first.id, client=client)
+        stub.app.pastes.pop(first.id)
+        again = AsyncPaste(content="test_dedup_cached_async")
+        await again.save(client=client)
+        assert again.id != first.id
+        assert dedup.stats.stale == 1
+
+
+def test_dedup_persistent(stub, tmp_path):
+    """Test entries survive reopening a persistent index."""
+    dedup = DedupIndex(tmp_path / "dedup.sqlite3")
+    with PastyClient(stub.url, dedup=dedup) as client:
+        first = Paste(content="test_dedup_persistent")
+        key = first.encrypt()
+        first.save(client=client)
+    dedup.close()
+
+    dedup = DedupIndex(tmp_path / "dedup.sqlite3")
+    assert len(dedup) == 1
+    with PastyClient(stub.url, dedup=dedup) as client:
+        second = Paste(content=first._content, metadata=deepcopy(first.metadata))
+        second.decrypt(key)
+        second.save(client=client)
+        assert (second.id, second.key) == (first.id, first.key)
+        assert second.metadata == first.metadata
+    with PastyClient("http://other.invalid", dedup=dedup) as client:
+        assert dedup.lookup(next(iter(dedup._entries)), client.sites) is None
+    dedup.close()
+
+
+@pytest.mark.asyncio
+async def test_dedup_async(stub):
+    """Test the async client deduplicates, checking entries against the site."""
+    dedup = DedupIndex()
+    async with AsyncPastyClient(stub.url, dedup=dedup) as client:
+        records = [
+            r
+            async for r in AsyncPaste.save_many(
+                ["test_dedup_async a", "test_dedup_async b", "test_dedup_async a"],
+                client=client,
+                concurrency=1,
+            )
+        ]
+        records.sort(key=lambda r: r.index)
+        assert records[0].id == records[2].id
+
+        encrypted = AsyncPaste(content="test_dedup_async a")
+        key = encrypted.encrypt()
+        await encrypted.save(client=client)
+        assert encrypted.id != records[0].id
+        again = AsyncPaste(content=encrypted._content, metadata=deepcopy(encrypted.metadata))
+        await again.decrypt_async(key)
+        await again.save(client=client)
+        assert again.id == encrypted.id
+        assert (await AsyncPaste.get(again.id, client=client, key=key)).content == (
+            "test_dedup_async a"
+        )
+
+        dedup.revalidate = 0
+        paste = AsyncPaste(content="test_dedup_async a")
+        await paste.save(client=client)
+        assert paste.id == records[0].id
+        await paste.delete(client=client)
+        assert len(dedup) == 2
+
+        paste = AsyncPaste(content="test_dedup_async b")
+        stub.app.pastes.pop(records[1].id)
+        await paste.save(client=client)
+        assert paste.id != records[1].id
+        assert dedup.stats.stale == 1
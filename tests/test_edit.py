@@ -0,0 +1,83 @@
+import pytest
+
+from pastypy import AsyncPaste, AsyncPastyClient, Paste, PastyClient
+
+
+def fetch(client, paste, key):
+    fetched = Paste.get(paste.id, client=client)
+    fetched.decrypt(key)
+    return fetched.content
+
+
+def test_edit_in_place(stub):
+    """Test editing keeps or replaces the key and always changes the IV."""
+    with PastyClient(stub.url) as client:
+        paste = Paste(content="test_edit_in_place")
+        key = paste.encrypt("AES-GCM")
+        paste.save(client=client)
+        iv = paste.metadata["pf_encryption"]["iv"]
+
+        assert paste.edit("reused", client=client, reuse_key=True) == key
+        assert paste.metadata["pf_encryption"]["iv"] != iv
+        assert paste.content == "reused"
+        assert fetch(client, paste, key) == "reused"
+
+        new_key = paste.edit("replaced", client=client)
+        assert new_key != key
+        assert fetch(client, paste, new_key) == "replaced"
+
+        fetched = Paste.get(paste.id, client=client)
+        fetched._token = paste._token
+        with pytest.raises(ValueError):
+            fetched.edit("no key", reuse_key=True)
+
+
+def test_edit_plain(stub):
+    """Test plain pastes are edited and appended without keys."""
+    with PastyClient(stub.url) as client:
+        paste = Paste(content="plain")
+        paste.save(client=client)
+        assert paste.edit("edited", client=client) is None
+        assert paste.append(" and appended", client=client) is None
+        assert Paste.get(paste.id, client=client).content == "edited and appended"
+
+
+@pytest.mark.parametrize("alg", ["AES-CBC", "AES-GCM", "ChaCha20-Poly1305"])
+def test_append(stub, alg):
+    """Test appending keeps the key, continuing CBC ciphertexts."""
+    with PastyClient(stub.url) as client:
+        paste = Paste(content="line\n" * 100)
+        key = paste.encrypt(alg)
+        paste.save(client=client)
+        ciphertext = paste._content
+
+        assert paste.append("more é€😀\n", client=client) == key
+        assert paste.content == "line\n" * 100 + "more é€😀\n"
+        assert fetch(client, paste, key) == paste.content
+        if alg == "AES-CBC":
+            assert paste._content[: len(ciphertext) - 32] == ciphertext[:-32]
+
+        # A paste never decrypted locally needs the key
+        fetched = Paste.get(paste.id, client=client)
+        with pytest.raises(ValueError):
+            fetched.append("no key", paste._token)
+        fetched.append("last", paste._token, key=key)
+        assert fetch(client, paste, key) == "line\n" * 100 + "more é€😀\nlast"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("alg", ["AES-CBC", "AES-GCM"])
+async def test_async_edit(stub, alg):
+    """Test async edits and appends with encryption in the executor."""
+    async with AsyncPastyClient(stub.url, crypto_threshold=0) as client:
+        paste = AsyncPaste(content="x" * 1000)
+        key = await paste.encrypt_async(alg=alg)
+        await paste.save(client=client)
+
+        assert await paste.edit("y" * 1000, client=client, reuse_key=True) == key
+        assert await paste.append("z", client=client) == key
+
+        fetched = await AsyncPaste.get(paste.id, client=client)
+        await fetched.append("z" * 10, paste._token, key=key)
+        fetched = await AsyncPaste.get(paste.id, client=client, key=key)
+        assert fetched.content == "y" * 1000 + "z" * 11
@@ -0,0 +1,59 @@
+import os
+import subprocess  # noqa: S404
+import sys
+
+import pytest
+
+# Combined self time of pastypy's own modules for a sync-only import, best of three runs
+BUDGET_MS = float(os.environ.get("PASTYPY_IMPORT_BUDGET_MS", 50))
+
+
+def importtime(code: str) -> tuple[dict[str, int], str]:
+    """Run `code` in a fresh interpreter, returning self import times in µs and its output."""
+    proc = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            own, _, name = line[len("import time:") :].split("|")
+            if own.strip().isdigit():
+                times[name.strip()] = int(own)
+    return times, proc.stdout
+
+
+@pytest.mark.parametrize(
+    "code,absent",
+    [
+        ("import pastypy", ["requests", "aiohttp", "Crypto"]),
+        ("from pastypy import Paste, PastyClient", ["aiohttp", "asyncio", "Crypto", "sqlite3"]),
+        ("from pastypy import AsyncPaste", ["Crypto", "sqlite3"]),
+    ],
+)
+def test_lazy_imports(code, absent):
+    """Test heavy dependencies are only imported when needed."""
+    times, _ = importtime(code)
+    assert not [name for name in times if name.split(".")[0] in absent]
+
+
+def test_crypto_on_first_use():
+    """Test pycryptodome is imported by the first encryption."""
+    code = (
+        "import sys; from pastypy import Paste; p = Paste('x'); "
+        "print('Crypto' in sys.modules); p.encrypt(); print('Crypto' in sys.modules)"
+    )
+    assert importtime(code)[1].split() == ["False", "True"]
+
+
+def test_import_budget():
+    """Test pastypy's own import overhead stays within budget."""
+    best = min(
+        sum(
+            t for name, t in importtime("from pastypy import Paste")[0].items() if "pastypy" in name
+        )
+        for _ in range(3)
+    )
+    assert best / 1000 < BUDGET_MS
@@ -0,0 +1,139 @@
+import pytest
+
+from pastypy import AsyncPaste, AsyncPastyClient, Paste, PastyClient
+from pastypy.metrics import CompositeHooks, Histogram, Hooks, MetricsCollector
+from pastypy.retry import RetryPolicy
+from pastypy.testing import StubPasty, StubServer
+
+from .test_retry import FlakyPasty
+
+
+class Recorder(Hooks):
+    def __init__(self):
+        self.events = []
+
+    def on_request_start(self, event):
+        self.events.append(("start", event.operation, event.attempt))
+
+    def on_request_end(self, event):
+        self.events.append(("end", event.operation, event.status))
+
+    def on_retry(self, event, delay):
+        self.events.append(("retry", event.operation, event.status))
+
+
+def series(metrics, name):
+    return {tuple(sorted(labels.items())): value for labels, value in metrics.snapshot()[name]}
+
+
+def test_histogram():
+    """Test bucket counts are cumulative and end with infinity."""
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(2.65)
+
+
+def test_client_metrics(stub):
+    """Test per-operation latency, bytes and crypto metrics from the sync client."""
+    metrics = MetricsCollector()
+    with PastyClient(stub.url, hooks=metrics) as client:
+        p = Paste(content="test_client_metrics" * 100, client=client)
+        key = p.encrypt()
+        p.save()
+        assert Paste.get(p.id, client=client).decrypt(key)
+        p.edit("test_client_metrics_post")
+        p.delete()
+
+    requests = series(metrics, "requests_total")
+    for operation, status in (("save", "201"), ("get", "200"), ("edit", "200"), ("delete", "200")):
+        labels = (("operation", operation), ("site", stub.url), ("status", status))
+        assert requests[labels] == 1
+    assert series(metrics, "sent_bytes_total")[(("operation", "save"), ("site", stub.url))] > 3800
+    assert series(metrics, "received_bytes_total")[(("operation", "get"), ("site", stub.url))] > 0
+    crypto = series(metrics, "crypto_duration_seconds")
+    assert crypto[(("operation", "encrypt"),)]["count"] == 2
+    assert crypto[(("operation", "decrypt"),)]["count"] == 1
+    phases = series(metrics, "phase_duration_seconds")
+    assert phases[(("operation", "get"), ("phase", "decode"), ("site", stub.url))]["count"] == 1
+
+    text = metrics.prometheus()
+    assert "# TYPE pastypy_request_duration_seconds histogram" in text
+    assert f'pastypy_requests_total{{operation="get",site="{stub.url}",status="200"}} 1' in text
+    assert 'le="+Inf"' in text
+
+
+def test_retry_hooks():
+    """Test hooks see every attempt and retry."""
+    recorder = Recorder()
+    metrics = MetricsCollector()
+    with StubServer(app=FlakyPasty([429, 429])) as server:
+        retry = RetryPolicy(backoff=0.01)
+        hooks = CompositeHooks(recorder, metrics)
+        with PastyClient(server.url, retry=retry, hooks=hooks) as client:
+            client.create_paste("test_retry_hooks", {})
+
+    assert recorder.events == [
+        ("start", "save", 0),
+        ("end", "save", 429),
+        ("retry", "save", 429),
+        ("start", "save", 1),
+        ("end", "save", 429),
+        ("retry", "save", 429),
+        ("start", "save", 2),
+        ("end", "save", 201),
+    ]
+    assert series(metrics, "retries_total")[(("operation", "save"), ("site", server.url))] == 2
+
+
+@pytest.mark.asyncio
+async def test_async_metrics(stub):
+    """Test the async client reports requests, decoding and new connections."""
+    metrics = MetricsCollector()
+    async with AsyncPastyClient(stub.url, hooks=metrics) as client:
+        p = AsyncPaste(content="test_async_metrics")
+        await p.save(client=client)
+        await AsyncPaste.get(p.id, client=client)
+
+    phases = {dict(labels)["phase"] for labels, _ in metrics.snapshot()["phase_duration_seconds"]}
+    assert {"decode", "connect"} <= phases
+    requests = series(metrics, "requests_total")
+    assert requests[(("operation", "get"), ("site", stub.url), ("status", "200"))] == 1
+
+
+class BytesRecorder(Hooks):
+    def __init__(self):
+        self.received = {}
+        self.phases = []
+
+    def on_request_end(self, event):
+        self.received[event.operation] = event.bytes_received
+
+    def on_phase(self, site, operation, phase, elapsed):
+        self.phases.append((operation, phase))
+
+
+@pytest.mark.asyncio
+async def test_chunked_bytes_received():
+    """Test bytes read and body read time are reported for chunked responses."""
+    content = "test_chunked_bytes_received" * 2000
+    with StubServer(app=StubPasty(compression=False, chunked=True)) as server:
+        hooks = BytesRecorder()
+        with PastyClient(server.url, hooks=hooks, coalesce=False) as client:
+            id = client.create_paste(content, {})["id"]
+            assert client.get_paste(id)["content"] == content
+            size = hooks.received["get"]
+            assert size > len(content)
+            assert b"".join(client.stream_paste(id)) and hooks.received["get"] == size
+        assert ("get", "read") in hooks.phases
+
+        hooks = BytesRecorder()
+        async with AsyncPastyClient(server.url, hooks=hooks, coalesce=False) as client:
+            await client.get_paste(id)
+            assert hooks.received["get"] == size
+            hooks.received.clear()
+            assert b"".join([c async for c in client.stream_paste(id)])
+            assert hooks.received["get"] == size
+        assert ("get", "read") in hooks.phases
@@ -0,0 +1,156 @@
+import socket
+
+import pytest
+
+from pastypy import AsyncPaste, Paste
+from pastypy.asyncio import AsyncMultiSiteClient
+from pastypy.retry import RateLimiter, RetryPolicy
+from pastypy.routing import SiteRouter
+from pastypy.sync import MultiSiteClient
+from pastypy.testing import StubPasty, StubServer
+from pastypy.vault import TokenVault
+
+
+class DownPasty(StubPasty):
+    """Stub answering every request with a server error."""
+
+    def handle(self, method, path, headers, body):
+        return 503, {}, b""
+
+
+def dead_site():
+    """URL of a port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def test_router():
+    """Test sites are ranked by health then latency."""
+    router = SiteRouter(["http://a/", "http://b", "http://c"], recheck_interval=60)
+    assert router.ranked() == ["http://a", "http://b", "http://c"]
+    assert router.claim_health_check()
+    assert not router.claim_health_check()
+    assert not SiteRouter(["http://a"], health_interval=None).claim_health_check()
+
+    router.succeeded("http://b", 0.01)
+    router.succeeded("http://c", 0.05)
+    router.failed("http://a")
+    assert router.ranked() == ["http://b", "http://c", "http://a"]
+    assert not router.healthy("http://a")
+
+    for _ in range(5):
+        router.succeeded("http://c", 0.0)
+    assert router.ranked()[0] == "http://c"
+
+    router.remember("abc", "http://b")
+    assert router.site_of("abc") == "http://b"
+    router.forget("abc")
+    assert router.site_of("abc") is None
+
+    router = SiteRouter(["http://a", "http://b"], max_locations=2)
+    router.remember("one", "http://a")
+    router.remember("two", "http://b")
+    assert router.site_of("one") == "http://a"
+    router.remember("three", "http://a")
+    assert router.site_of("two") is None
+    assert router.site_of("one") == "http://a"
+    assert len(router._locations) == 2
+
+    with pytest.raises(ValueError):
+        SiteRouter([])
+
+
+def test_failover():
+    """Test pastes go to healthy sites and later operations follow them."""
+    retry = RetryPolicy(max_retries=0)
+    with StubServer(app=DownPasty()) as down, StubServer() as up:
+        client = MultiSiteClient([dead_site(), down.url, up.url], retry=retry)
+        latencies = client.check_health()
+        assert latencies[up.url] is not None
+        assert client.site == up.url
+
+        p = Paste(content="test_failover")
+        p.save(client=client)
+        assert p.url.startswith(up.url)
+        assert p.id in up.app.pastes
+
+        # Unknown pastes are searched for, failing sites marked down along the way
+        other = MultiSiteClient([down.url, up.url], retry=retry, health_interval=None)
+        assert Paste.get(p.id, client=other).content == "test_failover"
+        assert not other.router.healthy(down.url)
+        assert other.router.site_of(p.id) == up.url
+
+        p.edit("edited", client=other)
+        assert up.app.pastes[p.id]["content"] == "edited"
+        p.delete(client=other)
+        assert p.id not in up.app.pastes
+        assert other.router.site_of(p.id) is None
+
+
+def test_failover_on_save():
+    """Test a save fails over when the best site errors."""
+    with StubServer(app=DownPasty()) as down, StubServer() as up:
+        client = MultiSiteClient([down.url, up.url], health_interval=None)
+        p = Paste(content="test_failover_on_save")
+        p.save(client=client)
+        assert p.id in up.app.pastes
+        assert client.router.ranked() == [up.url, down.url]
+
+
+def test_bulk_vault():
+    """Test bulk deletes find each paste's site through the vault."""
+    with StubServer() as a, StubServer() as b:
+        vault = TokenVault()
+        client = MultiSiteClient([a.url, b.url], vault=vault, health_interval=None)
+        Paste(content="first").save(client=client)
+        client.router.failed(a.url)
+        Paste(content="second").save(client=client)
+        assert len(a.app.pastes) == len(b.app.pastes) == 1
+
+        fresh = MultiSiteClient([a.url, b.url], vault=vault, health_interval=None)
+        ids = [*vault.ids(a.url), *vault.ids(b.url)]
+        assert all(r.ok for r in Paste.delete_many(ids, client=fresh))
+        assert not a.app.pastes and not b.app.pastes
+        assert len(vault) == 0
+
+
+@pytest.mark.asyncio
+async def test_async_failover():
+    """Test the async client routes, fails over and remembers sites."""
+    retry = RetryPolicy(max_retries=0)
+    with StubServer(app=DownPasty()) as down, StubServer() as up:
+        async with AsyncMultiSiteClient([dead_site(), down.url, up.url], retry=retry) as client:
+            p = AsyncPaste(content="test_async_failover")
+            await p.save(client=client)
+            assert p.id in up.app.pastes
+            assert client.site == up.url
+
+        async with AsyncMultiSiteClient(
+            [down.url, up.url], retry=retry, health_interval=None
+        ) as other:
+            p2 = await AsyncPaste.get(p.id, client=other)
+            assert p2.content == "test_async_failover"
+            assert not other.router.healthy(down.url)
+            chunks = [c async for c in AsyncPaste.stream(p.id, client=other)]
+            assert "".join(chunks) == "test_async_failover"
+            await p.delete(client=other)
+            assert p.id not in up.app.pastes
+
+
+@pytest.mark.asyncio
+async def test_multisite_rate_limits():
+    """Test every site gets its own rate limiter bucket."""
+    limiter = RateLimiter(5, burst=2)
+    sync = MultiSiteClient(["http://a", "http://b"], rate_limiter=limiter)
+    aio = AsyncMultiSiteClient(["http://a", "http://b"], rate_limiter=limiter)
+    for client in (sync, aio):
+        a, b = (c.rate_limiter for c in client.clients.values())
+        assert a is not b and limiter not in (a, b)
+        assert (a.rate, a.burst) == (b.rate, b.burst) == (5, 2)
+        # Draining one site's bucket leaves the other's full
+        assert [a.reserve() > 0 for _ in range(3)] == [False, False, True]
+        assert b.reserve() == 0
+    sync.close()
+    await aio.close()
@@ -0,0 +1,71 @@
+import pytest
+
+from pastypy import AsyncPaste, AsyncPastyClient, Paste, PastyClient
+from pastypy.compression import RequestCompressor
+from pastypy.protocol import Exchange, Request
+from pastypy.retry import RetryPolicy, RetryStats
+from pastypy.serialization import get_backend
+
+
+def test_same_requests():
+    """Test both clients describe every operation with the same request."""
+    sync, aio = PastyClient("https://site"), AsyncPastyClient("https://site")
+    for name, args in [
+        ("_create_op", ("content", {"a": 1})),
+        ("_edit_op", ("id", "token", "content", {})),
+        ("_delete_op", ("id", "token")),
+        ("_report_op", ("id", "spam")),
+        ("_get_op", ("id", None)),
+    ]:
+        request = next(getattr(sync, name)(*args))
+        assert request == next(getattr(aio, name)(*args))
+    assert request.method == "GET"
+    assert next(sync._report_op("id", "spam")).method == "POST"
+
+
+def test_exchange():
+    """Test retry and compression fallback decisions without I/O."""
+    stats = RetryStats()
+    compressor = RequestCompressor("gzip", threshold=0)
+    request = Request("POST", "/api/v2/pastes", "save", json={"content": "x" * 100})
+    policy = RetryPolicy(max_retries=1, jitter=False, backoff=0.5)
+    exchange = Exchange(request, "https://site", policy, stats, get_backend(), compressor, None)
+    assert exchange.headers["Content-Encoding"] == "gzip"
+
+    exchange.begin()
+    assert exchange.received(415, {}) == 0.0
+    assert "Content-Encoding" not in exchange.headers
+    assert exchange.headers["Content-Type"] == "application/json"
+    assert stats.retries == 0
+
+    exchange.begin()
+    assert exchange.received(429, {"Retry-After": "2"}) == 2
+    exchange.begin()
+    assert exchange.received(429, {}) is None
+    assert stats.retries == 1
+
+    exchange = Exchange(request, "https://site", policy, stats, get_backend(), compressor, None)
+    exchange.begin()
+    assert exchange.failed(ConnectionError()) is None
+
+    compressor = RequestCompressor("gzip", threshold=0)
+    exchange = Exchange(request, "https://site", policy, stats, get_backend(), compressor, None)
+    exchange.begin()
+    assert exchange.received(400, {}) == 0.0
+    assert "Content-Encoding" not in exchange.headers
+    assert compressor.supported
+    exchange.begin()
+    assert exchange.received(201, {}) is None
+    assert not compressor.supported
+
+
+@pytest.mark.asyncio
+async def test_report_parity(stub):
+    """Test both clients send the report reason."""
+    with PastyClient(stub.url) as client:
+        paste = Paste(content="test_report_parity")
+        paste.save(client=client)
+        assert Paste.report(paste.id, "sync", client=client).startswith("Reported")
+    async with AsyncPastyClient(stub.url) as client:
+        assert (await AsyncPaste.report(paste.id, "async", client=client)).startswith("Reported")
+    assert stub.app.reports[-2:] == [(paste.id, "sync"), (paste.id, "async")]
@@ -0,0 +1,96 @@
+from email.utils import formatdate
+import time
+
+import pytest
+
+from pastypy import AsyncPaste, Paste, PastyClient
+from pastypy.asyncio import AsyncPastyClient
+from pastypy.retry import RateLimiter, RetryPolicy
+from pastypy.testing import StubPasty, StubServer
+
+
+class FlakyPasty(StubPasty):
+    """Stub that rate-limits then fails the first requests."""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = list(failures)
+
+    def handle(self, method, path, headers, body):
+        if self.failures:
+            status = self.failures.pop(0)
+            return status, {"Retry-After": "0.01"} if status == 429 else {}, b""
+        return super().handle(method, path, headers, body)
+
+
+def test_rate_limiter():
+    """Test the token bucket spaces out requests."""
+    limiter = RateLimiter(rate=50, burst=2)
+    start = time.monotonic()
+    waited = sum(limiter.acquire() for _ in range(6))
+    elapsed = time.monotonic() - start
+    assert waited > 0
+    assert elapsed >= 4 / 50 * 0.9
+
+
+def test_policy():
+    """Test retry decisions and delays."""
+    policy = RetryPolicy(max_retries=2, backoff=1, jitter=False)
+    assert policy.should_retry("POST", 0, 429)
+    assert not policy.should_retry("POST", 0, 503)
+    assert not policy.should_retry("POST", 0)
+    assert policy.should_retry("GET", 1, 503)
+    assert not policy.should_retry("GET", 2, 503)
+    assert not policy.should_retry("GET", 0, 404)
+    assert policy.delay(2) == 4
+    assert policy.delay(0, "7") == 7
+    assert 0 <= policy.delay(0, formatdate(time.time() + 5, usegmt=True)) <= 5
+    assert policy.delay(1, "garbage") == 2
+
+
+def test_retry():
+    """Test 429 and 5xx responses are retried."""
+    with StubServer(app=FlakyPasty([429, 429])) as server:
+        client = PastyClient(server.url, retry=RetryPolicy(backoff=0.01))
+        p = Paste(content="test_retry")
+        p.save(client=client)
+        assert client.stats.retries == 2
+        assert client.stats.rate_limited == 2
+
+        server.app.failures = [503, 503, 503, 503]
+        with pytest.raises(Exception):
+            Paste.get(p.id, client=client)
+        assert client.stats.retries == 5
+
+
+@pytest.mark.asyncio
+async def test_async_retry():
+    """Test the async client retries and throttles."""
+    with StubServer(app=FlakyPasty([429])) as server:
+        limiter = RateLimiter(rate=100, burst=1)
+        async with AsyncPastyClient(
+            server.url, rate_limiter=limiter, retry=RetryPolicy(backoff=0.01)
+        ) as client:
+            p = AsyncPaste(content="test_async_retry")
+            await p.save(client=client)
+            assert client.stats.rate_limited == 1
+            server.app.failures = [502]
+            p2 = await AsyncPaste.get(p.id, client=client)
+            assert p2.content == "test_async_retry"
+            assert client.stats.retries == 2
+            assert client.stats.throttled_time > 0
+
+
+def test_stub_rate_limit():
+    """Test the stub's latency and rate limit are honoured through Retry-After."""
+    app = StubPasty(latency=0.01, rate_limit=10, burst=1)
+    with StubServer(app=app) as server:
+        client = PastyClient(server.url, retry=RetryPolicy(max_retries=10, backoff=0.01))
+        start = time.monotonic()
+        pastes = [Paste(content=f"test_stub_rate_limit {i}") for i in range(5)]
+        for p in pastes:
+            p.save(client=client)
+        assert time.monotonic() - start >= 5 * 0.01
+        assert app.rate_limited > 0
+        assert client.stats.rate_limited == app.rate_limited
+        assert len(app.pastes) == 5
@@ -0,0 +1,53 @@
+import pytest
+
+from pastypy import AsyncPastyClient, PastyClient
+from pastypy.serialization import BACKENDS, JSONBackend, get_backend
+
+PAYLOAD = {"content": 'é€😀 "quoted" / ' * 10, "metadata": {"a": [1, None, True]}}
+
+
+def installed():
+    names = []
+    for name, factory in BACKENDS.items():
+        try:
+            factory()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+@pytest.mark.parametrize("name", installed())
+def test_roundtrip(name):
+    """Test every installed backend encodes to bytes and decodes bytes and text."""
+    backend = get_backend(name)
+    body = backend.dumps(PAYLOAD)
+    assert isinstance(body, bytes)
+    assert backend.loads(body) == PAYLOAD
+    assert backend.loads(body.decode()) == PAYLOAD
+
+
+def test_get_backend():
+    """Test backend selection."""
+    assert get_backend().name in BACKENDS
+    assert get_backend("json").name == "json"
+    custom = JSONBackend("custom", lambda obj: b"{}", lambda body: {})
+    assert get_backend(custom) is custom
+    with pytest.raises(ValueError):
+        get_backend("pickle")
+
+
+@pytest.mark.parametrize("name", installed())
+def test_client_backend(stub, name):
+    """Test both clients round-trip pastes with each backend."""
+    with PastyClient(stub.url, json_backend=name) as client:
+        raw = client.create_paste(PAYLOAD["content"], PAYLOAD["metadata"])
+        assert client.get_paste(raw["id"])["content"] == PAYLOAD["content"]
+
+
+@pytest.mark.asyncio
+async def test_async_client_backend(stub):
+    """Test the async client with the stdlib backend."""
+    async with AsyncPastyClient(stub.url, json_backend="json") as client:
+        raw = await client.create_paste(PAYLOAD["content"], PAYLOAD["metadata"])
+        assert (await client.get_paste(raw["id"]))["metadata"] == PAYLOAD["metadata"]
@@ -0,0 +1,114 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+import pytest
+import requests
+
+from pastypy import AsyncPaste, AsyncPastyClient, Paste, PastyClient
+from pastypy.metrics import MetricsCollector
+from pastypy.testing import StubPasty, StubServer
+
+
+@pytest.fixture(scope="module")
+def slow_stub():
+    with StubServer(app=StubPasty(latency=0.2)) as server:
+        yield server
+
+
+def test_coalesce_threads(slow_stub):
+    """Test concurrent gets share one request, each getting its own paste."""
+    metrics = MetricsCollector()
+    with PastyClient(slow_stub.url, hooks=metrics) as client:
+        paste = Paste(content="test_coalesce_threads", metadata={"tags": ["a"]})
+        key = paste.encrypt()
+        paste.save(client=client)
+        barrier = Barrier(10)
+
+        def get(id):
+            barrier.wait()
+            return Paste.get(id, client=client)
+
+        requests_before = slow_stub.app.requests
+        with ThreadPoolExecutor(10) as pool:
+            pastes = list(pool.map(get, [paste.id] * 10))
+        assert slow_stub.app.requests == requests_before + 1
+        assert client.flights.stats.coalesced == 9
+        assert metrics.snapshot()["coalesced_total"][0][1] == 9
+
+        pastes[0].decrypt(key)
+        pastes[0].metadata["tags"].append("b")
+        assert pastes[0].content == "test_coalesce_threads"
+        assert not pastes[1]._plaintext
+        assert pastes[1].metadata["tags"] == ["a"]
+
+        # Errors reach every caller
+        barrier.reset()
+        with ThreadPoolExecutor(10) as pool:
+            futures = [pool.submit(get, "missing") for _ in range(10)]
+        for future in futures:
+            with pytest.raises(requests.HTTPError):
+                future.result()
+        assert slow_stub.app.requests == requests_before + 2
+
+
+def test_coalesce_disabled(slow_stub):
+    """Test every get sends its own request without coalescing."""
+    with PastyClient(slow_stub.url, coalesce=False, pool_size=4) as client:
+        paste = Paste(content="test_coalesce_disabled")
+        paste.save(client=client)
+        requests_before = slow_stub.app.requests
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(lambda id: Paste.get(id, client=client), [paste.id] * 4))
+        assert slow_stub.app.requests == requests_before + 4
+
+
+@pytest.mark.asyncio
+async def test_coalesce_async(slow_stub):
+    """Test concurrent tasks share one request, surviving the first caller's cancellation."""
+    async with AsyncPastyClient(slow_stub.url) as client:
+        paste = AsyncPaste(content="test_coalesce_async")
+        await paste.save(client=client)
+        requests_before = slow_stub.app.requests
+
+        first = asyncio.ensure_future(AsyncPaste.get(paste.id, client=client))
+        await asyncio.sleep(0.05)
+        others = [AsyncPaste.get(paste.id, client=client) for _ in range(49)]
+        first.cancel()
+        pastes = await asyncio.gather(*others)
+
+        assert slow_stub.app.requests == requests_before + 1
+        assert client.flights.stats.coalesced == 49
+        assert len({id(p) for p in pastes}) == 49
+        assert len({id(p.metadata) for p in pastes}) == 49
+        assert all(p.content == "test_coalesce_async" for p in pastes)
+
+        # Edits stop later gets from joining a request that may predate them
+        fetching = asyncio.ensure_future(AsyncPaste.get(paste.id, client=client))
+        await asyncio.sleep(0.05)
+        await paste.edit("edited", client=client)
+        assert (await AsyncPaste.get(paste.id, client=client)).content == "edited"
+        await fetching
+
+
+@pytest.mark.asyncio
+async def test_coalesce_async_default(slow_stub):
+    """Test concurrent gets without a client share one request."""
+    async with AsyncPastyClient(slow_stub.url) as client:
+        paste = AsyncPaste(content="test_coalesce_async_default")
+        await paste.save(client=client)
+        requests_before = slow_stub.app.requests
+
+        pastes = await asyncio.gather(
+            *(AsyncPaste.get(paste.id, site=slow_stub.url) for _ in range(20))
+        )
+        assert slow_stub.app.requests == requests_before + 1
+        assert len({id(p.metadata) for p in pastes}) == 20
+        assert all(p.content == "test_coalesce_async_default" for p in pastes)
+
+        # Edits over any client stop later gets from joining an older request
+        fetching = asyncio.ensure_future(AsyncPaste.get(paste.id, site=slow_stub.url))
+        await asyncio.sleep(0.05)
+        await paste.edit("edited", client=client)
+        assert (await AsyncPaste.get(paste.id, site=slow_stub.url)).content == "edited"
+        await fetching
@@ -0,0 +1,110 @@
+import json
+import os
+
+import pytest
+
+from pastypy import AsyncPaste, AsyncPastyClient, Paste, PastyClient
+from pastypy.crypto import encrypt_cbc
+from pastypy.stream import PasteParser, PasteStream
+
+CONTENT = 'quotes " and \\ slashes / \n\t\x01 unicode é€😀  ' * 50
+
+
+def chunked(body: bytes, size: int):
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 4096])
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_parser(size, ensure_ascii):
+    """Test content is streamed and other fields collected across any chunk boundary."""
+    paste = {"id": 'a"b', "content": CONTENT, "metadata": {"x": [1, {"y": "}"}]}, "n": None}
+    body = json.dumps(paste, ensure_ascii=ensure_ascii, indent=1).encode()
+    parser = PasteParser()
+    pieces = [piece for data in chunked(body, size) for piece in parser.feed(data)]
+    parser.close()
+    assert "".join(pieces) == CONTENT
+    assert parser.fields == {"id": 'a"b', "metadata": {"x": [1, {"y": "}"}]}, "n": None}
+
+
+def test_parser_truncated():
+    """Test a truncated response is rejected."""
+    parser = PasteParser()
+    parser.feed(b'{"content": "abc')
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+@pytest.mark.parametrize("metadata_first", [True, False])
+def test_stream_decrypt(metadata_first):
+    """Test decryption with metadata before and after the content."""
+    key, iv = os.urandom(32), os.urandom(16)
+    metadata = {"pf_encryption": {"alg": "AES-CBC", "iv": iv.hex()}}
+    paste = {"content": encrypt_cbc(CONTENT, key, iv)}
+    paste = {"metadata": metadata, **paste} if metadata_first else {**paste, "metadata": metadata}
+
+    stream = PasteStream(key.hex(), spool_size=100)
+    pieces = [
+        piece for data in chunked(json.dumps(paste).encode(), 333) for piece in stream.feed(data)
+    ]
+    pieces.extend(stream.close())
+    assert "".join(pieces) == CONTENT
+    assert len(pieces) > 1
+
+
+def test_stub_stream(stub):
+    """Test streaming plain and encrypted pastes from the stub."""
+    with PastyClient(stub.url) as client:
+        plain = Paste(content=CONTENT)
+        plain.save(client=client)
+        assert "".join(Paste.stream(plain.id, client=client, chunk_size=100)) == CONTENT
+
+        encrypted = Paste(content=CONTENT)
+        key = encrypted.encrypt()
+        encrypted.save(client=client)
+        pieces = list(Paste.stream(encrypted.id, key=key, client=client, chunk_size=100))
+        assert "".join(pieces) == CONTENT
+        assert "".join(Paste.stream(encrypted.id, client=client)) == encrypted._content
+
+        with pytest.raises(ValueError):
+            "".join(Paste.stream(encrypted.id, key=os.urandom(32).hex(), client=client))
+
+
+@pytest.mark.asyncio
+async def test_async_stub_stream(stub):
+    """Test streaming an encrypted paste from the stub."""
+    async with AsyncPastyClient(stub.url) as client:
+        paste = AsyncPaste(content=CONTENT)
+        key = paste.encrypt()
+        await paste.save(client=client)
+        pieces = [p async for p in AsyncPaste.stream(paste.id, key=key, client=client)]
+        assert "".join(pieces) == CONTENT
+
+
+@pytest.mark.parametrize("alg", [None, "AES-CBC", "ChaCha20-Poly1305"])
+def test_save_stream(stub, alg):
+    """Test uploads from chunks escape and encrypt content piece by piece."""
+    chunks = [CONTENT[i : i + 7] for i in range(0, len(CONTENT), 7)]
+    with PastyClient(stub.url) as client:
+        record = Paste.save_stream(
+            iter(chunks), encrypt=alg is not None, alg=alg, metadata={"a": 1}, client=client
+        )
+        assert stub.app.tokens[record.id] == record.modification_token
+        assert record.url.startswith(f"{stub.url}/{record.id}")
+        assert "".join(Paste.stream(record.id, key=record.key, client=client)) == CONTENT
+        assert Paste.get(record.id, client=client).metadata["a"] == 1
+
+
+@pytest.mark.asyncio
+async def test_async_save_stream(stub):
+    """Test async uploads from an async iterable of chunks."""
+
+    async def chunks():
+        for i in range(0, len(CONTENT), 7):
+            yield CONTENT[i : i + 7]
+
+    async with AsyncPastyClient(stub.url) as client:
+        record = await AsyncPaste.save_stream(chunks(), encrypt=True, alg="AES-GCM", client=client)
+        paste = await AsyncPaste.get(record.id, client=client)
+        paste.decrypt(record.key)
+        assert paste.content == CONTENT
@@ -4,15 +4,13 @@ import pytest
 
 from pastypy import Paste
 
-TEST_SITE = "https://paste.zevs.me"
-
 
 def get_content(test_name):
     return f"---\nTest: {test_name}\nTime: {datetime.utcnow().timestamp()}"
 
 
-def create_paste(test_name):
-    return Paste(content=get_content(test_name), site=TEST_SITE)
+def create_paste(test_name, site=None):
+    return Paste(content=get_content(test_name), site=site)
 
 
 def test_create():
@@ -38,16 +36,32 @@ def test_content():
     assert p.content == f"<Encrypted: {p._content}>"
 
 
-def test_save_delete():
+def test_slots():
+    """Test pastes have no instance dict and build metadata lazily."""
+    p = Paste(content="")
+    assert not hasattr(p, "__dict__")
+    assert p.content == ""
+    assert p._metadata is None
+    assert p.metadata == {}
+    assert p._metadata is p.metadata
+
+    key = p.encrypt()
+    p2 = Paste(content=p._content, metadata=p.metadata)
+    assert p2.encrypted
+    assert p2.decrypt(key)
+    assert p2.content == ""
+
+
+def test_save_delete(site):
     """Test saving and deleting a paste."""
-    p = create_paste("test_save")
+    p = create_paste("test_save", site)
     with pytest.raises(ValueError):
         p.delete()
 
-    token = p.save(site=TEST_SITE)
+    token = p.save(site=site)
     assert p.id is not None
     assert p._token == token
-    assert p.url == f"{TEST_SITE}/{p.id}"
+    assert p.url == f"{site}/{p.id}"
 
     p._token = None
     with pytest.raises(ValueError):
@@ -55,14 +69,14 @@ def test_save_delete():
     p.delete(token)
 
 
-def test_edit():
+def test_edit(site):
     """Test editing a paste."""
-    p = create_paste("test_edit")
+    p = create_paste("test_edit", site)
     with pytest.raises(ValueError):
         p.edit(content="NI")
 
     content = p.content
-    token = p.save(site=TEST_SITE)
+    token = p.save(site=site)
     assert p.id is not None
     assert p._token == token
 
@@ -74,9 +88,9 @@ def test_edit():
     p.delete(token)
 
 
-def test_edit_enc():
+def test_edit_enc(site):
     """Test editing an encrypted paste."""
-    p = create_paste("test_edit_enc")
+    p = create_paste("test_edit_enc", site)
     key = p.encrypt()
     md = p.metadata
     p.save()
@@ -88,14 +102,14 @@ def test_edit_enc():
     p.delete()
 
 
-def test_get():
+def test_get(site):
     """Test getting a paste."""
-    p = create_paste("test_get")
-    token = p.save(site=TEST_SITE)
+    p = create_paste("test_get", site)
+    token = p.save(site=site)
     assert p.id is not None
     assert p._token == token
 
-    p2 = Paste.get(p.id, site=TEST_SITE)
+    p2 = Paste.get(p.id, site=site)
     assert p.id == p2.id
     assert p.content == p2.content
     p.delete()
@@ -0,0 +1,80 @@
+import asyncio
+
+from aiohttp import ClientConnectionError, ClientResponseError
+import pytest
+
+from pastypy import AsyncPaste, AsyncPastyClient
+from pastypy.asyncio import AsyncMultiSiteClient
+from pastypy.retry import RetryPolicy
+from pastypy.testing import H2StubServer, StubPasty
+
+
+@pytest.fixture(scope="module")
+def h2_stub():
+    with H2StubServer(app=StubPasty(latency=0.05)) as server:
+        yield server
+
+
+async def round_trip(client):
+    paste = AsyncPaste(content="round trip " * 20000)
+    key = paste.encrypt()
+    await paste.save(client=client)
+    fetched = await AsyncPaste.get(paste.id, client=client)
+    fetched.decrypt(key)
+    assert fetched.content == paste.content
+    streamed = [c async for c in AsyncPaste.stream(paste.id, key=key, client=client)]
+    assert "".join(streamed) == paste.content
+    key = await paste.edit("edited", client=client)
+    edited = await AsyncPaste.get(paste.id, client=client)
+    edited.decrypt(key)
+    assert edited.content == "edited"
+    record = await AsyncPaste.save_stream(iter(["up", "load"]), client=client)
+    assert (await AsyncPaste.get(record.id, client=client)).content == "upload"
+    await paste.delete(client=client)
+    with pytest.raises(ClientResponseError) as e:
+        await AsyncPaste.get(paste.id, client=client)
+    assert e.value.status == 404
+
+
+@pytest.mark.asyncio
+async def test_httpx_transport(stub):
+    """Test every operation over httpx, with aiohttp's errors."""
+    async with AsyncPastyClient(stub.url, transport="httpx") as client:
+        await round_trip(client)
+        # Plain httpx speaks HTTP/1.1 to http sites rather than relying on a fallback
+        pool = client.session._client._transport._pool
+        assert pool._http1 and not pool._http2
+        resp = await client.request("GET", "/api/v2/pastes/missing")
+        assert resp.http_version == "HTTP/1.1"
+        resp.release()
+    async with AsyncPastyClient(
+        "http://127.0.0.1:1", transport="httpx", retry=RetryPolicy(max_retries=0)
+    ) as client:
+        with pytest.raises(ClientConnectionError):
+            await client.get_paste("anything")
+
+
+@pytest.mark.asyncio
+async def test_http2_transport(h2_stub):
+    """Test every operation over HTTP/2, concurrent requests sharing one connection."""
+    async with AsyncPastyClient(h2_stub.url, transport="http2", coalesce=False) as client:
+        await round_trip(client)
+        resp = await client.request("GET", "/api/v2/pastes/missing")
+        assert resp.http_version == "HTTP/2"
+        resp.release()
+
+        id = (await client.create_paste("shared", {}))["id"]
+        before = asyncio.get_running_loop().time()
+        await asyncio.gather(*(client.get_paste(id) for _ in range(50)))
+        # 50 requests of 50 ms each, multiplexed rather than queued
+        assert asyncio.get_running_loop().time() - before < 1
+    assert h2_stub.app.connections == 1
+
+
+@pytest.mark.asyncio
+async def test_transport_multisite(stub, h2_stub):
+    """Test the multi-site client shares one transport over its sites."""
+    async with AsyncMultiSiteClient([stub.url], transport="httpx") as client:
+        assert (await client.create_paste("multi", {}))["content"] == "multi"
+    with pytest.raises(ValueError):
+        AsyncPastyClient(stub.url, transport="http3")
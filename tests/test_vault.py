@@ -0,0 +1,66 @@
+import pytest
+
+from pastypy import AsyncPaste, AsyncPastyClient, Paste, PastyClient
+from pastypy.vault import TokenVault
+
+
+def test_vault_persistent(tmp_path):
+    """Test tokens survive reopening a persistent vault."""
+    vault = TokenVault(tmp_path / "tokens.sqlite3")
+    vault.set("site", "a", "token-a")
+    vault.set("site", "b", "token-b")
+    vault.set("other", "a", "token-c")
+    vault.discard("site", "b")
+    vault.close()
+
+    vault = TokenVault(tmp_path / "tokens.sqlite3")
+    assert len(vault) == 2
+    assert vault.get("site", "a") == "token-a"
+    assert vault.get("site", "b") is None
+    assert vault.ids("site") == ["a"]
+    with pytest.raises(ValueError):
+        vault.require("site", "b")
+    vault.close()
+
+
+def test_bulk_delete_edit(stub):
+    """Test tokens are recorded on save and used by bulk edits and deletes."""
+    vault = TokenVault()
+    with PastyClient(stub.url, vault=vault) as client:
+        records = list(
+            Paste.save_many([f"test_bulk_delete_edit {i}" for i in range(5)], client=client)
+        )
+        ids = [r.id for r in records]
+        assert sorted(vault.ids(client.site)) == sorted(ids)
+
+        results = Paste.edit_many({id: f"edited {id}" for id in ids}, encrypt=True, client=client)
+        assert [r.item for r in results] == ids
+        for result in results:
+            paste = Paste.get(result.item, client=client)
+            assert paste.decrypt(result.value)
+            assert paste.content == f"edited {result.item}"
+
+        results = Paste.delete_many([*ids, "missing"], client=client)
+        assert all(r.ok for r in results[:-1])
+        assert isinstance(results[-1].error, ValueError)
+        assert not any(id in stub.app.pastes for id in ids)
+        assert len(vault) == 0
+
+    with pytest.raises(ValueError):
+        Paste.delete_many(ids, site=stub.url)
+
+
+@pytest.mark.asyncio
+async def test_async_bulk_delete_edit(stub):
+    """Test async bulk edits and deletes with an explicit vault."""
+    vault = TokenVault()
+    async with AsyncPastyClient(stub.url, vault=vault) as client:
+        ids = [r.id async for r in AsyncPaste.save_many(["a", "b", "c"], client=client)]
+
+    results = await AsyncPaste.edit_many([(id, "edited") for id in ids], site=stub.url, vault=vault)
+    assert all(r.ok and r.value is None for r in results)
+    assert all(stub.app.pastes[id]["content"] == "edited" for id in ids)
+
+    results = await AsyncPaste.delete_many(ids, site=stub.url, vault=vault)
+    assert [r.item for r in results if r.ok] == ids
+    assert len(vault) == 0